@@ -0,0 +1,129 @@
+"""
+Бенчмарк слоя БД: соединение на каждый вызов против пула соединений
+и очереди записи с групповым коммитом. Чтение через пул измеряется запросом
+к соединению пула; database.get_balance() после первого вызова отвечает из
+кэша состояния и печатается отдельной строкой.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_database [--ops 2000]
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from core import database
+from utils.logger import logger
+
+
+def legacy_get_balance(path: str):
+    """Чтение баланса как раньше: новое соединение на каждый вызов"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT incoming, checks, max_balance FROM totals WHERE id=1")
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+def legacy_add_income(path: str, amount: float):
+    """Пополнение как раньше: два соединения (запись + update_max_balance)"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("UPDATE totals SET incoming = incoming + ? WHERE id=1", (amount,))
+    cursor.execute("INSERT INTO transaction_history(type, amount) VALUES(?, ?)", ("income", amount))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT incoming, checks, max_balance FROM totals WHERE id=1")
+    incoming, checks, max_balance = cursor.fetchone()
+    if incoming - checks > max_balance:
+        cursor.execute("UPDATE totals SET max_balance=? WHERE id=1", (incoming - checks,))
+        conn.commit()
+    conn.close()
+
+
+def pooled_get_balance():
+    """Тот же запрос итогов через соединение пула на чтение, минуя кэш состояния"""
+    with database.get_pool().reader() as conn:
+        return database._read_snapshot(conn)
+
+
+def measure(name: str, func, ops: int) -> float:
+    """Выполняет func ops раз и печатает ops/sec"""
+    start = time.perf_counter()
+    for _ in range(ops):
+        func()
+    elapsed = time.perf_counter() - start
+    rate = ops / elapsed if elapsed else float("inf")
+    print(f"{name:<32} {rate:>10.0f} ops/sec")
+    return rate
+
+
+def measure_concurrent(name: str, func, ops: int, threads: int) -> float:
+    """Выполняет func ops раз из threads потоков одновременно и печатает ops/sec"""
+    per_thread = max(1, ops // threads)
+
+    def worker():
+        for _ in range(per_thread):
+            func()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    rate = per_thread * threads / elapsed if elapsed else float("inf")
+    print(f"{name:<32} {rate:>10.0f} ops/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000, help="количество операций на сценарий")
+    parser.add_argument("--threads", type=int, default=8, help="потоков в конкурентном сценарии записи")
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    database.DATABASE_PATH = path
+    database.init_database()
+
+    try:
+        print(f"SQLite {sqlite3.sqlite_version}, операций: {args.ops}\n")
+
+        before = measure("get_balance (connect-per-call)", lambda: legacy_get_balance(path), args.ops)
+        after = measure("get_balance (pool)", pooled_get_balance, args.ops)
+        print(f"{'ускорение':<32} {after / before:>10.1f}x")
+        measure("get_balance (cache)", database.get_balance, args.ops)
+        print()
+
+        before = measure("add_income (connect-per-call)", lambda: legacy_add_income(path, 1.0), args.ops)
+        after = measure("add_income (pool)", lambda: database.add_income(1.0), args.ops)
+        print(f"{'ускорение':<32} {after / before:>10.1f}x\n")
+
+        label = f"add_income x{args.threads}"
+        before = measure_concurrent(f"{label} (connect-per-call)", lambda: legacy_add_income(path, 1.0),
+                                    args.ops, args.threads)
+        write_queue = database.get_write_queue()
+        batches, operations = write_queue.batches, write_queue.operations
+        after = measure_concurrent(f"{label} (group commit)", lambda: database.add_income(1.0),
+                                   args.ops, args.threads)
+        batch_size = (write_queue.operations - operations) / max(1, write_queue.batches - batches)
+        print(f"{'ускорение':<32} {after / before:>10.1f}x")
+        print(f"{'средний размер пачки':<32} {batch_size:>10.1f}")
+    finally:
+        database.close_database()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Бенчмарк пакетного распознавания регионов чека (services.ocr.engine.read_lines_batch)
+против последовательного каскада: задержка на чек и найденная сумма для разного
+числа первых вариантов, распознаваемых одним вызовом RapidOCR.
+
+Чеки синтетические: сумма в строке суммы Crédit Agricole, в области таблицы
+или только на полном изображении (худший случай для каскада).
+
+Запуск из корня проекта (распознавание в текущем процессе, без пула):
+    python -m benchmarks.bench_ocr_batch [--repeat 3] [--batch 0 2 4 6]
+"""
+import argparse
+import io
+import statistics
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from services.ocr import engine, layouts
+
+# (название, сумма, положение строки суммы на чеке 1000x1000)
+CHECKS = (
+    ("строка суммы", "250.00 UAH", (620, 345)),
+    ("таблица", "1480.50 UAH", (600, 600)),
+    ("вне кропов", "75.50 UAH", (50, 800)),
+)
+
+
+def use_check_layout():
+    """Синтетические чеки не определяются по признакам: распознаются макетом Crédit Agricole"""
+    layouts.OCR_DEFAULT_LAYOUT = "credit_agricole"
+
+
+def render_check(amount_text: str, position) -> bytes:
+    """Синтетический чек: заголовок, строка комиссии и строка суммы"""
+    img = Image.new("RGB", (1000, 1000), "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=40)
+    draw.text((80, 80), "Credit Agricole", fill="black", font=font)
+    draw.text((600, 520), "Komisiia 0.00", fill="black", font=font)
+    draw.text(position, amount_text, fill="black", font=font)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на чек")
+    parser.add_argument("--batch", type=int, nargs="+", default=[0, 2, 4, 6],
+                        help="сколько первых вариантов распознавать одним вызовом (0 — последовательно)")
+    args = parser.parse_args()
+
+    use_check_layout()
+    checks = [(name, render_check(text, position)) for name, text, position in CHECKS]
+    # Прогрев: загрузка моделей и первые запуски onnxruntime
+    engine.recognize_check(checks[0][1], batch=0)
+
+    print(f"{'чек':<14} {'batch':>6} {'мс/чек':>10} {'вариантов':>10} {'этап':>22} {'сумма':>10}")
+    for name, image_bytes in checks:
+        for batch in args.batch:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = engine.recognize_check(image_bytes, batch=batch)
+                timings.append(time.perf_counter() - started)
+            print(f"{name:<14} {batch:>6} {statistics.median(timings) * 1000:>10.0f} "
+                  f"{len(result.attempts):>10} {result.stage:>22} {str(result.amount):>10}")
+
+
+if __name__ == "__main__":
+    main()
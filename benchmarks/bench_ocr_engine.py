@@ -0,0 +1,67 @@
+"""
+Матрица параметров RapidOCR (services.ocr.engine.build_rapid_ocr): потоки
+ONNX Runtime, уровень оптимизации графа и этапы RapidOCR по вариантам каскада
+(OCR_VARIANT_STAGES). Для каждой комбинации печатаются время загрузки модели,
+медианная задержка на чек и найденные суммы синтетических чеков
+(benchmarks.bench_ocr_batch.CHECKS).
+
+Запуск из корня проекта (распознавание в текущем процессе, без пула):
+    python -m benchmarks.bench_ocr_engine [--repeat 3] [--threads 0 1 2] [--graph-opt basic all]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_ocr_batch import CHECKS, render_check, use_check_layout
+from services.ocr import engine
+
+# (название, OCR_VARIANT_STAGES)
+STAGE_PROFILES = (
+    ("det+cls+rec", ""),
+    ("без cls", "*=det+rec"),
+    ("строки сразу в rec", "amount_row1=rec,amount_row2=rec,amount_row1_processed=rec,"
+                           "amount_row2_processed=rec,*=det+rec"),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на чек")
+    parser.add_argument("--threads", type=int, nargs="+", default=[0, 1, 2],
+                        help="потоков ONNX Runtime внутри оператора (0 — по умолчанию)")
+    parser.add_argument("--inter-threads", type=int, default=0, help="потоков между операторами")
+    parser.add_argument("--graph-opt", nargs="+", default=["basic", "all"],
+                        choices=sorted(engine.GRAPH_OPT_LEVELS), help="уровни оптимизации графа")
+    parser.add_argument("--batch", type=int, default=engine.OCR_BATCH_VARIANTS,
+                        help="первых вариантов на один вызов RapidOCR")
+    args = parser.parse_args()
+
+    use_check_layout()
+    checks = [(name, render_check(text, position)) for name, text, position in CHECKS]
+    names = " | ".join(name for name, _ in checks)
+
+    print(f"{'потоки':>6} {'граф':>9} {'этапы':<20} {'загрузка, с':>12} {'мс/чек':>8}  суммы ({names})")
+    for threads in args.threads:
+        for graph_opt in args.graph_opt:
+            started = time.perf_counter()
+            engine._rapid_ocr = engine.build_rapid_ocr(threads, args.inter_threads, graph_opt)
+            load_seconds = time.perf_counter() - started
+            # Прогрев: первые запуски onnxruntime
+            engine.recognize_check(checks[0][1], batch=args.batch)
+
+            for profile, spec in STAGE_PROFILES:
+                variant_stages = engine.parse_variant_stages(spec)
+                timings, amounts = [], []
+                for _, image_bytes in checks:
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        result = engine.recognize_check(image_bytes, batch=args.batch,
+                                                        variant_stages=variant_stages)
+                        timings.append(time.perf_counter() - started)
+                    amounts.append(f"{result.amount} ({result.stage})")
+                print(f"{threads:>6} {graph_opt:>9} {profile:<20} {load_seconds:>12.2f} "
+                      f"{statistics.median(timings) * 1000:>8.0f}  {' | '.join(amounts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Сравнение float и INT8-моделей RapidOCR (services.ocr.quantize) на размеченном
+наборе чеков: доля правильно извлеченных сумм, медианная и p95 задержка на чек
+полным каскадом (engine.recognize_check) и чеки, где профили разошлись.
+
+Набор — каталог с изображениями и labels.csv (строки "файл,сумма"); без
+--images используются синтетические чеки benchmarks.bench_ocr_batch.CHECKS.
+Квантованные модели берутся из --models и генерируются, если их там нет.
+
+Запуск из корня проекта (распознавание в текущем процессе, без пула):
+    python -m benchmarks.bench_ocr_quantized [--images checks/] [--repeat 3] [--profiles float rec det+rec]
+"""
+import argparse
+import csv
+import os
+import statistics
+import time
+
+from benchmarks.bench_ocr_batch import CHECKS, render_check, use_check_layout
+from core.config import OCR_MODELS_DIR
+from services.ocr import engine, quantize
+
+# Профиль -> модели в INT8
+PROFILES = {"float": (), "rec": ("rec",), "det": ("det",), "det+rec": ("det", "rec")}
+
+
+def load_labeled(directory: str) -> list:
+    """(название, байты изображения, сумма) из labels.csv каталога"""
+    checks = []
+    with open(os.path.join(directory, "labels.csv"), encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            with open(os.path.join(directory, row[0]), "rb") as image:
+                checks.append((row[0], image.read(), float(row[1])))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="каталог с изображениями и labels.csv")
+    parser.add_argument("--models", default=OCR_MODELS_DIR, help="каталог INT8-моделей")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на чек")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES),
+                        help="какие модели загружать в INT8")
+    args = parser.parse_args()
+
+    if args.images:
+        checks = load_labeled(args.images)
+    else:
+        use_check_layout()
+        checks = [(name, render_check(text, position), float(text.split()[0])) for name, text, position in CHECKS]
+
+    missing = [model for model in quantize.MODELS
+               if not os.path.exists(quantize.int8_model_path(model, args.models))]
+    if missing:
+        quantize.quantize_models(args.models, missing)
+
+    amounts = {}
+    print(f"Чеков: {len(checks)}")
+    print(f"{'INT8':<10} {'верно':>8} {'точность':>9} {'медиана, мс':>12} {'p95, мс':>9}")
+    for profile in args.profiles:
+        engine._rapid_ocr = engine.build_rapid_ocr(int8_models=PROFILES[profile], models_dir=args.models)
+        # Прогрев: первые запуски onnxruntime
+        engine.recognize_check(checks[0][1])
+
+        timings, found = [], []
+        for _, image_bytes, _ in checks:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = engine.recognize_check(image_bytes)
+                timings.append(time.perf_counter() - started)
+            found.append(result.amount)
+        amounts[profile] = found
+
+        correct = sum(amount is not None and abs(amount - label) < 0.005
+                      for amount, (_, _, label) in zip(found, checks))
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{profile:<10} {correct:>8} {correct / len(checks) * 100:>8.1f}% "
+              f"{statistics.median(timings) * 1000:>12.0f} {p95 * 1000:>9.0f}")
+
+    # Чеки, где профили извлекли разные суммы
+    for i, (name, _, label) in enumerate(checks):
+        results = {profile: found[i] for profile, found in amounts.items()}
+        if len(set(results.values())) > 1:
+            details = ", ".join(f"{profile}: {amount}" for profile, amount in results.items())
+            print(f"Расхождение {name} (ожидалось {label}): {details}")
+
+
+if __name__ == "__main__":
+    main()
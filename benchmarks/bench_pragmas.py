@@ -0,0 +1,91 @@
+"""
+Бенчмарк профилей PRAGMA SQLite (core.config.DB_PRAGMA_PROFILES) под
+конкурентной нагрузкой: потоки-писатели добавляют пополнения через очередь
+записи с групповым коммитом, а потоки-читатели одновременно выполняют
+агрегирующий запрос по истории (как экспорт и отчеты) и замеряют задержку.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_pragmas [--seconds 3] [--writers 4] [--readers 4]
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from core import database
+from core.config import DB_PRAGMA_PROFILES, DB_GROUP_COMMIT_MS, DB_GROUP_COMMIT_MAX_BATCH
+from core.connection import ConnectionPool, WriteQueue
+import migrations
+from utils.logger import logger
+
+READ_QUERY = "SELECT type, COUNT(*), SUM(amount) FROM transaction_history GROUP BY type"
+
+
+def run_profile(name: str, pragmas: dict, seconds: float, writers: int, readers: int, preload: int):
+    """Прогоняет смешанную нагрузку на отдельном файле БД с заданным профилем"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    pool = ConnectionPool(path, readers, pragmas)
+    with pool.writer() as conn:
+        migrations.migrate(conn)
+        conn.executemany("INSERT INTO transaction_history(type, amount) VALUES('income', ?)",
+                         ((1.0,) for _ in range(preload)))
+    write_queue = WriteQueue(pool, DB_GROUP_COMMIT_MS, DB_GROUP_COMMIT_MAX_BATCH)
+
+    stop = threading.Event()
+    writes = [0] * writers
+    latencies: list[list[float]] = [[] for _ in range(readers)]
+
+    def writer(index: int):
+        while not stop.is_set():
+            write_queue.submit(database._apply_entry, "income", 1.0).result()
+            writes[index] += 1
+
+    def reader(index: int):
+        while not stop.is_set():
+            start = time.perf_counter()
+            with pool.reader() as conn:
+                conn.execute(READ_QUERY).fetchall()
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    write_queue.close()
+    pool.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    reads = sorted(latency for per_thread in latencies for latency in per_thread)
+    p50 = statistics.median(reads) * 1000 if reads else 0
+    p95 = reads[int(len(reads) * 0.95)] * 1000 if reads else 0
+    print(f"{name:<10} {sum(writes) / seconds:>12.0f} {len(reads) / seconds:>12.0f} {p50:>10.2f} {p95:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3, help="длительность нагрузки на профиль, с")
+    parser.add_argument("--writers", type=int, default=4, help="потоков-писателей")
+    parser.add_argument("--readers", type=int, default=4, help="потоков-читателей")
+    parser.add_argument("--preload", type=int, default=20000, help="строк истории перед замером")
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    print(f"писателей: {args.writers}, читателей: {args.readers}, {args.seconds:g} с на профиль\n")
+    print(f"{'профиль':<10} {'запись/с':>12} {'чтение/с':>12} {'p50, мс':>10} {'p95, мс':>10}")
+    for name, pragmas in DB_PRAGMA_PROFILES.items():
+        run_profile(name, pragmas, args.seconds, args.writers, args.readers, args.preload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Микробенчмарк предобработки для OCR (services.ocr.preprocessor) по этапам:
+прежняя реализация (цикл Оцу по 256 бинам на Python, таблица гаммы на каждый
+вызов, цепочка проходов PIL) против векторизованной. Для каждого этапа
+печатается медианное время, затем стоимость всех предобработанных вариантов
+чека (каждый кроп отдельно против одного прохода со срезами, см.
+preprocessor.ProcessedImage) и проверка совпадения результата. С --accuracy
+дополнительно сравнивается распознавание строки суммы (RapidOCR) на сетке размеров
+чека и шрифта: кроп, предобработанный отдельно, срез общего прохода без
+увеличения и ProcessedImage.crop.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_preprocess [--repeat 20] [--size 1000x1000] [--accuracy]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from services.ocr import preprocessor
+from services.ocr.layouts import get_layouts
+from benchmarks.reference_preprocess import (
+    reference_binarize, reference_contrast, reference_dilate, reference_preprocess, render_check,
+)
+
+
+def measure(func, arg, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def render_amount_row(size, font_size: int, box) -> Image.Image:
+    """Чек с суммой в регионе строки суммы"""
+    img = Image.new("RGB", size, "white")
+    x1, y1, x2, y2 = box
+    ImageDraw.Draw(img).text((x1 + 5, (y1 + y2 - font_size) // 2), "1 250.00 UAH", fill="black",
+                             font=ImageFont.load_default(size=font_size))
+    return img
+
+
+def accuracy():
+    """Доля распознанных строк суммы по способам предобработки кропа"""
+    from services.ocr import engine
+
+    def sliced(processed, box):
+        x1, y1, x2, y2 = (side * processed.scale for side in box)
+        return Image.fromarray(processed._binary[y1:y2, x1:x2])
+
+    methods = {
+        "кроп отдельно": lambda img, processed, box: preprocessor.preprocess_for_ocr(img.crop(box)),
+        "срез без увеличения": lambda img, processed, box: sliced(processed, box),
+        "ProcessedImage.crop": lambda img, processed, box: processed.crop(box),
+    }
+    hits = dict.fromkeys(methods, 0)
+    cases = [(size, font_size) for size in ((500, 1000), (720, 1560), (1000, 1000), (1080, 2340))
+             for font_size in (12, 18, 24, 32, 48)]
+    for size, font_size in cases:
+        box = get_layouts()["credit_agricole"].boxes(size)["amount_row1"]
+        img = render_amount_row(size, font_size, box)
+        processed = preprocessor.ProcessedImage(img)
+        for name, method in methods.items():
+            text = " ".join(token.text for token in engine.read_lines(method(img, processed, box)))
+            hits[name] += "1250.00" in text.replace(" ", "").replace(",", ".")
+
+    print(f"\nРаспознано строк суммы из {len(cases)}:")
+    for name, count in hits.items():
+        print(f"{name:<24} {count:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="повторов на этап")
+    parser.add_argument("--size", default="1000x1000", help="размер синтетического чека, ШxВ")
+    parser.add_argument("--accuracy", action="store_true", help="сравнить распознавание строки суммы (RapidOCR)")
+    args = parser.parse_args()
+
+    width, height = (int(side) for side in args.size.split("x"))
+    img = render_check(width, height)
+    gray = preprocessor._upscale(img).convert("L")
+    contrasted = preprocessor._normalize_contrast(gray)
+    sharpened = np.array(preprocessor._sharpen(contrasted))
+    binary = preprocessor._binarize(sharpened)
+
+    stages = (
+        ("upscale + L", lambda im: preprocessor._upscale(im).convert("L"), None, img),
+        ("equalize+autocontrast", preprocessor._normalize_contrast, reference_contrast, gray),
+        ("unsharp", preprocessor._sharpen, None, contrasted),
+        ("gamma+otsu+порог", preprocessor._binarize, reference_binarize, sharpened),
+        ("утолщение 3x3", preprocessor._min_filter3, reference_dilate, binary),
+        ("всего", preprocessor.preprocess_for_ocr, reference_preprocess, img),
+    )
+
+    print(f"Изображение {img.size[0]}x{img.size[1]}, после масштабирования {gray.size[0]}x{gray.size[1]}")
+    print(f"{'этап':<24} {'было, мс':>10} {'стало, мс':>10} {'ускорение':>10}")
+    for name, new, reference, arg in stages:
+        after = measure(new, arg, args.repeat)
+        before = measure(reference, arg, args.repeat) if reference else after
+        print(f"{name:<24} {before:>10.2f} {after:>10.2f} {before / after:>9.1f}x")
+
+    # Все предобработанные варианты одного чека: каждый кроп отдельно против одного прохода со срезами
+    boxes = get_layouts()["credit_agricole"].boxes(img.size).values()
+
+    def per_crop(im):
+        for crop in preprocessor.credit_agricole_crops(im) + [im]:
+            preprocessor.preprocess_for_ocr(crop)
+
+    def once(im, refine=False):
+        processed = preprocessor.ProcessedImage(im)
+        processed.full()
+        for box in boxes:
+            processed.crop(box, refine)
+
+    before = measure(per_crop, img, args.repeat)
+    for name, func in (("варианты: срезы", once), ("варианты: срезы+порог", lambda im: once(im, True))):
+        after = measure(func, img, args.repeat)
+        print(f"{name:<24} {before:>10.2f} {after:>10.2f} {before / after:>9.1f}x")
+
+    same = np.array_equal(np.array(preprocessor.preprocess_for_ocr(img)), np.array(reference_preprocess(img)))
+    print(f"Результат совпадает с прежним: {'да' if same else 'НЕТ'}")
+
+    if args.accuracy:
+        accuracy()
+
+
+if __name__ == "__main__":
+    main()
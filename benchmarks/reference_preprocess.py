@@ -0,0 +1,67 @@
+"""
+Эталонная (прежняя) предобработка для OCR: цикл Оцу по 256 бинам на Python,
+таблица гаммы на каждый вызов, цепочка проходов PIL. С ней сверяются
+benchmarks/bench_preprocess.py и тесты векторизованного services.ocr.preprocessor.
+"""
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+
+from services.ocr import preprocessor
+
+
+def reference_otsu(gray_array: np.ndarray) -> int:
+    """Прежний порог Оцу: перебор 256 порогов на Python"""
+    hist, _ = np.histogram(gray_array, bins=256, range=(0, 256))
+    total = gray_array.size
+    sum_total = np.dot(np.arange(256), hist)
+    sumB = wB = 0
+    varMax, thresh = 0.0, 127
+
+    for t in range(256):
+        wB += hist[t]
+        if wB == 0:
+            continue
+        wF = total - wB
+        if wF == 0:
+            break
+        sumB += t * hist[t]
+        mB = sumB / wB
+        mF = (sum_total - sumB) / wF
+        varBetween = wB * wF * (mB - mF) ** 2
+        if varBetween > varMax:
+            varMax = varBetween
+            thresh = t
+    return thresh
+
+
+def reference_contrast(gray: Image.Image) -> Image.Image:
+    return ImageOps.autocontrast(ImageOps.equalize(gray), cutoff=1)
+
+
+def reference_binarize(gray_array: np.ndarray) -> np.ndarray:
+    lut = [int((i / 255.0) ** 0.85 * 255) for i in range(256)]
+    np_gray = np.array(Image.fromarray(gray_array).point(lut))
+    return (np_gray > reference_otsu(np_gray)).astype(np.uint8) * 255
+
+
+def reference_dilate(binary: np.ndarray) -> Image.Image:
+    inverted = ImageOps.invert(Image.fromarray(binary))
+    return ImageOps.invert(inverted.filter(ImageFilter.MaxFilter(3)))
+
+
+def reference_preprocess(img: Image.Image) -> Image.Image:
+    """Прежний preprocess_for_ocr (эталон для проверки совпадения)"""
+    gray = preprocessor._upscale(img).convert("L")
+    gray = reference_contrast(gray)
+    gray = preprocessor._sharpen(gray)
+    return reference_dilate(reference_binarize(np.array(gray)))
+
+
+def render_check(width: int, height: int) -> Image.Image:
+    """Синтетический чек: несколько строк текста на неравномерном фоне"""
+    img = Image.new("RGB", (width, height), (235, 232, 225))
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=max(12, height // 25))
+    for row, text in enumerate(("Credit Agricole", "Suma 1480.50 UAH", "Komisiia 0.00 UAH", "01.02.2025 14:33")):
+        draw.text((width // 20, height // 8 + row * height // 6), text, fill=(40, 40, 60), font=font)
+    return img
@@ -15,7 +15,7 @@ from bot.ui.keyboards import (
 )
 from bot.states import SettingsStates
 from bot.middleware.auth import is_admin
-from core.database import update_setting, reset_all_data, get_statistics, get_settings_safe
+from core import ledger
 from services.alerts.emergency import stop_emergency_alerts, check_emergency_conditions
 from utils.logger import logger
 
@@ -28,9 +28,9 @@ async def handle_balance_callback(callback: CallbackQuery):
 
     try:
         await callback.message.edit_text(
-            format_balance_message(),
+            await format_balance_message(),
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
         await callback.answer("💰 Баланс обновлен")
     except Exception as e:
@@ -46,9 +46,9 @@ async def handle_statistics_callback(callback: CallbackQuery):
 
     try:
         await callback.message.edit_text(
-            format_statistics_message(),
+            await format_statistics_message(),
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer("📊 Статистика загружена")
     except Exception as e:
@@ -64,9 +64,9 @@ async def handle_settings_callback(callback: CallbackQuery):
 
     try:
         await callback.message.edit_text(
-            format_settings_info(),
+            await format_settings_info(),
             parse_mode="HTML",
-            reply_markup=create_settings_menu()
+            reply_markup=await create_settings_menu()
         )
         await callback.answer("⚙️ Настройки")
     except Exception as e:
@@ -80,7 +80,7 @@ async def handle_help_callback(callback: CallbackQuery):
         await callback.message.edit_text(
             format_help_message(),
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer("📖 Справка")
     except Exception as e:
@@ -96,9 +96,9 @@ async def handle_status_callback(callback: CallbackQuery):
 
     try:
         await callback.message.edit_text(
-            format_system_status(),
+            await format_system_status(),
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer("🛠️ Статус системы")
     except Exception as e:
@@ -113,10 +113,10 @@ async def handle_toggle_emergency(callback: CallbackQuery):
         return
 
     try:
-        _, _, _, _, current_state = get_settings_safe()
+        _, _, _, _, current_state = await ledger.get_settings_safe()
         new_state = not current_state
 
-        update_setting("emergency_enabled", int(new_state))
+        await ledger.update_setting("emergency_enabled", int(new_state))
 
         if not new_state:
             await stop_emergency_alerts()
@@ -129,7 +129,7 @@ async def handle_toggle_emergency(callback: CallbackQuery):
         await callback.message.edit_text(
             f"🚨 <b>СИСТЕМА ТРЕВОГ</b>\n\n{status_text}\n\nВернуться в главное меню?",
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer(status_text)
 
@@ -146,9 +146,9 @@ async def handle_reset_confirm_callback(callback: CallbackQuery):
 
     try:
         await callback.message.edit_text(
-            format_reset_confirmation(),
+            await format_reset_confirmation(),
             parse_mode="HTML",
-            reply_markup=create_reset_confirmation()
+            reply_markup=await create_reset_confirmation()
         )
         await callback.answer("⚠️ Подтвердите сброс")
     except Exception as e:
@@ -163,7 +163,7 @@ async def handle_confirm_reset(callback: CallbackQuery):
         return
 
     try:
-        reset_all_data()
+        await ledger.reset_all_data()
         await stop_emergency_alerts()
 
         await callback.message.edit_text(
@@ -174,7 +174,7 @@ async def handle_confirm_reset(callback: CallbackQuery):
             "• Тревоги остановлены\n\n"
             "Система готова к работе.",
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer("🔄 Данные сброшены")
         logger.info("✅ Выполнен ручной сброс данных")
@@ -192,7 +192,7 @@ async def handle_back_to_main(callback: CallbackQuery):
         await callback.message.edit_text(
             welcome_text,
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
         await callback.answer("🏠 Главное меню")
     except Exception as e:
@@ -209,13 +209,13 @@ async def handle_set_time_callback(callback: CallbackQuery):
         return
 
     try:
-        current_time, _, _, _, _ = get_settings_safe()
+        current_time, _, _, _, _ = await ledger.get_settings_safe()
         current_text = f"Текущее время: <code>{current_time or 'не задано'}</code>"
 
         await callback.message.edit_text(
             f"⏰ <b>ВРЕМЯ АВТОСБРОСА</b>\n\n{current_text}\n\nВыберите время или введите вручную:",
             parse_mode="HTML",
-            reply_markup=create_time_quick_set()
+            reply_markup=await create_time_quick_set()
         )
         await callback.answer("⏰ Настройка времени")
     except Exception as e:
@@ -231,12 +231,12 @@ async def handle_quick_time(callback: CallbackQuery):
 
     try:
         time_value = callback.data.split("_")[-1]  # извлекаем время из callback_data
-        update_setting("auto_reset_time", time_value)
+        await ledger.update_setting("auto_reset_time", time_value)
 
         await callback.message.edit_text(
             f"✅ <b>ВРЕМЯ ОБНОВЛЕНО</b>\n\n⏰ Автосброс: <code>{time_value}</code>\n\nВремя по Киеву",
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer(f"⏰ Время установлено: {time_value}")
 
@@ -258,7 +258,7 @@ async def handle_manual_time_input(callback: CallbackQuery, state: FSMContext):
         "Примеры: <code>06:00</code>, <code>18:30</code>, <code>23:59</code>\n\n"
         "Время указывается по Киеву.",
         parse_mode="HTML",
-        reply_markup=create_back_to_main()
+        reply_markup=await create_back_to_main()
     )
     await callback.answer("✏️ Введите время")
 
@@ -272,7 +272,7 @@ async def handle_emergency_settings(callback: CallbackQuery):
         return
 
     try:
-        _, critical_checks, critical_balance, _, emergency_enabled = get_settings_safe()
+        _, critical_checks, critical_balance, _, emergency_enabled = await ledger.get_settings_safe()
         status = "🟢 Включена" if emergency_enabled else "🔴 Отключена"
 
         await callback.message.edit_text(
@@ -281,7 +281,7 @@ async def handle_emergency_settings(callback: CallbackQuery):
             f"Лимит выводов: <code>{critical_checks}</code>\n"
             f"Критический баланс: <code>{critical_balance:.2f} ₴</code>",
             parse_mode="HTML",
-            reply_markup=create_emergency_settings_menu()
+            reply_markup=await create_emergency_settings_menu()
         )
         await callback.answer("🚨 Настройки тревог")
     except Exception as e:
@@ -326,7 +326,7 @@ async def handle_export_data(callback: CallbackQuery):
         await callback.message.edit_text(
             "📋 <b>ЭКСПОРТ ДАННЫХ</b>\n\nВыберите тип данных для экспорта:",
             parse_mode="HTML",
-            reply_markup=create_export_menu()
+            reply_markup=await create_export_menu()
         )
         await callback.answer("📋 Экспорт данных")
     except Exception as e:
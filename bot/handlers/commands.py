@@ -49,7 +49,7 @@ async def handle_start_command(message: Message):
     await message.answer(
         welcome_text,
         parse_mode="HTML",
-        reply_markup=create_main_menu()
+        reply_markup=await create_main_menu()
     )
     logger.info(f"Пользователь {message.from_user.id} запустил бота")
 
@@ -61,9 +61,9 @@ async def handle_balance_command(message: Message):
         return
 
     await message.answer(
-        format_balance_message(),
+        await format_balance_message(),
         parse_mode="HTML",
-        reply_markup=create_main_menu()
+        reply_markup=await create_main_menu()
     )
 
 
@@ -72,7 +72,7 @@ async def handle_help_command(message: Message):
     await message.answer(
         format_help_message(),
         parse_mode="HTML",
-        reply_markup=create_main_menu()
+        reply_markup=await create_main_menu()
     )
 
 
@@ -84,9 +84,9 @@ async def handle_stats_command(message: Message):
 
     from bot.ui.messages import format_statistics_message
     await message.answer(
-        format_statistics_message(),
+        await format_statistics_message(),
         parse_mode="HTML",
-        reply_markup=create_main_menu()
+        reply_markup=await create_main_menu()
     )
 
 
@@ -100,9 +100,9 @@ async def handle_reset_command(message: Message):
     from bot.ui.messages import format_reset_confirmation
 
     await message.answer(
-        format_reset_confirmation(),
+        await format_reset_confirmation(),
         parse_mode="HTML",
-        reply_markup=create_reset_confirmation()
+        reply_markup=await create_reset_confirmation()
     )
 
 
@@ -116,9 +116,9 @@ async def handle_settings_command(message: Message):
     from bot.ui.keyboards import create_settings_menu
 
     await message.answer(
-        format_settings_info(),
+        await format_settings_info(),
         parse_mode="HTML",
-        reply_markup=create_settings_menu()
+        reply_markup=await create_settings_menu()
     )
 
 
@@ -131,9 +131,9 @@ async def handle_status_command(message: Message):
     from bot.ui.messages import format_system_status
 
     await message.answer(
-        format_system_status(),
+        await format_system_status(),
         parse_mode="HTML",
-        reply_markup=create_main_menu()
+        reply_markup=await create_main_menu()
     )
 
 
@@ -144,7 +144,7 @@ async def handle_emergency_command(message: Message):
         return
 
     from services.alerts.emergency import get_emergency_status
-    status = get_emergency_status()
+    status = await get_emergency_status()
 
     if status['active']:
         from bot.ui.keyboards import create_alert_control_menu
@@ -159,7 +159,7 @@ async def handle_emergency_command(message: Message):
         keyboard = create_alert_control_menu()
     else:
         text = "🟢 Система тревог в режиме ожидания"
-        keyboard = create_main_menu()
+        keyboard = await create_main_menu()
 
     await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
 
@@ -175,7 +175,7 @@ async def handle_export_command(message: Message):
     await message.answer(
         "📤 <b>Быстрый экспорт данных</b>\n\nВыберите формат:",
         parse_mode="HTML",
-        reply_markup=create_export_menu()
+        reply_markup=await create_export_menu()
     )
 
 
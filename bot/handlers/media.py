@@ -1,14 +1,55 @@
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 from aiogram import Bot
 import asyncio
 
+from services.ocr import cache as ocr_cache
 from services.ocr.processor import process_check_image_aiogram
-from core.database import add_check, save_check_screenshot, get_balance
-from bot.ui.keyboards import create_main_menu
+from services.ocr.resolution import choose_photo_size
+from core import ledger
+from core.models import LedgerSnapshot
+from bot.ui.keyboards import create_main_menu, create_check_processing_menu
 from bot.middleware.auth import is_admin
 from utils.logger import logger
 
 
+def format_check_added(amount: float, snapshot: LedgerSnapshot) -> str:
+    """Сообщение о добавленном чеке; итоги берутся из снимка транзакции"""
+    return f"""
+✅ <b>ЧЕК ДОБАВЛЕН</b>
+
+🧾 Сумма: <code>{amount:.2f} ₴</code>
+💰 Новый баланс: <code>{snapshot.balance:,.2f} ₴</code>
+📊 Изменение: <code>{-amount:,.2f} ₴</code>
+
+📈 Всего чеков: <code>{snapshot.checks:.2f} ₴</code>
+🔍 OCR: Распознано успешно
+"""
+
+
+def format_check_not_recognized(full_text: str) -> str:
+    """Сообщение о нераспознанной сумме с текстом OCR"""
+    # Обрезаем текст OCR для отображения
+    display_text = (full_text[:500] + "...") if full_text and len(full_text) > 500 else (
+                full_text or "Текст не распознан")
+
+    return f"""
+⚠️ <b>СУММА НЕ РАСПОЗНАНА</b>
+
+🔍 <b>Распознанный текст:</b>
+<pre>{display_text}</pre>
+
+💡 <b>Возможные причины:</b>
+• Нечеткое изображение
+• Сумма написана нестандартно
+• Помехи на фото
+
+<b>Рекомендации:</b>
+• Сделайте более четкое фото
+• Убедитесь, что сумма хорошо видна
+• Попробуйте другой ракурс
+"""
+
+
 async def handle_check_private(message: Message, bot: Bot):
     """Обработка изображений чеков в приватном чате"""
     if not is_admin(message.from_user.id):
@@ -17,10 +58,14 @@ async def handle_check_private(message: Message, bot: Bot):
 
     # Определяем тип медиафайла
     if message.photo:
-        file_id = message.photo[-1].file_id  # Берем самое большое качество
+        # Наименьший размер, на котором текст чека достаточно крупный для OCR
+        photo = choose_photo_size(message.photo, lambda size: (size.width, size.height))
+        file_id = photo.file_id
+        file_unique_id = photo.file_unique_id
         file_type = "фото"
     elif message.document and message.document.mime_type and message.document.mime_type.startswith('image/'):
         file_id = message.document.file_id
+        file_unique_id = message.document.file_unique_id
         file_type = "изображение"
     else:
         await message.answer(
@@ -40,70 +85,35 @@ async def handle_check_private(message: Message, bot: Bot):
 
     try:
         # Обрабатываем изображение через OCR
-        amount, full_text = await process_check_image_aiogram(bot, file_id)
-
-        # Получаем текущий баланс для отображения
-        incoming, checks, _ = get_balance()
-        current_balance = incoming - checks
+        ocr_result = await process_check_image_aiogram(bot, file_id, file_unique_id)
+        amount, full_text = ocr_result.amount, ocr_result.text
 
         if amount and amount > 0:
-            # Успешно распознали сумму
-            add_check(amount)
-            save_check_screenshot(file_id, amount, full_text or "")
-
-            # Обновляем баланс после добавления чека
-            new_incoming, new_checks, _ = get_balance()
-            new_balance = new_incoming - new_checks
-            balance_change = new_balance - current_balance
-
-            success_text = f"""
-✅ <b>ЧЕК ДОБАВЛЕН</b>
-
-🧾 Сумма: <code>{amount:.2f} ₴</code>
-💰 Новый баланс: <code>{new_balance:,.2f} ₴</code>
-📊 Изменение: <code>{balance_change:,.2f} ₴</code>
-
-📈 Всего чеков: <code>{new_checks:.2f} ₴</code>
-🔍 OCR: Распознано успешно
-"""
+            # Успешно распознали сумму; итоги берем из снимка транзакции без повторного чтения
+            snapshot = await ledger.add_check(amount, message.chat.id, message.message_id)
+            if snapshot is None:
+                raise RuntimeError("чек не записан в базу данных")
+            await ledger.save_check_screenshot(file_id, amount, full_text or "", message.chat.id, message.message_id,
+                                               ocr_result.image_sha256)
 
             await processing_msg.edit_text(
-                success_text,
+                format_check_added(amount, snapshot),
                 parse_mode="HTML",
-                reply_markup=create_main_menu()
+                reply_markup=await create_main_menu()
             )
 
             logger.info(f"✅ Чек добавлен: {amount:.2f} ₴ (файл: {file_id})")
 
         else:
             # Не удалось распознать сумму
-            save_check_screenshot(file_id, 0, full_text or "Ошибка OCR")
-
-            # Обрезаем текст OCR для отображения
-            display_text = (full_text[:500] + "...") if full_text and len(full_text) > 500 else (
-                        full_text or "Текст не распознан")
-
-            error_text = f"""
-⚠️ <b>СУММА НЕ РАСПОЗНАНА</b>
-
-🔍 <b>Распознанный текст:</b>
-<pre>{display_text}</pre>
-
-💡 <b>Возможные причины:</b>
-• Нечеткое изображение
-• Сумма написана нестандартно
-• Помехи на фото
-
-<b>Рекомендации:</b>
-• Сделайте более четкое фото
-• Убедитесь, что сумма хорошо видна
-• Попробуйте другой ракурс
-"""
+            await ledger.save_check_screenshot(file_id, 0, full_text or "Ошибка OCR", message.chat.id,
+                                               message.message_id, ocr_result.image_sha256)
 
+            # Сообщение — ответ на чек: по нему «Повторить распознавание» найдет скриншот
             await processing_msg.edit_text(
-                error_text,
+                format_check_not_recognized(full_text),
                 parse_mode="HTML",
-                reply_markup=create_main_menu()
+                reply_markup=create_check_processing_menu()
             )
 
             logger.warning(f"⚠️ Чек не распознан (файл: {file_id})")
@@ -123,17 +133,71 @@ async def handle_check_private(message: Message, bot: Bot):
 Попробуйте еще раз или обратитесь к администратору.
 """,
                 parse_mode="HTML",
-                reply_markup=create_main_menu()
+                reply_markup=await create_main_menu()
             )
         except:
             # Если не удается отредактировать, отправляем новое сообщение
             await message.answer(
                 f"❌ <b>Критическая ошибка обработки</b>\n\n{error_msg}",
                 parse_mode="HTML",
-                reply_markup=create_main_menu()
+                reply_markup=await create_main_menu()
             )
 
 
+async def handle_retry_ocr(callback: CallbackQuery):
+    """Повторное распознавание чека по изображению из локального хранилища, без скачивания"""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("⛔ Доступ запрещен", show_alert=True)
+        return
+
+    source = callback.message.reply_to_message
+    screenshot = await ledger.get_screenshot_image(source.chat.id, source.message_id) if source else None
+    if not screenshot or not screenshot[1]:
+        await callback.answer("⚠️ Изображение чека не сохранено, отправьте его заново", show_alert=True)
+        return
+
+    file_id, image_sha256 = screenshot
+    await callback.answer("🔄 Повторное распознавание...")
+    try:
+        ocr_result = await ocr_cache.recognize_stored(image_sha256)
+        if ocr_result is None:
+            await callback.message.edit_text(
+                "⚠️ <b>Изображение чека вытеснено из хранилища</b>\n\nОтправьте чек заново.",
+                parse_mode="HTML",
+                reply_markup=await create_main_menu()
+            )
+            return
+
+        amount, full_text = ocr_result.amount, ocr_result.text
+        if amount and amount > 0:
+            snapshot = await ledger.add_check(amount, source.chat.id, source.message_id)
+            if snapshot is None:
+                raise RuntimeError("чек не записан в базу данных")
+            await ledger.save_check_screenshot(file_id, amount, full_text or "", source.chat.id, source.message_id,
+                                               image_sha256)
+            await callback.message.edit_text(
+                format_check_added(amount, snapshot),
+                parse_mode="HTML",
+                reply_markup=await create_main_menu()
+            )
+            logger.info(f"✅ Чек добавлен после повторного OCR: {amount:.2f} ₴ (файл: {file_id})")
+        else:
+            await callback.message.edit_text(
+                format_check_not_recognized(full_text),
+                parse_mode="HTML",
+                reply_markup=create_check_processing_menu()
+            )
+            logger.warning(f"⚠️ Чек не распознан повторно (файл: {file_id})")
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка повторного распознавания: {e}")
+        await callback.message.answer(
+            f"❌ <b>Ошибка повторного распознавания</b>\n\n<code>{str(e)}</code>",
+            parse_mode="HTML",
+            reply_markup=await create_main_menu()
+        )
+
+
 async def handle_document_private(message: Message, bot: Bot):
     """Обработка документов (расширенная проверка)"""
     if not is_admin(message.from_user.id):
@@ -251,4 +315,7 @@ def setup_media_handlers(dp):
     dp.message.register(
         handle_sticker_private,
         lambda m: m.chat.type == "private" and is_admin(m.from_user.id) and m.sticker
-    )
\ No newline at end of file
+    )
+
+    # Повторное распознавание нераспознанного чека
+    dp.callback_query.register(handle_retry_ocr, lambda c: c.data == "retry_ocr")
\ No newline at end of file
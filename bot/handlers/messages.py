@@ -1,6 +1,6 @@
 from aiogram.types import Message
 from services.banking.parser import extract_bank_payment
-from core.database import add_income, get_balance
+from core import ledger
 from bot.ui.keyboards import create_main_menu
 from bot.middleware.auth import is_admin
 
@@ -10,13 +10,15 @@ async def handle_private_text_message(message: Message):
 
     amount = extract_bank_payment(message.text)
     if amount is not None:
-        add_income(amount)
-        incoming, _, _ = get_balance()
+        snapshot = await ledger.add_income(amount, message.chat.id, message.message_id)
+        if snapshot is None:
+            await message.reply(f"❌ Пополнение {amount:.2f} UAH не записано")
+            return
         await message.reply(
             f"✅ Пополнение {amount:.2f} UAH\n"
-            f"💰 Всего: {incoming:.2f} UAH",
+            f"💰 Всего: {snapshot.incoming:.2f} UAH",
             parse_mode="HTML"
         )
         return
 
-    await message.reply("❓ Не удалось распознать сообщение", reply_markup=create_main_menu())
+    await message.reply("❓ Не удалось распознать сообщение", reply_markup=await create_main_menu())
@@ -5,7 +5,7 @@ import re
 
 from bot.states import SettingsStates
 from bot.ui.keyboards import create_main_menu, create_back_to_main
-from core.database import update_setting, get_statistics
+from core import ledger
 from bot.middleware.auth import is_admin
 from utils.logger import logger
 
@@ -30,7 +30,7 @@ async def handle_time_input(message: Message, state: FSMContext):
         return
 
     try:
-        update_setting("auto_reset_time", time_text)
+        await ledger.update_setting("auto_reset_time", time_text)
         await state.clear()
 
         await message.answer(
@@ -38,7 +38,7 @@ async def handle_time_input(message: Message, state: FSMContext):
             f"⏰ Автосброс: <code>{time_text}</code> (Киев)\n\n"
             f"Система будет автоматически сбрасывать данные каждый день в указанное время.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
         logger.info(f"Время автосброса установлено: {time_text}")
 
@@ -47,7 +47,7 @@ async def handle_time_input(message: Message, state: FSMContext):
         await message.answer(
             "❌ <b>Ошибка сохранения</b>\n\nПопробуйте еще раз или обратитесь к администратору.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
 
 
@@ -67,7 +67,7 @@ async def handle_checks_limit_input(message: Message, state: FSMContext):
             )
             return
 
-        update_setting("critical_checks_count", limit)
+        await ledger.update_setting("critical_checks_count", limit)
         await state.clear()
 
         await message.answer(
@@ -75,7 +75,7 @@ async def handle_checks_limit_input(message: Message, state: FSMContext):
             f"📋 Критическое количество выводов: <code>{limit}</code>\n\n"
             f"Тревога будет активироваться при {limit} выводах подряд без чеков.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
         logger.info(f"Лимит выводов установлен: {limit}")
 
@@ -90,7 +90,7 @@ async def handle_checks_limit_input(message: Message, state: FSMContext):
         await message.answer(
             "❌ <b>Ошибка сохранения</b>\n\nПопробуйте еще раз.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
 
 
@@ -112,7 +112,7 @@ async def handle_balance_limit_input(message: Message, state: FSMContext):
             )
             # Можно добавить подтверждение, пока просто продолжаем
 
-        update_setting("critical_balance_amount", balance)
+        await ledger.update_setting("critical_balance_amount", balance)
         await state.clear()
 
         symbol = "+" if balance >= 0 else ""
@@ -121,7 +121,7 @@ async def handle_balance_limit_input(message: Message, state: FSMContext):
             f"💸 Критический баланс: <code>{symbol}{balance:.2f} ₴</code>\n\n"
             f"Тревога будет активироваться при достижении этого значения.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
         logger.info(f"Критический баланс установлен: {balance}")
 
@@ -136,7 +136,7 @@ async def handle_balance_limit_input(message: Message, state: FSMContext):
         await message.answer(
             "❌ <b>Ошибка сохранения</b>\n\nПопробуйте еще раз.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
 
 
@@ -156,7 +156,7 @@ async def handle_alert_rate_input(message: Message, state: FSMContext):
             )
             return
 
-        update_setting("alert_messages_per_minute", rate)
+        await ledger.update_setting("alert_messages_per_minute", rate)
         await state.clear()
 
         interval = 60 / rate
@@ -166,7 +166,7 @@ async def handle_alert_rate_input(message: Message, state: FSMContext):
             f"⏱️ Интервал: <code>{interval:.1f}</code> секунд\n\n"
             f"Тревожные сообщения будут отправляться с указанной частотой.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
         logger.info(f"Частота уведомлений установлена: {rate}/мин")
 
@@ -181,7 +181,7 @@ async def handle_alert_rate_input(message: Message, state: FSMContext):
         await message.answer(
             "❌ <b>Ошибка сохранения</b>\n\nПопробуйте еще раз.",
             parse_mode="HTML",
-            reply_markup=create_main_menu()
+            reply_markup=await create_main_menu()
         )
 
 
@@ -195,13 +195,13 @@ async def handle_quick_limits(callback: CallbackQuery):
 
     try:
         limit = int(callback.data.split("_")[-1])
-        update_setting("critical_checks_count", limit)
+        await ledger.update_setting("critical_checks_count", limit)
 
         await callback.message.edit_text(
             f"✅ <b>ЛИМИТ УСТАНОВЛЕН</b>\n\n"
             f"📋 Критическое количество выводов: <code>{limit}</code>",
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer(f"📋 Лимит: {limit} выводов")
 
@@ -218,13 +218,13 @@ async def handle_quick_balance(callback: CallbackQuery):
 
     try:
         balance = float(callback.data.split("_")[-1])
-        update_setting("critical_balance_amount", balance)
+        await ledger.update_setting("critical_balance_amount", balance)
 
         await callback.message.edit_text(
             f"✅ <b>БАЛАНС УСТАНОВЛЕН</b>\n\n"
             f"💸 Критический баланс: <code>{balance:.0f} ₴</code>",
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer(f"💸 Баланс: {balance:.0f} ₴")
 
@@ -241,7 +241,7 @@ async def handle_quick_rate(callback: CallbackQuery):
 
     try:
         rate = int(callback.data.split("_")[-1])
-        update_setting("alert_messages_per_minute", rate)
+        await ledger.update_setting("alert_messages_per_minute", rate)
 
         interval = 60 / rate
         await callback.message.edit_text(
@@ -249,7 +249,7 @@ async def handle_quick_rate(callback: CallbackQuery):
             f"📢 Уведомлений: <code>{rate}</code>/мин\n"
             f"⏱️ Интервал: <code>{interval:.1f}</code> сек",
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer(f"📢 Частота: {rate}/мин")
 
@@ -273,7 +273,7 @@ async def handle_manual_limits_input(callback: CallbackQuery, state: FSMContext)
         "Диапазон: <code>1-100</code>\n"
         "Рекомендуется: <code>3-10</code>",
         parse_mode="HTML",
-        reply_markup=create_back_to_main()
+        reply_markup=await create_back_to_main()
     )
     await callback.answer("✏️ Введите лимит выводов")
 
@@ -293,7 +293,7 @@ async def handle_manual_balance_input(callback: CallbackQuery, state: FSMContext
         "• <code>0</code> - тревога при положительном балансе\n"
         "• <code>5000</code> - тревога при балансе ≥ 5000₴",
         parse_mode="HTML",
-        reply_markup=create_back_to_main()
+        reply_markup=await create_back_to_main()
     )
     await callback.answer("✏️ Введите критический баланс")
 
@@ -312,7 +312,7 @@ async def handle_manual_rate_input(callback: CallbackQuery, state: FSMContext):
         "Рекомендуется: <code>3-10</code>\n\n"
         "⚠️ Слишком высокая частота может привести к спаму!",
         parse_mode="HTML",
-        reply_markup=create_back_to_main()
+        reply_markup=await create_back_to_main()
     )
     await callback.answer("✏️ Введите частоту уведомлений")
 
@@ -326,7 +326,7 @@ async def handle_export_stats(callback: CallbackQuery):
         return
 
     try:
-        stats = get_statistics()
+        stats = await ledger.get_statistics()
 
         export_data = f"""СТАТИСТИКА СИСТЕМЫ
 {'=' * 40}
@@ -347,7 +347,7 @@ async def handle_export_stats(callback: CallbackQuery):
         await callback.message.edit_text(
             message_text,
             parse_mode="HTML",
-            reply_markup=create_back_to_main()
+            reply_markup=await create_back_to_main()
         )
         await callback.answer("📊 Статистика экспортирована")
 
@@ -392,15 +392,14 @@ async def callback_with_quick_rate_menu(callback: CallbackQuery):
         return
 
     try:
-        from core.database import get_settings_safe
-        _, _, _, current_rate, _ = get_settings_safe()
+        _, _, _, current_rate, _ = await ledger.get_settings_safe()
 
         await callback.message.edit_text(
             f"📢 <b>ЧАСТОТА УВЕДОМЛЕНИЙ</b>\n\n"
             f"Текущая частота: <code>{current_rate}</code> сообщ./мин\n\n"
             f"Выберите новое значение или введите вручную:",
             parse_mode="HTML",
-            reply_markup=create_alert_rate_quick_set()
+            reply_markup=await create_alert_rate_quick_set()
         )
         await callback.answer("📢 Настройка частоты")
     except Exception as e:
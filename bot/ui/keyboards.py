@@ -1,12 +1,12 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from core.database import get_settings_safe, get_balance, withdrawals_without_check
+from core import ledger
 
 
-def create_main_menu():
+async def create_main_menu():
     """Главное меню с современным дизайном и эмодзи-индикаторами"""
-    _, _, _, _, emergency_enabled = get_settings_safe()
-    incoming, checks, _ = get_balance()
-    balance = incoming - checks
+    _, _, _, _, emergency_enabled = await ledger.get_settings_safe()
+    snapshot = await ledger.get_snapshot()
+    balance = snapshot.balance
 
     # Динамические эмодзи для статуса
     emergency_emoji = "🟢" if emergency_enabled else "🔴"
@@ -21,7 +21,7 @@ def create_main_menu():
         balance_indicator = "💔"
 
     # Индикатор выводов
-    withdrawal_indicator = "🔴" if withdrawals_without_check >= 3 else "🟢"
+    withdrawal_indicator = "🔴" if snapshot.open_withdrawals >= 3 else "🟢"
 
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -73,9 +73,9 @@ def create_main_menu():
     ])
 
 
-def create_settings_menu():
+async def create_settings_menu():
     """Меню настроек с группировкой по категориям"""
-    auto_reset_time, critical_checks, critical_balance, alert_rate, emergency_enabled = get_settings_safe()
+    auto_reset_time, critical_checks, critical_balance, alert_rate, emergency_enabled = await ledger.get_settings_safe()
 
     # Индикаторы настроек
     time_indicator = "✅" if auto_reset_time else "⚠️"
@@ -133,9 +133,9 @@ def create_settings_menu():
     ])
 
 
-def create_emergency_settings_menu():
+async def create_emergency_settings_menu():
     """Детальное меню настроек тревог"""
-    _, critical_checks, critical_balance, alert_rate, emergency_enabled = get_settings_safe()
+    _, critical_checks, critical_balance, alert_rate, emergency_enabled = await ledger.get_settings_safe()
 
     status = "🟢 Активна" if emergency_enabled else "🔴 Отключена"
 
@@ -241,10 +241,9 @@ def create_emergency_settings_menu():
     ])
 
 
-def create_reset_confirmation():
+async def create_reset_confirmation():
     """Подтверждение сброса с визуальным предупреждением"""
-    from core.database import get_statistics
-    stats = get_statistics()
+    stats = await ledger.get_statistics()
 
     # Показываем что будет удалено
     data_size = stats['income_count'] + stats['check_count'] + stats['withdrawal_count']
@@ -271,9 +270,9 @@ def create_reset_confirmation():
     ])
 
 
-def create_back_to_main():
+async def create_back_to_main():
     """Кнопка возврата с контекстной информацией"""
-    incoming, checks, _ = get_balance()
+    incoming, checks, _ = await ledger.get_balance()
     balance = incoming - checks
 
     balance_emoji = "💚" if balance >= 0 else "💔"
@@ -345,9 +344,9 @@ def create_pagination_keyboard(current_page: int, total_pages: int, callback_pre
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def create_time_quick_set():
+async def create_time_quick_set():
     """Быстрые пресеты времени с визуальными подсказками"""
-    current_time, _, _, _, _ = get_settings_safe()
+    current_time, _, _, _, _ = await ledger.get_settings_safe()
 
     # Визуальные индикаторы времени суток
     times = [
@@ -379,9 +378,9 @@ def create_time_quick_set():
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def create_limits_quick_set():
+async def create_limits_quick_set():
     """Пресеты лимитов с описаниями"""
-    current_limit, _, _, _, _ = get_settings_safe()
+    current_limit, _, _, _, _ = await ledger.get_settings_safe()
     current_limit = current_limit or 5
 
     presets = [
@@ -409,9 +408,9 @@ def create_limits_quick_set():
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def create_balance_limits_quick_set():
+async def create_balance_limits_quick_set():
     """Пресеты критического баланса с визуализацией"""
-    _, _, current_balance, _, _ = get_settings_safe()
+    _, _, current_balance, _, _ = await ledger.get_settings_safe()
 
     presets = [
         (-100, "💚", "Минимальный риск"),
@@ -439,9 +438,9 @@ def create_balance_limits_quick_set():
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def create_alert_rate_quick_set():
+async def create_alert_rate_quick_set():
     """Пресеты частоты уведомлений с визуальным отображением скорости"""
-    _, _, _, current_rate, _ = get_settings_safe()
+    _, _, _, current_rate, _ = await ledger.get_settings_safe()
 
     presets = [
         (1, "🐌", "Очень медленно", "1 сообщение в минуту"),
@@ -471,10 +470,9 @@ def create_alert_rate_quick_set():
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def create_export_menu():
+async def create_export_menu():
     """Меню экспорта с иконками форматов"""
-    from core.database import get_statistics
-    stats = get_statistics()
+    stats = await ledger.get_statistics()
 
     # Показываем объем данных
     total_records = stats['income_count'] + stats['check_count'] + stats['withdrawal_count']
@@ -505,11 +503,10 @@ def create_export_menu():
 
 
 def create_check_processing_menu():
-    """Меню обработки чека с опциями"""
+    """Меню нераспознанного чека"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="🔄 Повторить распознавание", callback_data="retry_ocr"),
-            InlineKeyboardButton(text="✏️ Ввести вручную", callback_data="manual_amount_input")
+            InlineKeyboardButton(text="🔄 Повторить распознавание", callback_data="retry_ocr")
         ],
         [
             InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main")
@@ -517,9 +514,9 @@ def create_check_processing_menu():
     ])
 
 
-def create_set_checks_limit_menu():
+async def create_set_checks_limit_menu():
     """Меню установки лимита выводов"""
-    _, current_limit, _, _, _ = get_settings_safe()
+    _, current_limit, _, _, _ = await ledger.get_settings_safe()
 
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -544,9 +541,9 @@ def create_set_checks_limit_menu():
     ])
 
 
-def create_set_balance_limit_menu():
+async def create_set_balance_limit_menu():
     """Меню установки критического баланса"""
-    _, _, current_balance, _, _ = get_settings_safe()
+    _, _, current_balance, _, _ = await ledger.get_settings_safe()
 
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -1,13 +1,15 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
 import pytz
-from core.database import get_balance, withdrawals_without_check, get_settings_safe, get_statistics
+from core import ledger
 from services.alerts.emergency import emergency_task
 
 
-def format_balance_message():
+async def format_balance_message():
     """Форматирует сообщение с балансом"""
-    incoming, checks, max_balance = get_balance()
-    balance = incoming - checks
+    snapshot = await ledger.get_snapshot()
+    incoming, checks, max_balance = snapshot.incoming, snapshot.checks, snapshot.max_balance
+    balance = snapshot.balance
 
     # Эмодзи статуса баланса
     if balance > 1000:
@@ -38,7 +40,7 @@ def format_balance_message():
 
 💵 Пополнения: <code>{incoming:,.2f} ₴</code>
 🧾 Расходы: <code>{checks:,.2f} ₴</code>
-📊 Выводов без чеков: <code>{withdrawals_without_check}</code>
+📊 Выводов без чеков: <code>{snapshot.open_withdrawals}</code>
 
 {status_emoji} <b>Баланс: {balance:,.2f} ₴</b>
 {balance_bar}
@@ -49,9 +51,11 @@ def format_balance_message():
 """
 
 
-def format_statistics_message():
+async def format_statistics_message():
     """Форматирует подробную статистику"""
-    stats = get_statistics()
+    stats = await ledger.get_statistics()
+    now = datetime.now(pytz.timezone('Europe/Kiev'))
+    hour = await ledger.get_rollups(now - timedelta(hours=1), now)
 
     # Процентные показатели
     efficiency = (stats['checks'] / max(stats['incoming'], 1)) * 100 if stats['incoming'] > 0 else 0
@@ -82,6 +86,10 @@ def format_statistics_message():
 ├ Средний чек: <code>{stats['avg_check']:,.2f} ₴</code>
 └ Незакрытых выводов: <code>{stats['withdrawals_without_check']}</code>
 
+⏱ <b>За последний час:</b>
+├ Пополнений: <code>{hour['income'].count}</code> на <code>{hour['income'].total:,.2f} ₴</code>
+└ Чеков: <code>{hour['check'].count}</code> на <code>{hour['check'].total:,.2f} ₴</code>
+
 {eff_emoji} <b>Эффективность расходов:</b> {efficiency:.1f}%
 📊 <b>Использование лимита:</b> {balance_ratio:.1f}%
 
@@ -89,9 +97,9 @@ def format_statistics_message():
 """
 
 
-def format_settings_info():
+async def format_settings_info():
     """Форматирует информацию о настройках"""
-    auto_reset_time, critical_checks, critical_balance, alert_rate, emergency_enabled = get_settings_safe()
+    auto_reset_time, critical_checks, critical_balance, alert_rate, emergency_enabled = await ledger.get_settings_safe()
 
     enabled_status = "🟢 Включена" if emergency_enabled else "🔴 Отключена"
     reset_time_display = f"🕐 {auto_reset_time}" if auto_reset_time else "⚠️ Не задано"
@@ -154,19 +162,18 @@ def format_help_message():
 """
 
 
-def format_system_status():
+async def format_system_status():
     """Статус системы"""
-    incoming, checks, _ = get_balance()
+    incoming, checks, _ = await ledger.get_balance()
     balance = incoming - checks
-    _, _, _, _, emergency_enabled = get_settings_safe()
+    _, _, _, _, emergency_enabled = await ledger.get_settings_safe()
 
     # Статус компонентов
     components = []
 
     # База данных
     try:
-        from core.database import get_balance
-        get_balance()
+        await ledger.get_balance()
         components.append("🟢 База данных: Работает")
     except:
         components.append("🔴 База данных: Ошибка")
@@ -192,17 +199,48 @@ def format_system_status():
 
     # OCR система
     try:
-        from services.ocr.processor import rapid_ocr
-        if rapid_ocr:
-            components.append("🟢 OCR: Готов")
-        else:
-            components.append("🔴 OCR: Ошибка")
+        from services.ocr import engine as ocr_engine
+        from services.ocr import cache as ocr_cache
+        components.append(f"🟢 OCR: Готов ({ocr_engine.describe()})")
+        stages = ocr_engine.describe_stages()
+        if stages:
+            components.append(f"🏁 Этапы OCR: {stages}")
+        components.append(f"🗂 Кэш OCR: {ocr_cache.describe()}")
+        from core import blob_store
+        # Первое обращение к хранилищу сканирует каталог — в потоке, чтобы не блокировать event loop
+        store_stats = await asyncio.to_thread(blob_store.describe)
+        if store_stats:
+            components.append(f"🗄 Изображения: {store_stats}")
     except:
         components.append("⚠️ OCR: Недоступен")
 
     status_text = "\n".join(f"├ {comp}" if i < len(components) - 1 else f"└ {comp}"
                             for i, comp in enumerate(components))
 
+    # Статистика вариантов OCR в текущем порядке каскада
+    ocr_block = ""
+    try:
+        from services.ocr import engine as ocr_engine
+        from services.ocr.layouts import get_layouts
+        variant_stats = await ledger.get_ocr_variant_stats()
+        lines = []
+        for layout in get_layouts().values():
+            stats = ocr_engine.layout_stats(variant_stats, layout.name)
+            if not stats:
+                continue
+            order = ocr_engine.order_variants(stats, layout.variants)
+            lines.append(f"├ <b>{layout.title}</b> (исключено вариантов: {len(layout.variants) - len(order)})")
+            for name in order:
+                attempts, hits, seconds = stats.get(name, (0, 0, 0.0))
+                rate = hits / attempts * 100 if attempts else 0
+                avg_ms = seconds / attempts * 1000 if attempts else 0
+                lines.append(f"├ <code>{name}</code>: {hits}/{attempts} ({rate:.0f}%), {avg_ms:.0f} мс")
+        if lines:
+            lines[-1] = "└" + lines[-1][1:]
+            ocr_block = "\n🔍 <b>Каскад OCR:</b>\n" + "\n".join(lines) + "\n"
+    except Exception:
+        pass
+
     uptime = datetime.now(pytz.timezone('Europe/Kiev')).strftime('%Y-%m-%d %H:%M:%S')
 
     return f"""
@@ -213,7 +251,7 @@ def format_system_status():
 
 🔧 <b>Компоненты:</b>
 {status_text}
-
+{ocr_block}
 ⏱️ <b>Время работы:</b> {uptime} (Киев)
 🖥️ <b>Версия:</b> Payments Bot v2.0
 
@@ -247,15 +285,15 @@ def format_export_message(export_type: str, data: str):
 """
 
 
-def format_reset_confirmation():
+async def format_reset_confirmation():
     """Сообщение подтверждения сброса"""
-    stats = get_statistics()
+    stats = await ledger.get_statistics()
 
     return f"""
 ⚠️ <b>ПОДТВЕРЖДЕНИЕ СБРОСА</b>
 {'═' * 30}
 
-Вы собираетесь удалить ВСЕ данные:
+Вы собираетесь закрыть текущий период:
 
 💰 Баланс: <code>{stats['balance']:,.2f} ₴</code>
 📊 Пополнений: <code>{stats['income_count']}</code>
@@ -263,9 +301,8 @@ def format_reset_confirmation():
 📝 Транзакций: <code>{stats['income_count'] + stats['check_count'] + stats['withdrawal_count']}</code>
 
 <b>⚡ ВНИМАНИЕ:</b>
-• Все финансовые данные будут потеряны
-• История транзакций удалится навсегда
-• Статистика обнулится
+• Баланс и статистика обнулятся
+• Итоги и история периода уйдут в архив
 • Действие НЕОБРАТИМО
 
 Продолжить?
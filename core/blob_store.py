@@ -0,0 +1,160 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from core.config import IMAGE_STORE_DIR, IMAGE_STORE_MAX_MB
+from utils.logger import logger
+
+
+class BlobStore:
+    """
+    Хранилище файлов с адресацией по содержимому (SHA-256).
+
+    Блоб лежит в <root>/<ab>/<sha256>, запись атомарна (временный файл +
+    os.replace), одинаковое содержимое хранится один раз. read() отдает копию
+    байтов: изображение все равно передается в процесс пула OCR.
+    Время последнего использования — mtime файла (обновляется при чтении);
+    при превышении max_bytes вытесняются давно не использованные блобы.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._sizes: Dict[str, int] = self._scan()
+        self._total = sum(self._sizes.values())
+
+    def _scan(self) -> Dict[str, int]:
+        """Размеры уже лежащих на диске блобов"""
+        sizes = {}
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if len(name) == 64:
+                    sizes[name] = os.path.getsize(os.path.join(directory, name))
+        return sizes
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._sizes
+
+    def put(self, data: bytes) -> str:
+        """Сохраняет содержимое и возвращает его SHA-256 (повторная запись только обновляет LRU)"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._sizes:
+                self._touch(digest)
+                return digest
+
+            directory = os.path.dirname(self.path(digest))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path(digest))
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._sizes[digest] = len(data)
+            self._total += len(data)
+            self._evict(keep=digest)
+        return digest
+
+    def open(self, digest: str) -> Optional[mmap.mmap]:
+        """Блоб как mmap только для чтения (None, если его нет); закрывает вызывающий"""
+        with self._lock:
+            if digest not in self._sizes:
+                return None
+            self._touch(digest)
+        try:
+            with open(self.path(digest), "rb") as f:
+                if self._sizes.get(digest) == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            # Вытеснен параллельной записью
+            return None
+
+    def read(self, digest: str) -> Optional[bytes]:
+        """Копия блоба в памяти (для передачи в другой процесс)"""
+        blob = self.open(digest)
+        if blob is None:
+            return None
+        with blob:
+            return blob[:]
+
+    def _touch(self, digest: str):
+        try:
+            os.utime(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: str):
+        """Удаляет давно не использованные блобы, пока суммарный размер выше лимита (под _lock)"""
+        if self._total <= self.max_bytes:
+            return
+
+        by_last_use = []
+        for digest in list(self._sizes):
+            if digest == keep:
+                continue
+            try:
+                by_last_use.append((os.path.getmtime(self.path(digest)), digest))
+            except OSError:
+                # Удален вне процесса: запись уже сохранена, забываем его без ошибки
+                self._total -= self._sizes.pop(digest)
+        by_last_use.sort()
+        for _, digest in by_last_use:
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path(digest))
+            except FileNotFoundError:
+                pass
+            self._total -= self._sizes.pop(digest)
+            logger.debug(f"🗑 Блоб вытеснен из хранилища: {digest}")
+
+
+# Хранилище скриншотов чеков (создается лениво; None, если выключено)
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[BlobStore]:
+    """Хранилище изображений по IMAGE_STORE_DIR (None при IMAGE_STORE_MAX_MB=0)"""
+    global _store
+
+    if IMAGE_STORE_MAX_MB <= 0:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore(IMAGE_STORE_DIR, int(IMAGE_STORE_MAX_MB * 1024 * 1024))
+            logger.info(f"🗄 Хранилище изображений: {IMAGE_STORE_DIR} ({len(_store)} файлов)")
+        return _store
+
+
+def describe() -> str:
+    """Краткое описание хранилища для экрана статуса (пустая строка, если оно выключено)"""
+    store = get_store()
+    if store is None:
+        return ""
+    return (f"{len(store)} файлов, "
+            f"{store.total_bytes / 1024 / 1024:.1f} из {store.max_bytes / 1024 / 1024:.0f} МБ")
@@ -0,0 +1,58 @@
+import threading
+from typing import Any, Optional, Tuple
+
+SETTINGS = "settings"
+TOTALS = "totals"
+
+
+class StateCache:
+    """
+    Сквозной (write-through) кэш однострочных таблиц settings и totals.
+
+    Очередь записи кладет сюда новые значения сразу после COMMIT, до того как
+    вызывающий получит результат, поэтому чтения видят свои записи. У каждой
+    записи кэша есть счетчик версий: он растет при каждом обновлении, и значение,
+    прочитанное из БД параллельно с записью, не затрет более свежее.
+    Кэш рассчитан на то, что в БД пишет только этот процесс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[str, Any] = {}
+        self._versions: dict[str, int] = {SETTINGS: 0, TOTALS: 0}
+
+    def get(self, name: str) -> Tuple[Optional[Any], int]:
+        """Значение (или None при промахе) и его текущая версия"""
+        with self._lock:
+            return self._values.get(name), self._versions.get(name, 0)
+
+    def fill(self, name: str, value: Any, version: int) -> bool:
+        """Заполняет кэш прочитанным из БД значением, если с момента get не было записей"""
+        with self._lock:
+            if self._versions.get(name, 0) != version or name in self._values:
+                return False
+            self._values[name] = value
+            return True
+
+    def put(self, name: str, value: Any):
+        """Записывает закоммиченное значение и увеличивает версию"""
+        with self._lock:
+            self._values[name] = value
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def invalidate(self, name: Optional[str] = None):
+        """Сбрасывает одно или все значения (следующее чтение пойдет в БД)"""
+        with self._lock:
+            names = [name] if name else list(self._versions)
+            for key in names:
+                self._values.pop(key, None)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def is_cached(self, name: str) -> bool:
+        with self._lock:
+            return name in self._values
+
+    def versions(self) -> dict[str, int]:
+        """Счетчики версий по таблицам"""
+        with self._lock:
+            return dict(self._versions)
@@ -22,3 +22,88 @@ ALERT_CHAT_IDS = [
     int(os.getenv("ALERT_CHAT_1", "-1003062201623")),  # чат 1
     int(os.getenv("ALERT_CHAT_2", "-1002720363713"))   # чат 2
 ]
+
+# Пул соединений с БД
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+
+# Групповой коммит: мутации, пришедшие в пределах окна, пишутся одной транзакцией
+DB_GROUP_COMMIT_MS = float(os.getenv("DB_GROUP_COMMIT_MS", "2"))
+DB_GROUP_COMMIT_MAX_BATCH = int(os.getenv("DB_GROUP_COMMIT_MAX_BATCH", "64"))
+
+# Профили PRAGMA SQLite (надежность против производительности). Группового коммита
+# (DB_GROUP_COMMIT_MS) ждут вызывающие: операция считается записанной, когда коммит
+# ее пачки завершен, поэтому по умолчанию используется safe — коммит пачки не
+# теряется и при сбое ОС. balanced и fast включаются явно: они быстрее на запись,
+# но подтвержденная пачка может пропасть при отключении питания
+DB_PRAGMA_PROFILES = {
+    # WAL и fsync на каждый коммит пачки: читатели не блокируют писателя, коммит переживает сбой ОС
+    "safe": {
+        "busy_timeout": 5000, "journal_mode": "WAL", "synchronous": "FULL",
+        "cache_size": -16000, "mmap_size": 64 * 1024 * 1024, "temp_store": "MEMORY",
+    },
+    # WAL, fsync только на чекпоинтах: при сбое ОС возможен откат последних коммитов
+    "balanced": {
+        "busy_timeout": 5000, "journal_mode": "WAL", "synchronous": "NORMAL",
+        "cache_size": -16000, "mmap_size": 64 * 1024 * 1024, "temp_store": "MEMORY",
+    },
+    # Без fsync: при сбое ОС возможна потеря последних транзакций
+    "fast": {
+        "busy_timeout": 5000, "journal_mode": "WAL", "synchronous": "OFF",
+        "cache_size": -64000, "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY",
+    },
+}
+DB_PRAGMA_PROFILE = os.getenv("DB_PRAGMA_PROFILE", "safe")
+
+# Итоговые PRAGMA: профиль + точечные переопределения DB_JOURNAL_MODE, DB_SYNCHRONOUS и т.д.
+DB_PRAGMAS = dict(DB_PRAGMA_PROFILES.get(DB_PRAGMA_PROFILE, DB_PRAGMA_PROFILES["safe"]))
+DB_PRAGMAS.update({
+    name: os.environ[f"DB_{name.upper()}"]
+    for name in DB_PRAGMAS
+    if os.getenv(f"DB_{name.upper()}")
+})
+
+# Архив периодов: сколько дней хранить закрытые периоды (0 — хранить всегда)
+PERIOD_RETENTION_DAYS = int(os.getenv("PERIOD_RETENTION_DAYS", "0"))
+
+# OCR: процессов-распознавателей со своей моделью RapidOCR (0 — в потоке основного процесса)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+# Минимальная уверенность строки RapidOCR, чтобы каскад остановился на найденной в ней сумме
+OCR_MIN_SCORE = float(os.getenv("OCR_MIN_SCORE", "0.8"))
+# Адаптивный порядок вариантов OCR по накопленной статистике (1 — включен)
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "1") == "1"
+# Вариант без единой найденной суммы после стольких попыток исключается из каскада
+OCR_PRUNE_MIN_ATTEMPTS = int(os.getenv("OCR_PRUNE_MIN_ATTEMPTS", "50"))
+# Каждый N-й чек распознается полным каскадом в исходном порядке, чтобы статистика не устаревала
+OCR_EXPLORE_EVERY = int(os.getenv("OCR_EXPLORE_EVERY", "20"))
+# Сколько первых вариантов каскада распознавать одним вызовом RapidOCR на общем холсте (0/1 — по одному)
+OCR_BATCH_VARIANTS = int(os.getenv("OCR_BATCH_VARIANTS", "4"))
+# Предобработанные кропы — срезы один раз предобработанного чека; 1 — с локальным порогом Оцу по региону
+OCR_LOCAL_THRESHOLD = os.getenv("OCR_LOCAL_THRESHOLD", "1") == "1"
+# Политика разрешения: нужная высота строки текста, px, и предел длинной стороны изображения
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "24"))
+OCR_MAX_LONG_SIDE = int(os.getenv("OCR_MAX_LONG_SIDE", "2000"))
+# Параметры ONNX Runtime для RapidOCR: потоки внутри и между операторами (0 — по умолчанию onnxruntime)
+# и уровень оптимизации графа: disable | basic | extended | all
+OCR_INTRA_THREADS = int(os.getenv("OCR_INTRA_THREADS", "0"))
+OCR_INTER_THREADS = int(os.getenv("OCR_INTER_THREADS", "0"))
+OCR_GRAPH_OPT = os.getenv("OCR_GRAPH_OPT", "all").lower()
+# Этапы RapidOCR по вариантам каскада: "вариант=этапы" через запятую, этапы det+cls+rec, * — все варианты
+# (например "amount_row1=rec,amount_row2=rec": однострочные кропы сразу в распознаватель)
+OCR_VARIANT_STAGES = os.getenv("OCR_VARIANT_STAGES", "")
+# INT8-квантованные модели RapidOCR (python -m services.ocr.quantize): каталог и какие модели загружать
+# вместо float — det, rec через запятую (пусто — все float)
+OCR_MODELS_DIR = os.getenv("OCR_MODELS_DIR", "models/ocr")
+OCR_INT8_MODELS = tuple(name.strip() for name in os.getenv("OCR_INT8_MODELS", "").split(",") if name.strip())
+# Макеты чеков банков: свой каталог JSON-макетов и макет для неопределенных скриншотов
+# (generic — только полное изображение; credit_agricole — если все чеки от Crédit Agricole)
+OCR_LAYOUTS_DIR = os.getenv("OCR_LAYOUTS_DIR", "")
+OCR_DEFAULT_LAYOUT = os.getenv("OCR_DEFAULT_LAYOUT", "generic")
+# Кэш результатов OCR (file_unique_id и хэш изображения): записей в БД (0 — выключен) и срок жизни
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "5000"))
+OCR_CACHE_TTL_HOURS = float(os.getenv("OCR_CACHE_TTL_HOURS", "168"))
+
+# Локальное хранилище скачанных скриншотов (адресация по SHA-256): каталог и лимит размера (0 — выключено)
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "images")
+IMAGE_STORE_MAX_MB = float(os.getenv("IMAGE_STORE_MAX_MB", "500"))
+# Срок жизни ссылок ключей кэша OCR на изображения в хранилище (таблица image_refs), дней
+IMAGE_REFS_TTL_DAYS = float(os.getenv("IMAGE_REFS_TTL_DAYS", "30"))
@@ -0,0 +1,231 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from utils.logger import logger
+
+# PRAGMA по умолчанию; применяются к каждому соединению один раз при открытии
+CONNECTION_PRAGMAS = {
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "cache_size": -8000,
+}
+
+# PRAGMA уровня файла БД: устанавливаются только соединением-писателем
+DATABASE_PRAGMAS = ("journal_mode",)
+
+
+class ConnectionPool:
+    """Пул соединений SQLite: одно долгоживущее соединение-писатель и несколько читателей"""
+
+    def __init__(self, path: str, readers: int = 4, pragmas: Optional[dict] = None):
+        self.path = path
+        self.size = max(1, readers)
+        self.pragmas = dict(CONNECTION_PRAGMAS if pragmas is None else pragmas)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.RLock()
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all_readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Открывает соединение и применяет PRAGMA"""
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # busy_timeout первым: смена journal_mode может ждать блокировку файла
+        for name, value in sorted(self.pragmas.items(), key=lambda item: item[0] != "busy_timeout"):
+            if read_only and name in DATABASE_PRAGMAS:
+                continue
+            conn.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Эксклюзивный доступ к соединению-писателю; commit при выходе, rollback при ошибке"""
+        with self._writer_lock:
+            conn = self._open_writer()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _open_writer(self) -> sqlite3.Connection:
+        """Открывает соединение-писатель (и журнал БД) при первом обращении"""
+        with self._writer_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Пул соединений закрыт")
+            if self._writer is None:
+                self._writer = self._connect()
+            return self._writer
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Берет соединение-читатель из пула и возвращает его после использования"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Пул соединений закрыт")
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if len(self._all_readers) < self.size:
+                # Режим журнала задает писатель, поэтому он открывается раньше читателей
+                self._open_writer()
+                conn = self._connect(read_only=True)
+                self._all_readers.append(conn)
+                return conn
+
+        # Все читатели заняты — ждем освобождения
+        return self._readers.get()
+
+    @property
+    def opened_connections(self) -> int:
+        """Количество открытых соединений (писатель + читатели)"""
+        return len(self._all_readers) + (1 if self._writer is not None else 0)
+
+    def close(self):
+        """Закрывает все соединения пула"""
+        self._closed = True
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for conn in self._all_readers:
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.debug(f"Ошибка закрытия соединения: {e}")
+            self._all_readers.clear()
+
+
+class WriteQueue:
+    """
+    Очередь записей с групповым коммитом.
+
+    Отдельный поток-писатель забирает мутации из очереди, собирает те, что пришли
+    в пределах окна window_ms, и выполняет их одной транзакцией с одним COMMIT.
+    Окно ждется только под нагрузкой, одиночные записи не получают лишней задержки.
+    Каждая мутация выполняется в своей SAVEPOINT, поэтому ошибка одной из них
+    не откатывает остальные. Future вызывающего завершается только после COMMIT;
+    перед этим результаты успешных мутаций передаются в on_commit (кэш состояния).
+    """
+
+    _STOP = object()
+
+    def __init__(self, pool: ConnectionPool, window_ms: float = 2.0, max_batch: int = 64,
+                 on_commit: Optional[Callable[[list], None]] = None):
+        self.pool = pool
+        self.on_commit = on_commit
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.operations = 0
+        self._last_batch_size = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op, *args) -> Future:
+        """Ставит мутацию op(conn, *args) в очередь и возвращает Future с ее результатом"""
+        future: Future = Future()
+        if not self._thread.is_alive():
+            future.set_exception(sqlite3.ProgrammingError("Очередь записи остановлена"))
+            return future
+        self._queue.put((op, args, future))
+        return future
+
+    def _collect_batch(self, first) -> tuple[list, bool]:
+        """Добирает мутации, пришедшие в пределах окна группового коммита"""
+        batch = [first]
+        stop = False
+        # Окно ожидания включается только под нагрузкой: одиночная запись коммитится сразу
+        under_load = self._last_batch_size > 1 or not self._queue.empty()
+        deadline = time.monotonic() + (self.window if under_load else 0.0)
+
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                stop = True
+                break
+            batch.append(item)
+
+        return batch, stop
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is self._STOP:
+                return
+
+            batch, stop = self._collect_batch(first)
+            self._last_batch_size = len(batch)
+            self._commit_batch(batch)
+            if stop:
+                return
+
+    def _commit_batch(self, batch: list):
+        """Выполняет пачку мутаций одной транзакцией"""
+        results = []
+        try:
+            with self.pool.writer() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for op, args, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT write_op")
+                    try:
+                        results.append((future, op(conn, *args), None))
+                        conn.execute("RELEASE write_op")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_op")
+                        conn.execute("RELEASE write_op")
+                        results.append((future, None, e))
+        except Exception as e:
+            logger.error(f"❌ Ошибка группового коммита ({len(batch)} операций): {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(results)
+        if self.on_commit is not None:
+            try:
+                self.on_commit([result for _, result, error in results if error is None])
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработчика после коммита: {e}")
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Дожидается записи всех поставленных мутаций и останавливает поток"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
@@ -1,149 +1,366 @@
-import sqlite3
-import asyncio
+import threading
+import time
 import pytz
-from datetime import datetime
-from typing import Tuple, Optional
-from core.config import DATABASE_PATH
+from concurrent.futures import Future
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple, Optional
+from core.config import DATABASE_PATH, DB_READ_POOL_SIZE, DB_GROUP_COMMIT_MS, DB_GROUP_COMMIT_MAX_BATCH, DB_PRAGMAS
+from core.config import PERIOD_RETENTION_DAYS, OCR_CACHE_MAX_ENTRIES, OCR_CACHE_TTL_HOURS, IMAGE_REFS_TTL_DAYS
+from core.cache import SETTINGS, TOTALS, StateCache
+from core.connection import ConnectionPool, WriteQueue
+from core.models import DEFAULT_SETTINGS, LedgerSnapshot, Period, Reversal, Rollup, Settings
+import migrations
 from utils.logger import logger
 
 # Глобальные переменные для отслеживания состояния
-withdrawals_without_check = 0
 last_income_time = None
 
+KYIV_TZ = pytz.timezone("Europe/Kiev")
+
+# Таблицы агрегатов и формат ключа интервала (киевское время)
+ROLLUP_BUCKETS = {
+    "rollup_minute": "%Y-%m-%d %H:%M",
+    "rollup_hour": "%Y-%m-%d %H:00",
+}
+TRANSACTION_TYPES = ("income", "withdrawal", "check")
+
+# Пул соединений и очередь записи (создаются лениво для текущего DATABASE_PATH)
+_pool: Optional[ConnectionPool] = None
+_write_queue: Optional[WriteQueue] = None
+_pool_lock = threading.Lock()
+
+# Сквозной кэш settings/totals: горячие чтения не ходят в SQLite
+_cache = StateCache()
+
+
+def _close_pool_locked():
+    """Останавливает очередь записи и закрывает пул (под _pool_lock)"""
+    global _pool, _write_queue
+
+    if _write_queue is not None:
+        _write_queue.close()
+        _write_queue = None
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+    _cache.invalidate()
+
+
+def get_pool() -> ConnectionPool:
+    """Возвращает пул соединений, пересоздавая его при смене пути к БД"""
+    global _pool
+
+    pool = _pool
+    if pool is not None and pool.path == DATABASE_PATH:
+        return pool
+
+    with _pool_lock:
+        if _pool is None or _pool.path != DATABASE_PATH:
+            _close_pool_locked()
+            _pool = ConnectionPool(DATABASE_PATH, DB_READ_POOL_SIZE, DB_PRAGMAS)
+        return _pool
+
+
+def get_write_queue() -> WriteQueue:
+    """Возвращает очередь записи с групповым коммитом для текущего пула"""
+    global _write_queue
+
+    pool = get_pool()
+    write_queue = _write_queue
+    if write_queue is not None and write_queue.pool is pool:
+        return write_queue
+
+    with _pool_lock:
+        if _write_queue is None or _write_queue.pool is not pool:
+            if _write_queue is not None:
+                _write_queue.close()
+            _write_queue = WriteQueue(pool, DB_GROUP_COMMIT_MS, DB_GROUP_COMMIT_MAX_BATCH, on_commit=_publish)
+        return _write_queue
+
+
+def close_database():
+    """Дописывает очередь записи и закрывает все соединения с БД (при остановке бота)"""
+    with _pool_lock:
+        if _pool is not None:
+            _close_pool_locked()
+            logger.info("✅ Соединения с БД закрыты")
+
+
+def _completed(result=None) -> Future:
+    """Уже завершенный Future (для отклоненных без записи операций)"""
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+def _after_commit(future: Future, on_success: Callable, error_message: str) -> Future:
+    """Вызывает on_success(результат) после COMMIT или логирует ошибку записи"""
+    def callback(done: Future):
+        error = done.exception()
+        if error is not None:
+            logger.error(f"{error_message}: {error}")
+        else:
+            on_success(done.result())
+
+    future.add_done_callback(callback)
+    return future
+
+
+def _wait(future: Future, default=None):
+    """Синхронно дожидается записи; ошибки уже залогированы в _after_commit"""
+    try:
+        return future.result()
+    except Exception:
+        return default
+
+
+def _read_snapshot(conn) -> LedgerSnapshot:
+    """Снимок итогов периода внутри текущей транзакции"""
+    row = conn.execute(
+        "SELECT incoming, checks, max_balance, open_withdrawals, income_count, check_count, withdrawal_count, "
+        "period_id FROM totals WHERE id=1"
+    ).fetchone()
+    return LedgerSnapshot(*row) if row else LedgerSnapshot(0.0, 0.0, 0.0, 0)
+
+
+def _insert_history(conn, transaction_type: str, amount: float,
+                    chat_id: Optional[int] = None, message_id: Optional[int] = None):
+    """
+    Запись в историю с отметкой текущего периода и обновлением агрегатов. created_at
+    пишется явно из того же момента, что и интервал агрегатов, чтобы отмена записи
+    (_adjust_rollups по created_at) попала в тот же интервал
+    """
+    created_at = datetime.now(pytz.utc).replace(microsecond=0)
+    conn.execute(
+        "INSERT INTO transaction_history(type, amount, period_id, chat_id, message_id, created_at) "
+        "VALUES(?, ?, (SELECT period_id FROM totals WHERE id=1), ?, ?, ?)",
+        (transaction_type, amount, chat_id, message_id, created_at.strftime("%Y-%m-%d %H:%M:%S"))
+    )
+
+    now = created_at.astimezone(KYIV_TZ)
+    for table, bucket_format in ROLLUP_BUCKETS.items():
+        conn.execute(
+            f"INSERT INTO {table}(bucket, type, count, sum, min, max) VALUES(?, ?, 1, ?, ?, ?) "
+            "ON CONFLICT(bucket, type) DO UPDATE SET count = count + 1, sum = sum + excluded.sum, "
+            "min = MIN(min, excluded.min), max = MAX(max, excluded.max)",
+            (now.strftime(bucket_format), transaction_type, amount, amount, amount)
+        )
+
+
+def _adjust_rollups(conn, transaction_type: str, created_at: str, amount_delta: float, count_delta: int):
+    """Корректирует агрегаты интервала записи (created_at в UTC); min/max остаются границами"""
+    local = pytz.utc.localize(datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")).astimezone(KYIV_TZ)
+    for table, bucket_format in ROLLUP_BUCKETS.items():
+        bucket = local.strftime(bucket_format)
+        conn.execute(
+            f"UPDATE {table} SET count = count + ?, sum = sum + ? WHERE bucket = ? AND type = ?",
+            (count_delta, amount_delta, bucket, transaction_type)
+        )
+        conn.execute(f"DELETE FROM {table} WHERE bucket = ? AND type = ? AND count <= 0", (bucket, transaction_type))
+
+
+def _find_entry(conn, chat_id: int, message_id: int) -> Optional[tuple]:
+    """Запись истории по источнику (id, type, amount, created_at, period_id) — поиск по уникальному индексу"""
+    return conn.execute(
+        "SELECT id, type, amount, created_at, period_id FROM transaction_history WHERE chat_id = ? AND message_id = ?",
+        (chat_id, message_id)
+    ).fetchone()
+
+
+def _history_max_balance(conn, period_id: int) -> float:
+    """Максимальный баланс периода по его истории: максимум нарастающего итога (не ниже 0)"""
+    return conn.execute(
+        "SELECT MAX(0, COALESCE(MAX(balance), 0)) FROM ("
+        "  SELECT SUM(CASE type WHEN 'income' THEN amount WHEN 'check' THEN -amount ELSE 0 END) "
+        "         OVER (ORDER BY id) AS balance "
+        "  FROM transaction_history WHERE period_id = ?)",
+        (period_id,)
+    ).fetchone()[0]
+
+
+def _reverse_entries(conn, entries: List[tuple]):
+    """
+    Отменяет влияние записей истории на итоги их периодов и агрегаты и удаляет их.
+    Изменения суммируются: один UPDATE на период и по одному на интервал агрегатов;
+    максимальный баланс затронутых периодов пересчитывается по оставшейся истории.
+    """
+    current_period = conn.execute("SELECT period_id FROM totals WHERE id=1").fetchone()[0]
+
+    periods: Dict[Optional[int], dict] = {}
+    buckets: Dict[Tuple[str, str], list] = {}
+    for _, transaction_type, amount, created_at, period_id in entries:
+        period_id = current_period if period_id is None else period_id
+        delta = periods.setdefault(period_id, dict.fromkeys(
+            ("incoming", "checks", "income_count", "check_count", "withdrawal_count"), 0))
+        if transaction_type == "income":
+            delta["incoming"] += amount
+        elif transaction_type == "check":
+            delta["checks"] += amount
+        delta[f"{transaction_type}_count"] += 1
+
+        bucket = buckets.setdefault((created_at, transaction_type), [0.0, 0])
+        bucket[0] += amount
+        bucket[1] += 1
+
+    changes = ("incoming = MAX(incoming - :incoming, 0), checks = MAX(checks - :checks, 0), "
+               "income_count = income_count - :income_count, check_count = check_count - :check_count, "
+               "withdrawal_count = withdrawal_count - :withdrawal_count")
+    for period_id, delta in periods.items():
+        if period_id == current_period:
+            # Отмененный чек вывод не переоткрывает: неизвестно, закрывал ли он его
+            conn.execute(
+                f"UPDATE totals SET {changes}, "
+                "open_withdrawals = MAX(open_withdrawals - :withdrawal_count, 0) WHERE id=1", delta
+            )
+        else:
+            conn.execute(f"UPDATE periods SET {changes} WHERE id = :period_id", dict(delta, period_id=period_id))
+
+    for (created_at, transaction_type), (amount, count) in buckets.items():
+        _adjust_rollups(conn, transaction_type, created_at, -amount, -count)
+
+    conn.executemany("DELETE FROM transaction_history WHERE id = ?", [(entry[0],) for entry in entries])
+
+    for period_id in periods:
+        max_balance = _history_max_balance(conn, period_id)
+        if period_id == current_period:
+            conn.execute("UPDATE totals SET max_balance = ? WHERE id=1", (max_balance,))
+        else:
+            conn.execute("UPDATE periods SET max_balance = ? WHERE id = ?", (max_balance, period_id))
+
+
+def _apply_reversal(conn, chat_ids: List[int], message_ids: List[int]) -> Reversal:
+    """Отменяет транзакции и удаляет скриншоты сообщений message_ids из чатов chat_ids одной транзакцией"""
+    entries = []
+    for chat_id in chat_ids:
+        for start in range(0, len(message_ids), 500):
+            chunk = message_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            entries += conn.execute(
+                "SELECT id, type, amount, created_at, period_id FROM transaction_history "
+                f"WHERE chat_id = ? AND message_id IN ({placeholders})", [chat_id, *chunk]
+            ).fetchall()
+            conn.execute(f"DELETE FROM screenshots WHERE chat_id = ? AND message_id IN ({placeholders})",
+                         [chat_id, *chunk])
+
+    if entries:
+        _reverse_entries(conn, entries)
+    return Reversal(len(entries), _read_snapshot(conn))
+
+
+def submit_reversal(chat_ids: List[int], message_ids: List[int]) -> Future:
+    """Ставит в очередь отмену транзакций удаленных сообщений; Future вернет Reversal"""
+    return _after_commit(
+        get_write_queue().submit(_apply_reversal, list(chat_ids), list(message_ids)),
+        lambda result: result.reversed and logger.info(
+            f"↩️ Отменено транзакций удаленных сообщений: {result.reversed}. Баланс: {result.snapshot.balance:.2f} UAH"
+        ),
+        "❌ Ошибка отмены транзакций удаленных сообщений"
+    )
+
+
+def reverse_messages(chat_ids: List[int], message_ids: List[int]) -> Optional[Reversal]:
+    """Отменяет транзакции, записанные из удаленных сообщений"""
+    return _wait(submit_reversal(chat_ids, message_ids))
+
+
+# Изменение итогов при добавлении транзакции каждого типа
+_TOTALS_UPDATES = {
+    # Итоги и максимальный баланс — одним UPDATE
+    "income": "UPDATE totals SET incoming = incoming + :amount, income_count = income_count + 1, "
+              "max_balance = MAX(max_balance, incoming + :amount - checks) WHERE id=1",
+    "withdrawal": "UPDATE totals SET open_withdrawals = open_withdrawals + 1, "
+                  "withdrawal_count = withdrawal_count + 1 WHERE id=1",
+    # Чек закрывает один незакрытый вывод, если он есть
+    "check": "UPDATE totals SET checks = checks + :amount, check_count = check_count + 1, "
+             "open_withdrawals = MAX(open_withdrawals - 1, 0), "
+             "max_balance = MAX(max_balance, incoming - checks - :amount) WHERE id=1",
+}
+
+
+def _apply_entry(conn, transaction_type: str, amount: float,
+                 chat_id: Optional[int] = None, message_id: Optional[int] = None) -> LedgerSnapshot:
+    """
+    Добавляет транзакцию в итоги и историю одной транзакцией БД.
+    Повторно доставленное сообщение с той же суммой ничего не меняет (duplicate=True),
+    отредактированное — заменяет прежнюю запись.
+    """
+    if message_id is not None:
+        entry = _find_entry(conn, chat_id, message_id)
+        if entry is not None:
+            if entry[1] == transaction_type and entry[2] == amount:
+                return replace(_read_snapshot(conn), duplicate=True)
+            _reverse_entries(conn, [entry])
+
+    conn.execute(_TOTALS_UPDATES[transaction_type], {"amount": amount})
+    _insert_history(conn, transaction_type, amount, chat_id, message_id)
+    return _read_snapshot(conn)
+
+
+def _entry_committed(snapshot: LedgerSnapshot, message: str):
+    if snapshot.duplicate:
+        logger.info("♻️ Сообщение уже учтено, запись не изменена")
+    else:
+        logger.info(message)
+
+
+def _read_settings(conn) -> Settings:
+    """Настройки внутри текущей транзакции"""
+    row = conn.execute("""
+                       SELECT auto_reset_time,
+                              critical_checks_count,
+                              critical_balance_amount,
+                              alert_messages_per_minute,
+                              emergency_enabled
+                       FROM settings
+                       WHERE id = 1
+                       """).fetchone()
+    if not row:
+        return DEFAULT_SETTINGS
+    auto_reset_time, critical_checks, critical_balance, alert_rate, emergency_enabled = row
+    return Settings(auto_reset_time, critical_checks, critical_balance, alert_rate, bool(emergency_enabled))
+
+
+def _publish(results: list):
+    """Обновляет кэш результатами закоммиченных мутаций (вызывается потоком-писателем)"""
+    for result in results:
+        if isinstance(result, Reversal):
+            result = result.snapshot
+        if isinstance(result, LedgerSnapshot) and not result.duplicate:
+            _cache.put(TOTALS, result)
+        elif isinstance(result, Settings):
+            _cache.put(SETTINGS, result)
+
+
+def _cached(name: str, load: Callable):
+    """Значение из кэша или из БД с заполнением кэша"""
+    get_pool()  # сбрасывает кэш, если сменился путь к БД
+    value, version = _cache.get(name)
+    if value is None:
+        with get_pool().reader() as conn:
+            value = load(conn)
+        _cache.fill(name, value, version)
+    return value
+
+
+def is_cached(name: str) -> bool:
+    """Есть ли значение settings/totals в кэше (чтение не пойдет в SQLite)"""
+    get_pool()
+    return _cache.is_cached(name)
+
+
+def get_cache_versions() -> dict:
+    """Счетчики версий кэша settings/totals (растут при каждой записи)"""
+    return _cache.versions()
+
 
 def init_database():
-    """Создает и инициализирует структуру базы данных"""
+    """Создает структуру базы данных и применяет недостающие миграции"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-
-        # Таблица истории транзакций
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS transaction_history
-                       (
-                           id
-                           INTEGER
-                           PRIMARY
-                           KEY
-                           AUTOINCREMENT,
-                           type
-                           TEXT
-                           NOT
-                           NULL
-                           CHECK (
-                           type
-                           IN
-                       (
-                           'income',
-                           'withdrawal',
-                           'check'
-                       )),
-                           amount REAL NOT NULL,
-                           description TEXT DEFAULT '',
-                           created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                           )
-                       """)
-
-        # Таблица общих балансов
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS totals
-                       (
-                           id
-                           INTEGER
-                           PRIMARY
-                           KEY
-                           CHECK
-                       (
-                           id =
-                           1
-                       ),
-                           incoming REAL DEFAULT 0 CHECK
-                       (
-                           incoming
-                           >=
-                           0
-                       ),
-                           checks REAL DEFAULT 0 CHECK
-                       (
-                           checks
-                           >=
-                           0
-                       ),
-                           max_balance REAL DEFAULT 0
-                           )
-                       """)
-
-        # Таблица скриншотов чеков
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS screenshots
-                       (
-                           id
-                           INTEGER
-                           PRIMARY
-                           KEY
-                           AUTOINCREMENT,
-                           file_id
-                           TEXT
-                           NOT
-                           NULL,
-                           amount
-                           REAL
-                           DEFAULT
-                           0,
-                           raw_text
-                           TEXT
-                           DEFAULT
-                           '',
-                           created_at
-                           TIMESTAMP
-                           DEFAULT
-                           CURRENT_TIMESTAMP
-                       )
-                       """)
-
-        # Таблица настроек
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS settings
-                       (
-                           id
-                           INTEGER
-                           PRIMARY
-                           KEY
-                           CHECK
-                       (
-                           id =
-                           1
-                       ),
-                           auto_reset_time TEXT DEFAULT NULL,
-                           critical_checks_count INTEGER DEFAULT 5 CHECK
-                       (
-                           critical_checks_count >
-                           0
-                       ),
-                           critical_balance_amount REAL DEFAULT -1000.0,
-                           alert_messages_per_minute INTEGER DEFAULT 5 CHECK
-                       (
-                           alert_messages_per_minute >
-                           0
-                       ),
-                           emergency_enabled INTEGER DEFAULT 1 CHECK
-                       (
-                           emergency_enabled
-                           IN
-                       (
-                           0,
-                           1
-                       ))
-                           )
-                       """)
-
-        # Инициализация данных по умолчанию
-        cursor.execute("INSERT OR IGNORE INTO totals (id, incoming, checks, max_balance) VALUES (1, 0, 0, 0)")
-        cursor.execute("INSERT OR IGNORE INTO settings (id) VALUES (1)")
-
-        conn.commit()
-        conn.close()
-        logger.info("✅ База данных инициализирована успешно")
+        with get_pool().writer() as conn:
+            version = migrations.migrate(conn)
+        _cache.invalidate()
+        logger.info(f"✅ База данных инициализирована успешно (версия схемы {version})")
 
     except Exception as e:
         logger.error(f"❌ Ошибка инициализации БД: {e}")
@@ -153,269 +370,471 @@ def init_database():
 def get_balance() -> Tuple[float, float, float]:
     """Получает текущий баланс (пополнения, расходы, максимальный баланс)"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT incoming, checks, max_balance FROM totals WHERE id=1")
-        row = cursor.fetchone()
-        conn.close()
-        return row if row else (0.0, 0.0, 0.0)
+        snapshot = _cached(TOTALS, _read_snapshot)
+        return snapshot.incoming, snapshot.checks, snapshot.max_balance
     except Exception as e:
         logger.error(f"❌ Ошибка получения баланса: {e}")
         return (0.0, 0.0, 0.0)
 
 
-def get_settings_safe() -> Tuple[Optional[str], int, float, int, bool]:
-    """Безопасно получает настройки с значениями по умолчанию"""
+def get_snapshot() -> LedgerSnapshot:
+    """Снимок итогов текущего периода (включая незакрытые выводы)"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT auto_reset_time,
-                              critical_checks_count,
-                              critical_balance_amount,
-                              alert_messages_per_minute,
-                              emergency_enabled
-                       FROM settings
-                       WHERE id = 1
-                       """)
-        row = cursor.fetchone()
-        conn.close()
+        return _cached(TOTALS, _read_snapshot)
+    except Exception as e:
+        logger.error(f"❌ Ошибка получения итогов: {e}")
+        return LedgerSnapshot(0.0, 0.0, 0.0, 0)
 
-        if row:
-            auto_reset_time, critical_checks, critical_balance, alert_rate, emergency_enabled = row
-            return auto_reset_time, critical_checks, critical_balance, alert_rate, bool(emergency_enabled)
-        else:
-            return None, 5, -1000.0, 5, True
+
+def get_settings_safe() -> Settings:
+    """Безопасно получает настройки с значениями по умолчанию"""
+    try:
+        return _cached(SETTINGS, _read_settings)
     except Exception as e:
         logger.error(f"❌ Ошибка получения настроек: {e}")
-        return None, 5, -1000.0, 5, True
+        return DEFAULT_SETTINGS
+
+
+def _apply_setting(conn, key: str, value) -> Settings:
+    conn.execute(f"UPDATE settings SET {key} = ? WHERE id=1", (value,))
+    return _read_settings(conn)
 
 
 def update_setting(key: str, value):
     """Обновляет настройку в БД"""
-    try:
-        valid_keys = {
-            'auto_reset_time': 'TEXT',
-            'critical_checks_count': 'INTEGER',
-            'critical_balance_amount': 'REAL',
-            'alert_messages_per_minute': 'INTEGER',
-            'emergency_enabled': 'INTEGER'
-        }
+    valid_keys = {
+        'auto_reset_time': 'TEXT',
+        'critical_checks_count': 'INTEGER',
+        'critical_balance_amount': 'REAL',
+        'alert_messages_per_minute': 'INTEGER',
+        'emergency_enabled': 'INTEGER'
+    }
+
+    if key not in valid_keys:
+        logger.warning(f"⚠️ Некорректный ключ настройки: {key}")
+        return False
 
-        if key not in valid_keys:
-            logger.warning(f"⚠️ Некорректный ключ настройки: {key}")
-            return False
+    future = _after_commit(
+        get_write_queue().submit(_apply_setting, key, value),
+        lambda _: logger.info(f"✅ Обновлена настройка {key} = {value}"),
+        f"❌ Ошибка обновления настройки {key}"
+    )
+    return _wait(future) is not None
 
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute(f"UPDATE settings SET {key} = ? WHERE id=1", (value,))
-        conn.commit()
-        conn.close()
-        logger.info(f"✅ Обновлена настройка {key} = {value}")
-        return True
 
-    except Exception as e:
-        logger.error(f"❌ Ошибка обновления настройки {key}: {e}")
-        return False
+def _apply_max_balance(conn) -> LedgerSnapshot:
+    conn.execute("UPDATE totals SET max_balance = incoming - checks WHERE id=1 AND incoming - checks > max_balance")
+    return _read_snapshot(conn)
 
 
 def update_max_balance():
     """Обновляет максимальный баланс если текущий больше"""
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT incoming, checks, max_balance FROM totals WHERE id=1")
-        row = cursor.fetchone()
-
-        if not row:
-            conn.close()
-            return
-
-        incoming, checks, max_balance = row
-        current_balance = incoming - checks
+    _wait(_after_commit(
+        get_write_queue().submit(_apply_max_balance),
+        lambda _: None,
+        "❌ Ошибка обновления максимального баланса"
+    ))
 
-        if current_balance > max_balance:
-            cursor.execute("UPDATE totals SET max_balance=? WHERE id=1", (current_balance,))
-            conn.commit()
-            logger.info(f"📈 Обновлен максимальный баланс: {current_balance:.2f} UAH")
 
-        conn.close()
-    except Exception as e:
-        logger.error(f"❌ Ошибка обновления максимального баланса: {e}")
+def _income_committed(amount: float, snapshot: LedgerSnapshot):
+    global last_income_time
 
+    if not snapshot.duplicate:
+        last_income_time = datetime.now(pytz.timezone("Europe/Kiev"))
+    _entry_committed(snapshot, f"💰 Добавлено пополнение: {amount:.2f} UAH. Баланс: {snapshot.balance:.2f} UAH")
 
-def add_income(amount: float):
-    """Добавляет пополнение"""
-    global last_income_time
 
+def submit_income(amount: float, chat_id: Optional[int] = None, message_id: Optional[int] = None) -> Future:
+    """Ставит пополнение в очередь записи; Future вернет LedgerSnapshot после COMMIT"""
     if amount <= 0:
         logger.warning(f"⚠️ Игнорируем неположительную сумму пополнения: {amount}")
-        return
-
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE totals SET incoming = incoming + ? WHERE id=1", (amount,))
-        cursor.execute("INSERT INTO transaction_history(type, amount) VALUES(?, ?)", ("income", amount))
-        conn.commit()
-        conn.close()
-
-        last_income_time = datetime.now(pytz.timezone("Europe/Kiev"))
-        logger.info(f"💰 Добавлено пополнение: {amount:.2f} UAH")
+        return _completed(None)
 
-        update_max_balance()
+    return _after_commit(
+        get_write_queue().submit(_apply_entry, "income", amount, chat_id, message_id),
+        lambda snapshot: _income_committed(amount, snapshot),
+        "❌ Ошибка добавления пополнения"
+    )
 
-        # Проверяем условия тревоги
-        from services.alerts.emergency import check_emergency_conditions
-        asyncio.create_task(check_emergency_conditions())
-
-    except Exception as e:
-        logger.error(f"❌ Ошибка добавления пополнения: {e}")
 
+def add_income(amount: float, chat_id: Optional[int] = None,
+               message_id: Optional[int] = None) -> Optional[LedgerSnapshot]:
+    """Добавляет пополнение и возвращает снимок итогов после записи (None, если не записано)"""
+    return _wait(submit_income(amount, chat_id, message_id))
 
-def add_withdrawal(amount: float):
-    """Добавляет вывод (отрицательная сумма)"""
-    global withdrawals_without_check
 
+def submit_withdrawal(amount: float, chat_id: Optional[int] = None, message_id: Optional[int] = None) -> Future:
+    """Ставит вывод (отрицательная сумма) в очередь записи"""
     if amount >= 0:
         logger.warning(f"⚠️ Игнорируем неотрицательную сумму вывода: {amount}")
-        return
-
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO transaction_history(type, amount) VALUES(?, ?)", ("withdrawal", amount))
-        conn.commit()
-        conn.close()
-
-        withdrawals_without_check += 1
-        logger.info(f"💸 Зафиксирован вывод: {amount:.2f} UAH. Незакрытых выводов: {withdrawals_without_check}")
+        return _completed(None)
 
-        # Проверяем условия тревоги
-        from services.alerts.emergency import check_emergency_conditions
-        asyncio.create_task(check_emergency_conditions())
+    return _after_commit(
+        get_write_queue().submit(_apply_entry, "withdrawal", amount, chat_id, message_id),
+        lambda snapshot: _entry_committed(
+            snapshot, f"💸 Зафиксирован вывод: {amount:.2f} UAH. Незакрытых выводов: {snapshot.open_withdrawals}"
+        ),
+        "❌ Ошибка добавления вывода"
+    )
 
-    except Exception as e:
-        logger.error(f"❌ Ошибка добавления вывода: {e}")
 
+def add_withdrawal(amount: float, chat_id: Optional[int] = None,
+                   message_id: Optional[int] = None) -> Optional[LedgerSnapshot]:
+    """Добавляет вывод (отрицательная сумма)"""
+    return _wait(submit_withdrawal(amount, chat_id, message_id))
 
-def add_check(amount: float):
-    """Добавляет чек (расход)"""
-    global withdrawals_without_check
 
+def submit_check(amount: float, chat_id: Optional[int] = None, message_id: Optional[int] = None) -> Future:
+    """Ставит чек (расход) в очередь записи"""
     if amount <= 0:
         logger.warning(f"⚠️ Игнорируем неположительную сумму чека: {amount}")
-        return
-
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE totals SET checks = checks + ? WHERE id=1", (amount,))
-        cursor.execute("INSERT INTO transaction_history(type, amount) VALUES(?, ?)", ("check", amount))
-        conn.commit()
-        conn.close()
+        return _completed(None)
 
-        # Закрываем один вывод если есть незакрытые
-        if withdrawals_without_check > 0:
-            withdrawals_without_check -= 1
+    return _after_commit(
+        get_write_queue().submit(_apply_entry, "check", amount, chat_id, message_id),
+        lambda snapshot: _entry_committed(
+            snapshot, f"🧾 Добавлен чек: {amount:.2f} UAH. Незакрытых выводов: {snapshot.open_withdrawals}"
+        ),
+        "❌ Ошибка добавления чека"
+    )
 
-        logger.info(f"🧾 Добавлен чек: {amount:.2f} UAH. Незакрытых выводов: {withdrawals_without_check}")
 
-        update_max_balance()
+def add_check(amount: float, chat_id: Optional[int] = None,
+              message_id: Optional[int] = None) -> Optional[LedgerSnapshot]:
+    """Добавляет чек (расход)"""
+    return _wait(submit_check(amount, chat_id, message_id))
+
+
+def _apply_screenshot(conn, file_id: str, amount: float, raw_text: str,
+                      chat_id: Optional[int] = None, message_id: Optional[int] = None,
+                      image_sha256: Optional[str] = None):
+    # Повторная обработка того же сообщения обновляет запись, а не добавляет новую
+    conn.execute(
+        "INSERT INTO screenshots(file_id, amount, raw_text, period_id, chat_id, message_id, image_sha256) "
+        "VALUES(?, ?, ?, (SELECT period_id FROM totals WHERE id=1), ?, ?, ?) "
+        "ON CONFLICT(chat_id, message_id) DO UPDATE SET "
+        "file_id = excluded.file_id, amount = excluded.amount, raw_text = excluded.raw_text, "
+        "image_sha256 = COALESCE(excluded.image_sha256, image_sha256)",
+        (file_id, amount, raw_text, chat_id, message_id, image_sha256)
+    )
+
+
+def submit_check_screenshot(file_id: str, amount: float, raw_text: str,
+                            chat_id: Optional[int] = None, message_id: Optional[int] = None,
+                            image_sha256: Optional[str] = None) -> Future:
+    """Ставит сохранение скриншота чека в очередь записи"""
+    return _after_commit(
+        get_write_queue().submit(_apply_screenshot, file_id, amount, raw_text, chat_id, message_id, image_sha256),
+        lambda _: logger.debug(f"💾 Сохранен скриншот: {file_id}, сумма: {amount}"),
+        "❌ Ошибка сохранения скриншота"
+    )
+
+
+def save_check_screenshot(file_id: str, amount: float, raw_text: str,
+                          chat_id: Optional[int] = None, message_id: Optional[int] = None,
+                          image_sha256: Optional[str] = None):
+    """Сохраняет информацию о скриншоте чека (image_sha256 — файл в локальном хранилище)"""
+    _wait(submit_check_screenshot(file_id, amount, raw_text, chat_id, message_id, image_sha256))
+
+
+def _apply_reset(conn) -> LedgerSnapshot:
+    # Закрываем текущий период: итоги переносятся в архив, история остается на месте
+    closing = _read_snapshot(conn)
+    conn.execute(
+        "UPDATE periods SET closed_at = CURRENT_TIMESTAMP, incoming = ?, checks = ?, max_balance = ?, "
+        "income_count = ?, check_count = ?, withdrawal_count = ? WHERE id = ?",
+        (closing.incoming, closing.checks, closing.max_balance, closing.income_count, closing.check_count,
+         closing.withdrawal_count, closing.period_id)
+    )
+
+    # Открываем новый период и обнуляем итоги
+    period_id = conn.execute("INSERT INTO periods DEFAULT VALUES").lastrowid
+    conn.execute(
+        "UPDATE totals SET incoming=0, checks=0, max_balance=0, open_withdrawals=0, "
+        "income_count=0, check_count=0, withdrawal_count=0, period_id=? WHERE id=1",
+        (period_id,)
+    )
+    return _read_snapshot(conn)
 
-        # Проверяем условия тревоги
-        from services.alerts.emergency import check_emergency_conditions
-        asyncio.create_task(check_emergency_conditions())
 
+def reset_all_data():
+    """Закрывает текущий период (в архив) и начинает новый"""
+    _wait(_after_commit(
+        get_write_queue().submit(_apply_reset),
+        lambda snapshot: logger.info(f"🔄 Выполнен сброс: начат период #{snapshot.period_id}"),
+        "❌ Ошибка сброса данных"
+    ))
+
+    if PERIOD_RETENTION_DAYS > 0:
+        submit_retention(PERIOD_RETENTION_DAYS)
+
+
+def _apply_retention(conn, days: int) -> int:
+    rows = conn.execute(
+        "SELECT id FROM periods WHERE closed_at IS NOT NULL AND closed_at < datetime('now', ?)",
+        (f"-{days} days",)
+    ).fetchall()
+    period_ids = [(period_id,) for period_id, in rows]
+    conn.executemany("DELETE FROM transaction_history WHERE period_id = ?", period_ids)
+    conn.executemany("DELETE FROM screenshots WHERE period_id = ?", period_ids)
+    conn.executemany("DELETE FROM periods WHERE id = ?", period_ids)
+    return len(period_ids)
+
+
+def submit_retention(days: int) -> Future:
+    """Ставит в очередь удаление закрытых периодов старше days дней"""
+    return _after_commit(
+        get_write_queue().submit(_apply_retention, days),
+        lambda removed: removed and logger.info(f"🗑 Удалено архивных периодов: {removed}"),
+        "❌ Ошибка очистки архива периодов"
+    )
+
+
+def get_periods(limit: int = 30) -> List[Period]:
+    """Закрытые периоды из архива, новые первыми"""
+    try:
+        with get_pool().reader() as conn:
+            rows = conn.execute("""
+                                SELECT id, started_at, closed_at, incoming, checks, max_balance,
+                                       income_count, check_count, withdrawal_count
+                                FROM periods
+                                WHERE closed_at IS NOT NULL
+                                ORDER BY id DESC
+                                LIMIT ?
+                                """, (limit,)).fetchall()
+        return [Period(*row) for row in rows]
     except Exception as e:
-        logger.error(f"❌ Ошибка добавления чека: {e}")
+        logger.error(f"❌ Ошибка получения архива периодов: {e}")
+        return []
 
 
-def save_check_screenshot(file_id: str, amount: float, raw_text: str):
-    """Сохраняет информацию о скриншоте чека"""
+def get_period_transactions(period_id: int, limit: int = 100, offset: int = 0) -> List[tuple]:
+    """Транзакции периода (тип, сумма, время) постранично, новые первыми"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO screenshots(file_id, amount, raw_text) VALUES(?, ?, ?)",
-            (file_id, amount, raw_text)
-        )
-        conn.commit()
-        conn.close()
-        logger.debug(f"💾 Сохранен скриншот: {file_id}, сумма: {amount}")
+        with get_pool().reader() as conn:
+            return conn.execute("""
+                                SELECT type, amount, created_at
+                                FROM transaction_history
+                                WHERE period_id = ?
+                                ORDER BY id DESC
+                                LIMIT ? OFFSET ?
+                                """, (period_id, limit, offset)).fetchall()
     except Exception as e:
-        logger.error(f"❌ Ошибка сохранения скриншота: {e}")
-
+        logger.error(f"❌ Ошибка получения истории периода {period_id}: {e}")
+        return []
 
-def reset_all_data():
-    """Полный сброс всех данных периода"""
-    global withdrawals_without_check
 
+def get_statistics() -> dict:
+    """Получает статистику текущего периода (из счетчиков totals, без сканирования истории)"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        snapshot = _cached(TOTALS, _read_snapshot)
+        return {
+            'balance': snapshot.balance,
+            'incoming': snapshot.incoming,
+            'checks': snapshot.checks,
+            'max_balance': snapshot.max_balance,
+            'income_count': snapshot.income_count,
+            'check_count': snapshot.check_count,
+            'withdrawal_count': snapshot.withdrawal_count,
+            'avg_check': snapshot.avg_check,
+            'withdrawals_without_check': snapshot.open_withdrawals
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка получения статистики: {e}")
+        return {
+            'balance': 0, 'incoming': 0, 'checks': 0, 'max_balance': 0,
+            'income_count': 0, 'check_count': 0, 'withdrawal_count': 0,
+            'avg_check': 0, 'withdrawals_without_check': 0
+        }
 
-        # Обнуляем балансы
-        cursor.execute("UPDATE totals SET incoming=0, checks=0, max_balance=0 WHERE id=1")
 
-        # Очищаем историю
-        cursor.execute("DELETE FROM transaction_history")
-        cursor.execute("DELETE FROM screenshots")
+def _rollup_ranges(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """Разбивает интервал на целые часы (почасовые агрегаты) и края (поминутные)"""
+    # Границы выравниваются по минутам наружу, чтобы текущая минута попадала в интервал
+    start = start.replace(second=0, microsecond=0)
+    if end.second or end.microsecond:
+        end = end.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    first_hour = start.replace(minute=0) + (timedelta(hours=1) if start.minute else timedelta())
+    last_hour = end.replace(minute=0)
+    if first_hour >= last_hour:
+        return [("rollup_minute", start, end)]
+    return [
+        ("rollup_minute", start, first_hour),
+        ("rollup_hour", first_hour, last_hour),
+        ("rollup_minute", last_hour, end),
+    ]
+
+
+def get_rollups(start: datetime, end: datetime) -> Dict[str, Rollup]:
+    """Агрегаты по типам транзакций за [start, end) без сканирования истории (наивные datetime — киевское время)"""
+    if start.tzinfo is not None:
+        start = start.astimezone(KYIV_TZ)
+    if end.tzinfo is not None:
+        end = end.astimezone(KYIV_TZ)
+
+    result = {transaction_type: Rollup() for transaction_type in TRANSACTION_TYPES}
+    try:
+        with get_pool().reader() as conn:
+            for table, range_start, range_end in _rollup_ranges(start, end):
+                if range_start >= range_end:
+                    continue
+                bucket_format = ROLLUP_BUCKETS[table]
+                rows = conn.execute(
+                    f"SELECT type, SUM(count), SUM(sum), MIN(min), MAX(max) FROM {table} "
+                    "WHERE bucket >= ? AND bucket < ? GROUP BY type",
+                    (range_start.strftime(bucket_format), range_end.strftime(bucket_format))
+                ).fetchall()
+                for transaction_type, count, total, low, high in rows:
+                    result[transaction_type] = result.get(transaction_type, Rollup()).merge(
+                        Rollup(count, total, low, high)
+                    )
+    except Exception as e:
+        logger.error(f"❌ Ошибка получения агрегатов: {e}")
+    return result
 
-        conn.commit()
-        conn.close()
 
-        # Сбрасываем счетчик
-        withdrawals_without_check = 0
+def _apply_ocr_attempts(conn, attempts: List[Tuple[str, float, bool]]):
+    conn.executemany(
+        "INSERT INTO ocr_variant_stats(variant, attempts, hits, total_seconds) VALUES(?, 1, ?, ?) "
+        "ON CONFLICT(variant) DO UPDATE SET attempts = attempts + 1, hits = hits + excluded.hits, "
+        "total_seconds = total_seconds + excluded.total_seconds, updated_at = CURRENT_TIMESTAMP",
+        [(variant, int(found), seconds) for variant, seconds, found in attempts]
+    )
 
-        logger.info("🔄 Выполнен полный сброс данных")
 
-    except Exception as e:
-        logger.error(f"❌ Ошибка сброса данных: {e}")
+def submit_ocr_attempts(attempts: List[Tuple[str, float, bool]]) -> Future:
+    """Ставит в очередь учет попыток OCR по вариантам (вариант, время, найдена ли сумма)"""
+    return _after_commit(
+        get_write_queue().submit(_apply_ocr_attempts, list(attempts)),
+        lambda _: None,
+        "❌ Ошибка сохранения статистики OCR"
+    )
 
 
-def get_statistics() -> dict:
-    """Получает статистику текущего периода"""
+def get_ocr_variant_stats() -> Dict[str, Tuple[int, int, float]]:
+    """Статистика вариантов OCR: вариант -> (попытки, найдено сумм, суммарное время, с)"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        with get_pool().reader() as conn:
+            rows = conn.execute("SELECT variant, attempts, hits, total_seconds FROM ocr_variant_stats").fetchall()
+        return {variant: (attempts, hits, seconds) for variant, attempts, hits, seconds in rows}
+    except Exception as e:
+        logger.error(f"❌ Ошибка получения статистики OCR: {e}")
+        return {}
+
+
+def _apply_ocr_cache_put(conn, keys: List[str], amount: Optional[float], raw_text: str, stage: str,
+                        image_sha256: Optional[str], now: float):
+    # Неудачный OCR (без суммы) не кэшируется: такая запись не отдается, а место в лимите заняла бы
+    if amount is not None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO ocr_cache(key, amount, raw_text, stage, image_sha256, created_at, last_used) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?)",
+            [(key, amount, raw_text, stage, image_sha256, now, now) for key in keys]
+        )
+    # Ссылка на изображение живет отдельно от результата: ее не удаляют ни срок жизни, ни LRU кэша
+    if image_sha256 is not None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO image_refs(key, image_sha256, created_at) VALUES(?, ?, ?)",
+            [(key, image_sha256, now) for key in keys]
+        )
+    # Старые ссылки удаляются по своему сроку: файл за ними хранилище могло уже вытеснить
+    conn.execute("DELETE FROM image_refs WHERE created_at < ?", (now - IMAGE_REFS_TTL_DAYS * 86400,))
+    # Вытеснение: сначала просроченные записи, затем давно не использованные сверх лимита
+    conn.execute("DELETE FROM ocr_cache WHERE created_at < ?", (now - OCR_CACHE_TTL_HOURS * 3600,))
+    conn.execute(
+        "DELETE FROM ocr_cache WHERE key IN "
+        "(SELECT key FROM ocr_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+        (OCR_CACHE_MAX_ENTRIES,)
+    )
+
+
+def submit_ocr_cache(keys: List[str], amount: Optional[float], raw_text: str, stage: str,
+                     image_sha256: Optional[str] = None) -> Future:
+    """Ставит в очередь запись результата OCR под всеми ключами (file_unique_id, хэш изображения)"""
+    return _after_commit(
+        get_write_queue().submit(_apply_ocr_cache_put, list(keys), amount, raw_text, stage, image_sha256,
+                                 time.time()),
+        lambda _: None,
+        "❌ Ошибка записи кэша OCR"
+    )
+
+
+def get_stored_image(keys: List[str], file_id: Optional[str] = None) -> Optional[str]:
+    """
+    SHA-256 изображения, уже сохраненного в локальном хранилище: по ключам кэша OCR
+    (таблица image_refs, независимо от срока жизни результата), затем по file_id скриншота
+    """
+    try:
+        with get_pool().reader() as conn:
+            if keys:
+                placeholders = ", ".join("?" * len(keys))
+                rows = dict(conn.execute(
+                    f"SELECT key, image_sha256 FROM image_refs WHERE key IN ({placeholders})",
+                    tuple(keys)
+                ).fetchall())
+                found = next((rows[key] for key in keys if key in rows), None)
+                if found is not None:
+                    return found
+            if file_id:
+                row = conn.execute(
+                    "SELECT image_sha256 FROM screenshots WHERE file_id = ? AND image_sha256 IS NOT NULL "
+                    "ORDER BY id DESC LIMIT 1",
+                    (file_id,)
+                ).fetchone()
+                return row[0] if row else None
+    except Exception as e:
+        logger.error(f"❌ Ошибка поиска изображения в хранилище: {e}")
+    return None
 
-        # Основные суммы
-        cursor.execute("SELECT incoming, checks, max_balance FROM totals WHERE id=1")
-        incoming, checks, max_balance = cursor.fetchone() or (0, 0, 0)
 
-        # Количество транзакций
-        cursor.execute("SELECT COUNT(*) FROM transaction_history WHERE type='income'")
-        income_count = cursor.fetchone()[0]
+def get_screenshot_image(chat_id: int, message_id: int) -> Optional[Tuple[str, Optional[str]]]:
+    """Скриншот сообщения (file_id, SHA-256 изображения в хранилище) или None"""
+    try:
+        with get_pool().reader() as conn:
+            return conn.execute(
+                "SELECT file_id, image_sha256 FROM screenshots WHERE chat_id = ? AND message_id = ?",
+                (chat_id, message_id)
+            ).fetchone()
+    except Exception as e:
+        logger.error(f"❌ Ошибка поиска скриншота: {e}")
+        return None
 
-        cursor.execute("SELECT COUNT(*) FROM transaction_history WHERE type='check'")
-        check_count = cursor.fetchone()[0]
 
-        cursor.execute("SELECT COUNT(*) FROM transaction_history WHERE type='withdrawal'")
-        withdrawal_count = cursor.fetchone()[0]
+def _apply_ocr_cache_touch(conn, keys: List[str], now: float):
+    conn.executemany(
+        "UPDATE ocr_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+        [(now, key) for key in keys]
+    )
 
-        # Средний чек
-        cursor.execute("SELECT AVG(amount) FROM transaction_history WHERE type='check' AND amount > 0")
-        avg_check = cursor.fetchone()[0] or 0
 
-        conn.close()
+def submit_ocr_cache_touch(keys: List[str]) -> Future:
+    """Ставит в очередь отметку использования записей кэша OCR (для вытеснения LRU)"""
+    return _after_commit(
+        get_write_queue().submit(_apply_ocr_cache_touch, list(keys), time.time()),
+        lambda _: None,
+        "❌ Ошибка обновления кэша OCR"
+    )
 
-        return {
-            'balance': incoming - checks,
-            'incoming': incoming,
-            'checks': checks,
-            'max_balance': max_balance,
-            'income_count': income_count,
-            'check_count': check_count,
-            'withdrawal_count': withdrawal_count,
-            'avg_check': avg_check,
-            'withdrawals_without_check': withdrawals_without_check
-        }
 
+def get_ocr_cache(keys: List[str]) -> Optional[Tuple[str, Optional[float], str, str, float, Optional[str]]]:
+    """
+    Непросроченная запись кэша OCR с найденной суммой по первому найденному ключу:
+    (ключ, сумма, текст, этап, создана, sha256). Записи без суммы — только ссылка на изображение.
+    """
+    if not keys:
+        return None
+    try:
+        placeholders = ", ".join("?" * len(keys))
+        with get_pool().reader() as conn:
+            rows = conn.execute(
+                f"SELECT key, amount, raw_text, stage, created_at, image_sha256 FROM ocr_cache "
+                f"WHERE key IN ({placeholders}) AND amount IS NOT NULL AND created_at >= ?",
+                (*keys, time.time() - OCR_CACHE_TTL_HOURS * 3600)
+            ).fetchall()
     except Exception as e:
-        logger.error(f"❌ Ошибка получения статистики: {e}")
-        return {
-            'balance': 0, 'incoming': 0, 'checks': 0, 'max_balance': 0,
-            'income_count': 0, 'check_count': 0, 'withdrawal_count': 0,
-            'avg_check': 0, 'withdrawals_without_check': 0
-        }
\ No newline at end of file
+        logger.error(f"❌ Ошибка чтения кэша OCR: {e}")
+        return None
+
+    found = {row[0]: row for row in rows}
+    return next((found[key] for key in keys if key in found), None)
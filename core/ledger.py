@@ -0,0 +1,194 @@
+"""
+Асинхронный фасад над core.database.
+
+Чтения выполняются в отдельном пуле потоков (settings и totals отдаются из
+кэша без переключения потока), мутации ставятся в очередь записи с групповым
+коммитом, поэтому хендлеры aiogram/Telethon никогда не блокируют event loop
+на дисковом I/O:
+
+    from core import ledger
+    await ledger.add_income(300.0)
+"""
+import asyncio
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from core import database
+from core.cache import SETTINGS, TOTALS
+from core.models import LedgerSnapshot, Period, Reversal, Rollup, Settings
+from core.config import DB_READ_POOL_SIZE
+from utils.logger import logger
+
+# Потоки для чтений из БД и редких синхронных операций (запись идет через очередь с групповым коммитом)
+_executor = ThreadPoolExecutor(max_workers=DB_READ_POOL_SIZE + 1, thread_name_prefix="db")
+
+
+async def _run(func, *args, **kwargs):
+    """Выполняет синхронную функцию БД в пуле потоков"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def _read(name: str, func):
+    """Чтение settings/totals: из кэша сразу, при промахе — в пуле потоков"""
+    if database.is_cached(name):
+        return func()
+    return await _run(func)
+
+
+async def _committed(future: Future):
+    """Дожидается COMMIT мутации из очереди записи; ошибки уже залогированы в core.database"""
+    try:
+        return await asyncio.wrap_future(future)
+    except Exception:
+        return None
+
+
+# Запущенные проверки тревоги: event loop держит на задачи только слабые ссылки
+_emergency_checks: Set[asyncio.Task] = set()
+
+
+def _emergency_check_done(task: asyncio.Task):
+    _emergency_checks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Ошибка проверки условий тревоги: {task.exception()}")
+
+
+def _schedule_emergency_check(snapshot: LedgerSnapshot):
+    """Планирует проверку условий тревоги по снимку после изменения баланса"""
+    from services.alerts.emergency import check_emergency_conditions
+    task = asyncio.create_task(check_emergency_conditions(snapshot))
+    _emergency_checks.add(task)
+    task.add_done_callback(_emergency_check_done)
+
+
+async def get_balance() -> Tuple[float, float, float]:
+    """Текущий баланс (пополнения, расходы, максимальный баланс)"""
+    return await _read(TOTALS, database.get_balance)
+
+
+async def get_snapshot() -> LedgerSnapshot:
+    """Снимок итогов текущего периода"""
+    return await _read(TOTALS, database.get_snapshot)
+
+
+async def get_settings_safe() -> Settings:
+    """Настройки с значениями по умолчанию"""
+    return await _read(SETTINGS, database.get_settings_safe)
+
+
+async def get_statistics() -> dict:
+    """Статистика текущего периода"""
+    return await _read(TOTALS, database.get_statistics)
+
+
+async def update_setting(key: str, value) -> bool:
+    """Обновляет настройку"""
+    return await _run(database.update_setting, key, value)
+
+
+async def add_income(amount: float, chat_id: Optional[int] = None,
+                     message_id: Optional[int] = None) -> Optional[LedgerSnapshot]:
+    """Добавляет пополнение и проверяет условия тревоги; повтор сообщения вернет снимок с duplicate=True"""
+    snapshot = await _committed(database.submit_income(amount, chat_id, message_id))
+    if snapshot and not snapshot.duplicate:
+        _schedule_emergency_check(snapshot)
+    return snapshot
+
+
+async def add_withdrawal(amount: float, chat_id: Optional[int] = None,
+                         message_id: Optional[int] = None) -> Optional[LedgerSnapshot]:
+    """Добавляет вывод и проверяет условия тревоги"""
+    snapshot = await _committed(database.submit_withdrawal(amount, chat_id, message_id))
+    if snapshot and not snapshot.duplicate:
+        _schedule_emergency_check(snapshot)
+    return snapshot
+
+
+async def add_check(amount: float, chat_id: Optional[int] = None,
+                    message_id: Optional[int] = None) -> Optional[LedgerSnapshot]:
+    """Добавляет чек и проверяет условия тревоги"""
+    snapshot = await _committed(database.submit_check(amount, chat_id, message_id))
+    if snapshot and not snapshot.duplicate:
+        _schedule_emergency_check(snapshot)
+    return snapshot
+
+
+async def save_check_screenshot(file_id: str, amount: float, raw_text: str,
+                                chat_id: Optional[int] = None, message_id: Optional[int] = None,
+                                image_sha256: Optional[str] = None):
+    """Сохраняет информацию о скриншоте чека (повтор того же сообщения обновляет запись)"""
+    await _committed(database.submit_check_screenshot(file_id, amount, raw_text, chat_id, message_id,
+                                                      image_sha256))
+
+
+async def reverse_messages(chat_ids: List[int], message_ids: List[int]) -> Optional[Reversal]:
+    """Отменяет транзакции удаленных сообщений одной транзакцией и проверяет условия тревоги"""
+    result = await _committed(database.submit_reversal(chat_ids, message_ids))
+    if result and result.reversed:
+        _schedule_emergency_check(result.snapshot)
+    return result
+
+
+async def reset_all_data():
+    """Закрывает текущий период (в архив) и начинает новый"""
+    await _run(database.reset_all_data)
+
+
+async def get_rollups(start: datetime, end: datetime) -> Dict[str, Rollup]:
+    """Агрегаты по типам транзакций за интервал (по поминутным/почасовым таблицам)"""
+    return await _run(database.get_rollups, start, end)
+
+
+async def get_ocr_variant_stats() -> Dict[str, Tuple[int, int, float]]:
+    """Статистика вариантов OCR (попытки, найдено сумм, суммарное время)"""
+    return await _run(database.get_ocr_variant_stats)
+
+
+def record_ocr_attempts(attempts) -> Future:
+    """Учитывает попытки OCR по вариантам: запись ставится в очередь, ожидать ее не нужно"""
+    return database.submit_ocr_attempts(attempts)
+
+
+async def get_ocr_cache(keys: List[str]):
+    """Запись кэша OCR по первому найденному ключу"""
+    return await _run(database.get_ocr_cache, keys)
+
+
+async def get_stored_image(keys: List[str], file_id: Optional[str] = None) -> Optional[str]:
+    """SHA-256 уже сохраненного изображения по ключам кэша OCR или file_id скриншота"""
+    return await _run(database.get_stored_image, keys, file_id)
+
+
+async def get_screenshot_image(chat_id: int, message_id: int) -> Optional[Tuple[str, Optional[str]]]:
+    """Скриншот сообщения (file_id, SHA-256 изображения в хранилище) или None"""
+    return await _run(database.get_screenshot_image, chat_id, message_id)
+
+
+def record_ocr_cache(keys: List[str], amount: Optional[float], raw_text: str, stage: str,
+                     image_sha256: Optional[str] = None) -> Future:
+    """Сохраняет результат OCR в кэш: запись ставится в очередь, ожидать ее не нужно"""
+    return database.submit_ocr_cache(keys, amount, raw_text, stage, image_sha256)
+
+
+def touch_ocr_cache(keys: List[str]) -> Future:
+    """Отмечает использование записей кэша OCR"""
+    return database.submit_ocr_cache_touch(keys)
+
+
+async def get_periods(limit: int = 30) -> List[Period]:
+    """Архив закрытых периодов"""
+    return await _run(database.get_periods, limit)
+
+
+async def get_period_transactions(period_id: int, limit: int = 100, offset: int = 0) -> List[tuple]:
+    """Транзакции архивного периода постранично"""
+    return await _run(database.get_period_transactions, period_id, limit, offset)
+
+
+def shutdown():
+    """Останавливает пул потоков БД и закрывает соединения"""
+    _executor.shutdown(wait=True)
+    database.close_database()
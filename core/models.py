@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+
+@dataclass(frozen=True)
+class LedgerSnapshot:
+    """Состояние периода сразу после транзакции (неизменяемое)"""
+    incoming: float
+    checks: float
+    max_balance: float
+    open_withdrawals: int
+    income_count: int = 0
+    check_count: int = 0
+    withdrawal_count: int = 0
+    period_id: Optional[int] = None
+    # Сообщение уже было учтено с той же суммой — запись не изменилась
+    duplicate: bool = False
+
+    @property
+    def balance(self) -> float:
+        """Текущий баланс: пополнения минус расходы"""
+        return self.incoming - self.checks
+
+    @property
+    def avg_check(self) -> float:
+        """Средний чек за период"""
+        return self.checks / self.check_count if self.check_count else 0
+
+
+class Settings(NamedTuple):
+    """Настройки бота (распаковывается как кортеж из get_settings_safe)"""
+    auto_reset_time: Optional[str]
+    critical_checks_count: int
+    critical_balance_amount: float
+    alert_messages_per_minute: int
+    emergency_enabled: bool
+
+
+DEFAULT_SETTINGS = Settings(None, 5, -1000.0, 5, True)
+
+
+@dataclass(frozen=True)
+class Period:
+    """Закрытый (архивный) период с итогами на момент сброса"""
+    id: int
+    started_at: str
+    closed_at: Optional[str]
+    incoming: float
+    checks: float
+    max_balance: float
+    income_count: int
+    check_count: int
+    withdrawal_count: int
+
+    @property
+    def balance(self) -> float:
+        return self.incoming - self.checks
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """Агрегат транзакций одного типа за интервал времени"""
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        """Объединяет агрегаты соседних интервалов"""
+        if not other.count:
+            return self
+        if not self.count:
+            return other
+        return Rollup(self.count + other.count, self.total + other.total,
+                      min(self.min, other.min), max(self.max, other.max))
+
+
+class Reversal(NamedTuple):
+    """Результат отмены транзакций удаленных сообщений"""
+    reversed: int
+    snapshot: LedgerSnapshot
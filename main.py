@@ -8,9 +8,11 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
 from core.config import API_TOKEN
+from core import ledger
 from core.database import init_database
 from services.alerts.scheduler import schedule_auto_reset
 from services.alerts import emergency
+from services.ocr import engine as ocr_engine
 from userbot.client import init_userbot
 from utils.logger import logger
 
@@ -48,6 +50,12 @@ async def shutdown(signal_type=None):
             await bot_instance.session.close()
             logger.info("✅ Bot отключен")
 
+        # Остановка потоков БД и закрытие соединений
+        ledger.shutdown()
+
+        # Остановка воркеров OCR
+        ocr_engine.shutdown()
+
     except Exception as e:
         logger.error(f"❌ Ошибка при завершении: {e}")
 
@@ -0,0 +1,76 @@
+"""
+Версионные миграции схемы SQLite.
+
+Текущая версия схемы хранится в PRAGMA user_version. При старте migrate()
+применяет по порядку все миграции с номером больше текущего, каждую в своей
+транзакции вместе с обновлением user_version, поэтому рабочий файл БД
+обновляется на месте без ручной пересборки. Новая миграция — модуль
+mNNNN_<описание>.py с VERSION, DESCRIPTION и upgrade(cursor), добавленный в MIGRATIONS.
+"""
+import sqlite3
+
+from migrations import (
+    m0001_initial,
+    m0002_totals_counters,
+    m0003_indexes,
+    m0004_periods,
+    m0005_rollups,
+    m0006_message_source,
+    m0007_ocr_variant_stats,
+    m0008_ocr_cache,
+    m0009_image_store,
+    m0010_layout_variant_stats,
+    m0011_image_refs,
+    m0012_ocr_cache_created_index,
+    m0013_image_refs_created_index,
+)
+from utils.logger import logger
+
+MIGRATIONS = (
+    m0001_initial,
+    m0002_totals_counters,
+    m0003_indexes,
+    m0004_periods,
+    m0005_rollups,
+    m0006_message_source,
+    m0007_ocr_variant_stats,
+    m0008_ocr_cache,
+    m0009_image_store,
+    m0010_layout_variant_stats,
+    m0011_image_refs,
+    m0012_ocr_cache_created_index,
+    m0013_image_refs_created_index,
+)
+
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы (PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции и возвращает итоговую версию схемы"""
+    current = get_version(conn)
+    if current > LATEST_VERSION:
+        raise RuntimeError(f"Версия схемы БД {current} новее поддерживаемой {LATEST_VERSION}")
+
+    for migration in MIGRATIONS:
+        if migration.VERSION <= current:
+            continue
+
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migration.upgrade(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {migration.VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        current = migration.VERSION
+        logger.info(f"🛠 Применена миграция {current}: {migration.DESCRIPTION}")
+
+    return current
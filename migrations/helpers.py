@@ -0,0 +1,7 @@
+def ensure_column(cursor, table: str, column: str, definition: str) -> bool:
+    """Добавляет колонку в существующую таблицу, если ее еще нет; True, если добавлена"""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
@@ -0,0 +1,130 @@
+"""Исходная схема: история транзакций, итоги, скриншоты чеков и настройки"""
+
+VERSION = 1
+DESCRIPTION = "исходная схема"
+
+
+def upgrade(cursor):
+    # Таблица истории транзакций
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS transaction_history
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       AUTOINCREMENT,
+                       type
+                       TEXT
+                       NOT
+                       NULL
+                       CHECK (
+                       type
+                       IN
+                   (
+                       'income',
+                       'withdrawal',
+                       'check'
+                   )),
+                       amount REAL NOT NULL,
+                       description TEXT DEFAULT '',
+                       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                       )
+                   """)
+
+    # Таблица общих балансов
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS totals
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       CHECK
+                   (
+                       id =
+                       1
+                   ),
+                       incoming REAL DEFAULT 0 CHECK
+                   (
+                       incoming
+                       >=
+                       0
+                   ),
+                       checks REAL DEFAULT 0 CHECK
+                   (
+                       checks
+                       >=
+                       0
+                   ),
+                       max_balance REAL DEFAULT 0
+                       )
+                   """)
+
+    # Таблица скриншотов чеков
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS screenshots
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       AUTOINCREMENT,
+                       file_id
+                       TEXT
+                       NOT
+                       NULL,
+                       amount
+                       REAL
+                       DEFAULT
+                       0,
+                       raw_text
+                       TEXT
+                       DEFAULT
+                       '',
+                       created_at
+                       TIMESTAMP
+                       DEFAULT
+                       CURRENT_TIMESTAMP
+                   )
+                   """)
+
+    # Таблица настроек
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS settings
+                   (
+                       id
+                       INTEGER
+                       PRIMARY
+                       KEY
+                       CHECK
+                   (
+                       id =
+                       1
+                   ),
+                       auto_reset_time TEXT DEFAULT NULL,
+                       critical_checks_count INTEGER DEFAULT 5 CHECK
+                   (
+                       critical_checks_count >
+                       0
+                   ),
+                       critical_balance_amount REAL DEFAULT -1000.0,
+                       alert_messages_per_minute INTEGER DEFAULT 5 CHECK
+                   (
+                       alert_messages_per_minute >
+                       0
+                   ),
+                       emergency_enabled INTEGER DEFAULT 1 CHECK
+                   (
+                       emergency_enabled
+                       IN
+                   (
+                       0,
+                       1
+                   ))
+                       )
+                   """)
+
+    # Инициализация данных по умолчанию
+    cursor.execute("INSERT OR IGNORE INTO totals (id, incoming, checks, max_balance) VALUES (1, 0, 0, 0)")
+    cursor.execute("INSERT OR IGNORE INTO settings (id) VALUES (1)")
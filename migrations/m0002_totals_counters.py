@@ -0,0 +1,23 @@
+"""Счетчики в totals: незакрытые выводы и количество транзакций по типам"""
+from migrations.helpers import ensure_column
+
+VERSION = 2
+DESCRIPTION = "счетчики выводов и транзакций в totals"
+
+
+def upgrade(cursor):
+    ensure_column(cursor, "totals", "open_withdrawals", "INTEGER DEFAULT 0")
+
+    counters_added = False
+    for column in ("income_count", "check_count", "withdrawal_count"):
+        counters_added |= ensure_column(cursor, "totals", column, "INTEGER DEFAULT 0")
+
+    if counters_added:
+        # Счетчики появились в существующей БД — один раз досчитываем их по истории периода
+        cursor.execute("""
+                       UPDATE totals
+                       SET income_count     = (SELECT COUNT(*) FROM transaction_history WHERE type = 'income'),
+                           check_count      = (SELECT COUNT(*) FROM transaction_history WHERE type = 'check'),
+                           withdrawal_count = (SELECT COUNT(*) FROM transaction_history WHERE type = 'withdrawal')
+                       WHERE id = 1
+                       """)
@@ -0,0 +1,10 @@
+"""Индексы для статистики, постраничной истории и поиска скриншотов по file_id"""
+
+VERSION = 3
+DESCRIPTION = "индексы transaction_history и screenshots"
+
+
+def upgrade(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_type_created ON transaction_history(type, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON transaction_history(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_screenshots_file_id ON screenshots(file_id)")
@@ -0,0 +1,41 @@
+"""Периоды: архив закрытых периодов вместо удаления истории при сбросе"""
+from migrations.helpers import ensure_column
+
+VERSION = 4
+DESCRIPTION = "архив периодов"
+
+
+def upgrade(cursor):
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS periods
+                   (
+                       id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                       closed_at TIMESTAMP DEFAULT NULL,
+                       incoming REAL DEFAULT 0,
+                       checks REAL DEFAULT 0,
+                       max_balance REAL DEFAULT 0,
+                       income_count INTEGER DEFAULT 0,
+                       check_count INTEGER DEFAULT 0,
+                       withdrawal_count INTEGER DEFAULT 0
+                   )
+                   """)
+
+    ensure_column(cursor, "totals", "period_id", "INTEGER")
+    ensure_column(cursor, "transaction_history", "period_id", "INTEGER")
+    ensure_column(cursor, "screenshots", "period_id", "INTEGER")
+
+    # Текущие данные становятся первым открытым периодом
+    if cursor.execute("SELECT period_id FROM totals WHERE id = 1").fetchone()[0] is None:
+        cursor.execute("""
+                       INSERT INTO periods (started_at)
+                       VALUES (COALESCE((SELECT MIN(created_at) FROM transaction_history), CURRENT_TIMESTAMP))
+                       """)
+        period_id = cursor.lastrowid
+        cursor.execute("UPDATE totals SET period_id = ? WHERE id = 1", (period_id,))
+        cursor.execute("UPDATE transaction_history SET period_id = ? WHERE period_id IS NULL", (period_id,))
+        cursor.execute("UPDATE screenshots SET period_id = ? WHERE period_id IS NULL", (period_id,))
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_period ON transaction_history(period_id, type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_screenshots_period ON screenshots(period_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_periods_closed ON periods(closed_at)")
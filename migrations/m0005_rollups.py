@@ -0,0 +1,45 @@
+"""Поминутные и почасовые агрегаты транзакций по киевскому времени"""
+from datetime import datetime
+
+import pytz
+
+VERSION = 5
+DESCRIPTION = "поминутные и почасовые агрегаты транзакций"
+
+ROLLUP_TABLES = {
+    "rollup_minute": "%Y-%m-%d %H:%M",
+    "rollup_hour": "%Y-%m-%d %H:00",
+}
+
+
+def upgrade(cursor):
+    for table in ROLLUP_TABLES:
+        cursor.execute(f"""
+                       CREATE TABLE IF NOT EXISTS {table}
+                       (
+                           bucket TEXT NOT NULL,
+                           type TEXT NOT NULL,
+                           count INTEGER NOT NULL DEFAULT 0,
+                           sum REAL NOT NULL DEFAULT 0,
+                           min REAL,
+                           max REAL,
+                           PRIMARY KEY (bucket, type)
+                       ) WITHOUT ROWID
+                       """)
+
+    # Досчитываем агрегаты по уже накопленной истории (created_at хранится в UTC)
+    tz = pytz.timezone("Europe/Kiev")
+    buckets = {table: {} for table in ROLLUP_TABLES}
+    for transaction_type, amount, created_at in cursor.execute(
+            "SELECT type, amount, created_at FROM transaction_history").fetchall():
+        local = pytz.utc.localize(datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")).astimezone(tz)
+        for table, bucket_format in ROLLUP_TABLES.items():
+            key = (local.strftime(bucket_format), transaction_type)
+            count, total, low, high = buckets[table].get(key, (0, 0.0, amount, amount))
+            buckets[table][key] = (count + 1, total + amount, min(low, amount), max(high, amount))
+
+    for table, rows in buckets.items():
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {table}(bucket, type, count, sum, min, max) VALUES(?, ?, ?, ?, ?, ?)",
+            [key + value for key, value in rows.items()]
+        )
@@ -0,0 +1,13 @@
+"""Источник записи (chat_id, message_id) с уникальным индексом для идемпотентной обработки сообщений"""
+from migrations.helpers import ensure_column
+
+VERSION = 6
+DESCRIPTION = "источник сообщения у транзакций и скриншотов"
+
+
+def upgrade(cursor):
+    for table in ("transaction_history", "screenshots"):
+        ensure_column(cursor, table, "chat_id", "INTEGER")
+        ensure_column(cursor, table, "message_id", "INTEGER")
+        # NULL не конфликтуют между собой: записи без источника (ручной ввод) не ограничены
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_source ON {table}(chat_id, message_id)")
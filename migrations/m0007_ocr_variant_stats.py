@@ -0,0 +1,17 @@
+"""Статистика вариантов OCR: попытки, найденные суммы и суммарное время"""
+
+VERSION = 7
+DESCRIPTION = "статистика вариантов OCR"
+
+
+def upgrade(cursor):
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS ocr_variant_stats
+                   (
+                       variant TEXT PRIMARY KEY,
+                       attempts INTEGER NOT NULL DEFAULT 0,
+                       hits INTEGER NOT NULL DEFAULT 0,
+                       total_seconds REAL NOT NULL DEFAULT 0,
+                       updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                   )
+                   """)
@@ -0,0 +1,21 @@
+"""Кэш результатов OCR по file_unique_id и хэшу изображения"""
+
+VERSION = 8
+DESCRIPTION = "кэш результатов OCR"
+
+
+def upgrade(cursor):
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS ocr_cache
+                   (
+                       key TEXT PRIMARY KEY,
+                       amount REAL,
+                       raw_text TEXT NOT NULL DEFAULT '',
+                       stage TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       last_used REAL NOT NULL,
+                       hits INTEGER NOT NULL DEFAULT 0
+                   ) WITHOUT ROWID
+                   """)
+    # Вытеснение LRU идет по last_used
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache(last_used)")
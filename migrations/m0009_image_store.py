@@ -0,0 +1,10 @@
+"""SHA-256 изображения из локального хранилища у скриншотов и записей кэша OCR"""
+from migrations.helpers import ensure_column
+
+VERSION = 9
+DESCRIPTION = "ссылка на изображение в хранилище"
+
+
+def upgrade(cursor):
+    for table in ("screenshots", "ocr_cache"):
+        ensure_column(cursor, table, "image_sha256", "TEXT")
@@ -0,0 +1,11 @@
+"""Статистика вариантов OCR по макетам банков: ключ «макет:вариант»"""
+
+VERSION = 10
+DESCRIPTION = "статистика вариантов OCR по макетам"
+
+
+def upgrade(cursor):
+    # До реестра макетов все варианты были вариантами Crédit Agricole
+    cursor.execute(
+        "UPDATE ocr_variant_stats SET variant = 'credit_agricole:' || variant WHERE instr(variant, ':') = 0"
+    )
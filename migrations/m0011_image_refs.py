@@ -0,0 +1,19 @@
+"""Ссылки ключей кэша OCR на изображения в хранилище, не зависящие от срока жизни кэша"""
+
+VERSION = 11
+DESCRIPTION = "ссылки на изображения в хранилище"
+
+
+def upgrade(cursor):
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS image_refs
+                   (
+                       key TEXT PRIMARY KEY,
+                       image_sha256 TEXT NOT NULL,
+                       created_at REAL NOT NULL
+                   ) WITHOUT ROWID
+                   """)
+    cursor.execute("""
+                   INSERT OR IGNORE INTO image_refs(key, image_sha256, created_at)
+                   SELECT key, image_sha256, created_at FROM ocr_cache WHERE image_sha256 IS NOT NULL
+                   """)
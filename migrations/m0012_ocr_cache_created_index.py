@@ -0,0 +1,8 @@
+"""Индекс срока жизни кэша OCR: очистка просроченных записей без полного прохода по таблице"""
+
+VERSION = 12
+DESCRIPTION = "индекс ocr_cache по created_at"
+
+
+def upgrade(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_created ON ocr_cache(created_at)")
@@ -0,0 +1,8 @@
+"""Индекс срока жизни ссылок на изображения: очистка старых ссылок без полного прохода по таблице"""
+
+VERSION = 13
+DESCRIPTION = "индекс image_refs по created_at"
+
+
+def upgrade(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_image_refs_created ON image_refs(created_at)")
@@ -4,7 +4,8 @@ import pytz
 from typing import Optional
 
 from core.config import ALERT_CHAT_IDS
-from core.database import get_balance, withdrawals_without_check, get_settings_safe
+from core import ledger
+from core.models import LedgerSnapshot
 from utils.logger import logger
 from aiogram import Bot
 
@@ -15,20 +16,22 @@ last_alert_time: Optional[datetime] = None
 alert_count = 0
 
 
-async def check_emergency_conditions():
-    """Проверяет условия активации системы тревог"""
+async def check_emergency_conditions(snapshot: Optional[LedgerSnapshot] = None):
+    """Проверяет условия активации системы тревог (по снимку итогов транзакции, если он передан)"""
     try:
-        _, critical_withdrawals, critical_balance, alert_rate, emergency_enabled = get_settings_safe()
+        _, critical_withdrawals, critical_balance, alert_rate, emergency_enabled = await ledger.get_settings_safe()
 
         if not emergency_enabled:
             await stop_emergency_alerts()
             return
 
-        incoming, checks, _ = get_balance()
-        current_balance = incoming - checks
+        if snapshot is None:
+            snapshot = await ledger.get_snapshot()
+        current_balance = snapshot.balance
+        open_withdrawals = snapshot.open_withdrawals
 
         # Проверяем условия
-        withdrawal_trigger = withdrawals_without_check >= critical_withdrawals
+        withdrawal_trigger = open_withdrawals >= critical_withdrawals
         balance_trigger = current_balance >= critical_balance
 
         triggered = withdrawal_trigger or balance_trigger
@@ -37,7 +40,7 @@ async def check_emergency_conditions():
             # Логируем причину тревоги
             reasons = []
             if withdrawal_trigger:
-                reasons.append(f"выводов подряд: {withdrawals_without_check} ≥ {critical_withdrawals}")
+                reasons.append(f"выводов подряд: {open_withdrawals} ≥ {critical_withdrawals}")
             if balance_trigger:
                 reasons.append(f"баланс: {current_balance:.2f} ≥ {critical_balance:.2f}")
 
@@ -81,11 +84,10 @@ async def send_emergency_alerts(messages_per_minute: int, reasons: list):
                     last_alert_time = datetime.now(pytz.timezone("Europe/Kiev"))
 
                     # Получаем актуальные данные
-                    incoming, checks, _ = get_balance()
-                    current_balance = incoming - checks
+                    snapshot = await ledger.get_snapshot()
 
                     # Формируем сообщение тревоги
-                    message_text = create_alert_message(current_balance, reasons, alert_count)
+                    message_text = create_alert_message(snapshot, reasons, alert_count)
 
                     # Отправляем во все чаты тревог
                     for chat_id in ALERT_CHAT_IDS:
@@ -108,8 +110,9 @@ async def send_emergency_alerts(messages_per_minute: int, reasons: list):
         logger.error(f"❌ Критическая ошибка в рассылке тревог: {e}")
 
 
-def create_alert_message(balance: float, reasons: list, count: int) -> str:
+def create_alert_message(snapshot: LedgerSnapshot, reasons: list, count: int) -> str:
     """Создает текст тревожного сообщения"""
+    balance = snapshot.balance
 
     # Эмодзи в зависимости от серьезности
     if balance < -5000:
@@ -135,7 +138,7 @@ def create_alert_message(balance: float, reasons: list, count: int) -> str:
 🚨 Приоритет: <b>{urgency_text}</b>
 
 💰 Баланс: <code>{balance:,.2f} ₴</code>
-📊 Выводов без чеков: <code>{withdrawals_without_check}</code>
+📊 Выводов без чеков: <code>{snapshot.open_withdrawals}</code>
 
 🔍 <b>Причины тревоги:</b>
 """
@@ -201,7 +204,7 @@ async def send_test_alert():
     return success_count > 0
 
 
-def get_emergency_status() -> dict:
+async def get_emergency_status() -> dict:
     """Возвращает статус системы тревог"""
     global emergency_task, alert_count, last_alert_time
 
@@ -209,7 +212,7 @@ def get_emergency_status() -> dict:
 
     return {
         'active': is_active,
-        'enabled': get_settings_safe()[4],  # emergency_enabled
+        'enabled': (await ledger.get_settings_safe())[4],  # emergency_enabled
         'alert_count': alert_count,
         'last_alert': last_alert_time.isoformat() if last_alert_time else None,
         'task_status': 'running' if is_active else 'stopped'
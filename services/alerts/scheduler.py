@@ -2,7 +2,7 @@ import asyncio
 from datetime import datetime, timedelta
 import pytz
 from utils.logger import logger
-from core.database import get_settings_safe, reset_all_data
+from core import ledger
 from services.alerts.emergency import stop_emergency_alerts
 
 async def schedule_auto_reset():
@@ -13,7 +13,7 @@ async def schedule_auto_reset():
         tz = pytz.timezone("Europe/Kiev")
 
     while True:
-        auto_reset_time, _, _, _, _ = get_settings_safe()
+        auto_reset_time, _, _, _, _ = await ledger.get_settings_safe()
 
         if not auto_reset_time:
             logger.info("⏳ Автосброс не настроен. Проверю снова через минуту.")
@@ -42,7 +42,7 @@ async def schedule_auto_reset():
             return
 
         try:
-            reset_all_data()
+            await ledger.reset_all_data()
             await stop_emergency_alerts()
             logger.info(f"✅ Выполнен автосброс в {datetime.now(tz)}")
         except Exception as e:
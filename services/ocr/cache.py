@@ -0,0 +1,190 @@
+"""
+Кэш результатов OCR.
+
+Один и тот же чек часто пересылают повторно или отправляют заново после
+неудачного распознавания. Результат хранится в SQLite (таблица ocr_cache)
+под двумя ключами: Telegram file_unique_id — проверяется до скачивания —
+и SHA-256 байтов изображения. Горячие записи дополнительно держатся в
+LRU-словаре процесса, поэтому повтор разрешается без обращения к диску.
+Скачанные изображения сохраняются в локальное хранилище (core.blob_store)
+под тем же SHA-256, его получает и скриншот в БД (result.image_sha256). Если
+результата в кэше нет (истек срок или OCR не нашел сумму), но изображение
+этого файла уже лежит в хранилище, оно читается с диска без скачивания:
+
+    from services.ocr import cache
+    result = await cache.recognize(download, cache.file_key(file_unique_id), file_id)
+"""
+import asyncio
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from dataclasses import replace
+from typing import Awaitable, Callable, Optional, Tuple
+
+from core import blob_store, ledger
+from core.config import OCR_CACHE_MAX_ENTRIES, OCR_CACHE_TTL_HOURS
+from services.ocr import engine
+from services.ocr.engine import OcrResult
+
+# Этап результата, взятого из кэша
+CACHE_STAGE = "cache"
+
+# LRU процесса: ключ -> (время создания записи, результат)
+_memory: "OrderedDict[str, Tuple[float, OcrResult]]" = OrderedDict()
+
+# Счетчики обращений: lookups — распознаваний через кэш, hits — из них разрешено кэшем,
+# stored — изображение взято из локального хранилища вместо скачивания
+counters: Counter = Counter()
+
+
+def file_key(file_unique_id) -> Optional[str]:
+    """Ключ по идентификатору файла Telegram (стабилен между пересылками)"""
+    return f"file:{file_unique_id}" if file_unique_id else None
+
+
+def image_key(image_sha256: str) -> str:
+    """Ключ по содержимому изображения"""
+    return f"sha256:{image_sha256}"
+
+
+def _save_image(image_bytes: bytes) -> str:
+    """Кладет изображение в локальное хранилище (если оно включено) и возвращает SHA-256"""
+    store = blob_store.get_store()
+    if store is None:
+        return hashlib.sha256(image_bytes).hexdigest()
+    return store.put(image_bytes)
+
+
+def _enabled() -> bool:
+    return OCR_CACHE_MAX_ENTRIES > 0
+
+
+def _remember(keys, created_at: float, result: OcrResult):
+    for key in keys:
+        _memory[key] = (created_at, result)
+        _memory.move_to_end(key)
+    while len(_memory) > OCR_CACHE_MAX_ENTRIES:
+        _memory.popitem(last=False)
+
+
+async def _lookup(keys) -> Optional[OcrResult]:
+    """Результат из памяти процесса или из БД по первому найденному ключу"""
+    now = time.time()
+    for key in keys:
+        entry = _memory.get(key)
+        if entry is None:
+            continue
+        created_at, result = entry
+        if now - created_at > OCR_CACHE_TTL_HOURS * 3600:
+            del _memory[key]
+            continue
+        _memory.move_to_end(key)
+        ledger.touch_ocr_cache([key])
+        return result
+
+    row = await ledger.get_ocr_cache(list(keys))
+    if row is None:
+        return None
+    key, amount, raw_text, _, created_at, image_sha256 = row
+    result = OcrResult(amount, raw_text, CACHE_STAGE, image_sha256=image_sha256)
+    _remember([key], created_at, result)
+    ledger.touch_ocr_cache([key])
+    return result
+
+
+def _store(keys, result: OcrResult):
+    """
+    Сохраняет результат под ключами. Неудачный OCR (без суммы) не кэшируется: повторная
+    отправка того же чека распознается заново, а в БД остается только ссылка на изображение.
+    """
+    if result.amount is not None:
+        cached = OcrResult(result.amount, result.text, CACHE_STAGE, image_sha256=result.image_sha256)
+        _remember(keys, time.time(), cached)
+    ledger.record_ocr_cache(list(keys), result.amount, result.text, result.stage, result.image_sha256)
+
+
+async def _read_stored(file_id_key: Optional[str], file_id: Optional[str]) -> Tuple[Optional[bytes], Optional[str]]:
+    """Изображение этого файла из локального хранилища и его SHA-256, если оно уже сохранялось"""
+    store = blob_store.get_store()
+    if store is None or not (file_id_key or file_id):
+        return None, None
+    image_sha256 = await ledger.get_stored_image([file_id_key] if file_id_key else [], file_id)
+    if image_sha256 is None:
+        return None, None
+    image_bytes = await asyncio.to_thread(store.read, image_sha256)
+    if image_bytes is None:
+        return None, None
+    counters["stored"] += 1
+    return image_bytes, image_sha256
+
+
+async def _fetch(download: Callable[[], Awaitable[bytes]], file_id_key: Optional[str],
+                 file_id: Optional[str]) -> Tuple[bytes, str]:
+    """Байты изображения и SHA-256: из локального хранилища, иначе скачиванием с сохранением"""
+    image_bytes, image_sha256 = await _read_stored(file_id_key, file_id)
+    if image_bytes is None:
+        image_bytes = await download()
+        # Запись на диск — в потоке, чтобы не блокировать event loop
+        image_sha256 = await asyncio.to_thread(_save_image, image_bytes)
+    return image_bytes, image_sha256
+
+
+async def recognize(download: Callable[[], Awaitable[bytes]], file_id_key: Optional[str] = None,
+                    file_id: Optional[str] = None) -> OcrResult:
+    """
+    Распознает чек с кэшем: по ключу файла — до скачивания, по хэшу — после;
+    промах распознается в пуле OCR и сохраняется под обоими ключами. Изображение,
+    уже сохраненное для этого файла (ключ кэша или file_id скриншота), не скачивается.
+    """
+    if not _enabled():
+        image_bytes, image_sha256 = await _fetch(download, file_id_key, file_id)
+        return replace(await engine.recognize(image_bytes), image_sha256=image_sha256)
+
+    counters["lookups"] += 1
+    if file_id_key:
+        result = await _lookup([file_id_key])
+        if result is not None:
+            counters["hits"] += 1
+            return result
+
+    image_bytes, image_sha256 = await _fetch(download, file_id_key, file_id)
+    content_key = image_key(image_sha256)
+    result = await _lookup([content_key])
+    if result is not None:
+        counters["hits"] += 1
+        # Новый file_unique_id того же изображения: следующий раз обойдемся без скачивания
+        if file_id_key:
+            _store([file_id_key], result)
+        return result
+
+    result = replace(await engine.recognize(image_bytes), image_sha256=image_sha256)
+    _store([key for key in (file_id_key, content_key) if key], result)
+    return result
+
+
+async def recognize_stored(image_sha256: str) -> Optional[OcrResult]:
+    """Повторный OCR изображения из локального хранилища без скачивания и без кэша (None, если его нет)"""
+    store = blob_store.get_store()
+    image_bytes = await asyncio.to_thread(store.read, image_sha256) if store is not None else None
+    if image_bytes is None:
+        return None
+    return replace(await engine.recognize(image_bytes), image_sha256=image_sha256)
+
+
+def hit_rate() -> float:
+    """Доля распознаваний, разрешенных кэшем"""
+    return counters["hits"] / counters["lookups"] if counters["lookups"] else 0.0
+
+
+def describe() -> str:
+    """Краткое описание кэша OCR для экрана статуса"""
+    if not _enabled():
+        return "выключен"
+    return (f"попаданий {counters['hits']}/{counters['lookups']} ({hit_rate() * 100:.0f}%), "
+            f"в памяти {len(_memory)}, из хранилища {counters['stored']}")
+
+
+def clear():
+    """Очищает кэш процесса и счетчики (записи в БД остаются)"""
+    _memory.clear()
+    counters.clear()
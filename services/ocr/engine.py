@@ -0,0 +1,545 @@
+"""
+Исполнитель OCR в пуле процессов.
+
+Каждый процесс-воркер держит свой экземпляр RapidOCR, модель загружается
+один раз при старте воркера. Вызовы из хендлеров возвращают awaitable,
+поэтому распознавание не блокирует event loop, а несколько чеков
+распознаются параллельно на разных ядрах. Внутри воркера варианты
+изображения перебираются каскадом до первой уверенной суммы. Порядок каскада
+подстраивается по накопленной статистике: варианты, которые чаще находят сумму
+за меньшее время, идут первыми, а бесполезные исключаются:
+
+    from services.ocr import engine
+    result = await engine.recognize(image_bytes)
+    result.amount, result.text, result.stage
+"""
+import asyncio
+import functools
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Optional, Sequence, Tuple
+
+import numpy as np
+from onnxruntime import GraphOptimizationLevel, InferenceSession
+from PIL import Image
+from rapidocr_onnxruntime import RapidOCR
+
+from core.config import OCR_WORKERS, OCR_MIN_SCORE, OCR_ADAPTIVE, OCR_PRUNE_MIN_ATTEMPTS, OCR_EXPLORE_EVERY
+from core.config import OCR_BATCH_VARIANTS, OCR_LOCAL_THRESHOLD
+from core.config import OCR_INTRA_THREADS, OCR_INTER_THREADS, OCR_GRAPH_OPT, OCR_VARIANT_STAGES
+from core.config import OCR_MODELS_DIR, OCR_INT8_MODELS
+from services.ocr.extractors import OcrToken, extract_bank_payment, select_amount
+from services.ocr.layouts import Layout, detect_layout, get_layouts
+from services.ocr.preprocessor import ProcessedImage
+from services.ocr.quantize import int8_model_params
+from services.ocr.resolution import decode
+from utils.logger import logger
+
+# Модель текущего процесса (в воркере создается инициализатором)
+_rapid_ocr: Optional[RapidOCR] = None
+
+# Исполнитель основного процесса (создается лениво)
+_executor: Optional[Executor] = None
+
+# Сколько чеков завершили каскад на каждом этапе (в основном процессе)
+stage_counts: Counter = Counter()
+
+# Статистика вариантов основного процесса: вариант -> [попытки, найдено сумм, суммарное время, с];
+# загружается из БД при первом распознавании
+_variant_stats: Optional[Dict[str, list]] = None
+_calls = 0
+
+
+GRAPH_OPT_LEVELS = {
+    "disable": GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def build_rapid_ocr(intra_threads: int = OCR_INTRA_THREADS, inter_threads: int = OCR_INTER_THREADS,
+                    graph_opt: str = OCR_GRAPH_OPT, int8_models: Sequence[str] = OCR_INT8_MODELS,
+                    models_dir: str = OCR_MODELS_DIR) -> RapidOCR:
+    """
+    RapidOCR с параметрами ONNX Runtime. Потоки передаются в конфигурацию RapidOCR, а
+    уровень оптимизации графа в ней зашит (all), поэтому для другого уровня сессии
+    детектора, классификатора и распознавателя пересоздаются с теми же настройками
+    (через внутренние атрибуты RapidOCR: проверено на версии из requirements.txt).
+    Модели из int8_models загружаются квантованными из models_dir (services.ocr.quantize).
+    """
+    if graph_opt not in GRAPH_OPT_LEVELS:
+        raise ValueError(f"неизвестный уровень оптимизации графа: {graph_opt}")
+
+    params = int8_model_params(int8_models, models_dir)
+    if intra_threads > 0:
+        params["intra_op_num_threads"] = intra_threads
+    if inter_threads > 0:
+        params["inter_op_num_threads"] = inter_threads
+    rapid_ocr = RapidOCR(**params)
+
+    if graph_opt != "all":
+        for infer in (rapid_ocr.text_det.infer, rapid_ocr.text_cls.infer, rapid_ocr.text_rec.session):
+            session = infer.session
+            options = session.get_session_options()
+            options.graph_optimization_level = GRAPH_OPT_LEVELS[graph_opt]
+            infer.session = InferenceSession(session._model_path, sess_options=options,
+                                             providers=session.get_providers())
+    return rapid_ocr
+
+
+def _get_rapid_ocr() -> RapidOCR:
+    """Модель RapidOCR текущего процесса"""
+    global _rapid_ocr
+
+    if _rapid_ocr is None:
+        _rapid_ocr = build_rapid_ocr()
+    return _rapid_ocr
+
+
+def _init_worker():
+    """Инициализатор воркера: загружает модель до первой задачи"""
+    _get_rapid_ocr()
+
+
+# Варианты изображения и их порядок по умолчанию задает макет банка (services.ocr.layouts):
+# кропы регионов, их предобработанные версии, полное изображение
+
+# Априорное время варианта (с) по позиции в порядке макета до накопления статистики:
+# растет с позицией и сохраняет исходный порядок по стоимости
+PRIOR_BASE_SECONDS = 0.05
+PRIOR_GROWTH = 1.5
+# Вес априорной оценки в попытках: первые чеки не перетасовывают каскад
+PRIOR_ATTEMPTS = 5
+
+# Этапы RapidOCR: детектор строк, классификатор поворота, распознаватель
+STAGES = frozenset(("det", "cls", "rec"))
+
+
+def parse_variant_stages(spec: str) -> Dict[str, FrozenSet[str]]:
+    """
+    Этапы RapidOCR по вариантам из строки "вариант=det+cls+rec,..." (* — все варианты).
+    Без детектора вариант целиком идет в распознаватель как одна строка текста.
+    """
+    stages = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        chosen = frozenset(stage.strip() for stage in value.split("+") if stage.strip())
+        if not chosen <= STAGES or "rec" not in chosen:
+            raise ValueError(f"этапы варианта {name.strip()}: ожидается подмножество det+cls+rec с rec")
+        stages[name.strip()] = chosen
+    return stages
+
+
+def stages_for(name: str, variant_stages: Dict[str, FrozenSet[str]]) -> FrozenSet[str]:
+    """Этапы RapidOCR для варианта (по умолчанию все)"""
+    return variant_stages.get(name) or variant_stages.get("*") or STAGES
+
+
+VARIANT_STAGES = parse_variant_stages(OCR_VARIANT_STAGES)
+
+# Этап, когда ни один вариант не дал уверенной суммы: сумма ищется по всему тексту
+FALLBACK_STAGE = "fallback"
+# Этап, когда изображение не удалось получить или распознать
+ERROR_STAGE = "error"
+
+
+@dataclass(frozen=True)
+class OcrResult:
+    """Результат распознавания чека"""
+    amount: Optional[float]
+    text: str
+    # Вариант, на котором найдена уверенная сумма, или FALLBACK_STAGE
+    stage: str
+    # (вариант, время OCR в секундах, найдена ли сумма) по каждому выполненному варианту
+    attempts: Tuple[Tuple[str, float, bool], ...] = ()
+    # SHA-256 изображения в локальном хранилище (заполняет services.ocr.cache)
+    image_sha256: Optional[str] = None
+    # Макет банка, по которому строились варианты
+    layout: str = ""
+    # Строки всех выполненных вариантов с рамками и уверенностью
+    tokens: Tuple[OcrToken, ...] = ()
+
+
+def _to_bgr(img: Image.Image) -> np.ndarray:
+    arr = np.array(img.convert("RGB"))
+    return np.ascontiguousarray(arr[:, :, ::-1])  # RGB -> BGR
+
+
+def _bounding_box(points, top: float = 0) -> Tuple[int, int, int, int]:
+    """Рамка (x1, y1, x2, y2) по четырем точкам RapidOCR со сдвигом по вертикали"""
+    xs = [point[0] for point in points]
+    ys = [point[1] - top for point in points]
+    return int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))
+
+
+def read_lines(img: Image.Image, stages: FrozenSet[str] = STAGES, variant: str = "") -> list[OcrToken]:
+    """Выполняет OCR с помощью RapidOCR: строки текста с рамками и уверенностью"""
+    if "det" not in stages:
+        lines, _ = read_lines_direct([img], "cls" in stages, [variant])
+        return lines[0]
+    result, _ = _get_rapid_ocr()(_to_bgr(img), use_cls="cls" in stages)
+    return [OcrToken(text, float(score), _bounding_box(box), variant) for box, text, score in result or []]
+
+
+def read_lines_direct(images: Sequence[Image.Image], use_cls: bool = False,
+                      variants: Optional[Sequence[str]] = None) -> Tuple[list[list[OcrToken]], list[float]]:
+    """
+    Распознает регионы без детектора: каждый регион — одна строка текста (рамка — весь
+    регион), все регионы идут в распознаватель (и классификатор с use_cls) одним батчем.
+    Возвращает строки по каждому региону и время, поделенное между регионами по площади.
+    """
+    rapid_ocr = _get_rapid_ocr()
+    arrays = [_to_bgr(img) for img in images]
+    variants = variants or [""] * len(arrays)
+
+    started = time.perf_counter()
+    if use_cls:
+        arrays, _, _ = rapid_ocr.text_cls(arrays)
+    results, _ = rapid_ocr.text_rec(arrays)
+    elapsed = time.perf_counter() - started
+
+    lines = [
+        [OcrToken(res[0], float(res[1]), (0, 0, arr.shape[1], arr.shape[0]), variant)] if res[0] else []
+        for res, arr, variant in zip(results, arrays, variants)
+    ]
+    areas = [arr.shape[0] * arr.shape[1] for arr in arrays]
+    return lines, [elapsed * area / max(sum(areas), 1) for area in areas]
+
+
+# Белая полоса между регионами на общем холсте: детектор не склеивает строки соседних регионов
+STITCH_GAP = 32
+
+
+def _stitch_groups(heights: Sequence[int], max_side: int) -> list[list[int]]:
+    """
+    Регионы по холстам: подряд, пока высота холста не больше max_side (иначе RapidOCR
+    уменьшит весь холст, и мелкие строки суммы вместе с ним); регион выше max_side — один на холсте
+    """
+    groups: list[list[int]] = []
+    height = 0
+    for i, h in enumerate(heights):
+        if groups and height + STITCH_GAP + h <= max_side:
+            groups[-1].append(i)
+            height += STITCH_GAP + h
+        else:
+            groups.append([i])
+            height = h
+    return groups
+
+
+def _read_canvas(arrays: Sequence[np.ndarray], use_cls: bool,
+                 variants: Sequence[str]) -> Tuple[list[list[OcrToken]], float]:
+    """Один проход RapidOCR по регионам, сложенным друг под другом на общий холст"""
+    width = max(arr.shape[1] for arr in arrays)
+    height = sum(arr.shape[0] for arr in arrays) + STITCH_GAP * (len(arrays) - 1)
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    bands = []
+    tops = []
+    top = 0
+    for arr in arrays:
+        h, w = arr.shape[:2]
+        canvas[top:top + h, :w] = arr
+        tops.append(top)
+        bands.append(top + h + STITCH_GAP / 2)
+        top += h + STITCH_GAP
+
+    started = time.perf_counter()
+    result, _ = _get_rapid_ocr()(canvas, use_cls=use_cls)
+    elapsed = time.perf_counter() - started
+
+    lines = [[] for _ in arrays]
+    for box, text, score in result or []:
+        center = sum(point[1] for point in box) / len(box)
+        region = next((i for i, bottom in enumerate(bands) if center < bottom), len(arrays) - 1)
+        lines[region].append(OcrToken(text, float(score), _bounding_box(box, tops[region]), variants[region]))
+    return lines, elapsed
+
+
+def read_lines_batch(images: Sequence[Image.Image], use_cls: bool = True,
+                     variants: Optional[Sequence[str]] = None) -> Tuple[list[list[OcrToken]], list[float]]:
+    """
+    Распознает несколько регионов одного чека за минимум вызовов RapidOCR: регионы
+    складываются друг под другом на общий холст (один проход детектора на холст, высота
+    холста не больше max_side_len RapidOCR), а строки всех регионов холста идут в
+    классификатор и распознаватель одним батчем. Возвращает строки по каждому региону
+    (рамки в координатах региона) и время холста, поделенное между его регионами по площади.
+    """
+    arrays = [_to_bgr(img) for img in images]
+    variants = variants or [""] * len(arrays)
+    max_side = getattr(_get_rapid_ocr(), "max_side_len", 2000)
+
+    lines: list = [None] * len(arrays)
+    seconds: list = [0.0] * len(arrays)
+    for indices in _stitch_groups([arr.shape[0] for arr in arrays], max_side):
+        group_lines, elapsed = _read_canvas([arrays[i] for i in indices], use_cls, [variants[i] for i in indices])
+        areas = [arrays[i].shape[0] * arrays[i].shape[1] for i in indices]
+        for i, region_lines, area in zip(indices, group_lines, areas):
+            lines[i], seconds[i] = region_lines, elapsed * area / max(sum(areas), 1)
+    return lines, seconds
+
+
+def _variant_builders(image: Image.Image, layout: Layout) -> Dict[str, Callable[[], Image.Image]]:
+    """
+    Ленивые построители вариантов: полное изображение предобрабатывается один раз при
+    первом запрошенном предобработанном варианте, предобработанные кропы — его срезы.
+    """
+    processed: list[ProcessedImage] = []
+
+    def get_processed() -> ProcessedImage:
+        if not processed:
+            processed.append(ProcessedImage(image))
+        return processed[0]
+
+    builders = {"full": lambda: image, "full_processed": lambda: get_processed().full()}
+    for name, box in layout.boxes(image.size).items():
+        builders[name] = lambda box=box: image.crop(box)
+        builders[f"{name}_processed"] = lambda box=box: get_processed().crop(box, OCR_LOCAL_THRESHOLD)
+    return builders
+
+
+def _confident_amount(tokens: list[OcrToken]) -> Optional[float]:
+    """
+    Сумма варианта: кандидат с наибольшим весом (уверенность, валюта, высота текста,
+    контекст строки) среди кандидатов с уверенностью не ниже OCR_MIN_SCORE
+    """
+    candidate = select_amount(tokens, OCR_MIN_SCORE)
+    return candidate.amount if candidate is not None else None
+
+
+def _read_head(images: Sequence[Image.Image], stages: Sequence[FrozenSet[str]],
+               variants: Sequence[str]) -> Tuple[list[list[OcrToken]], list[float]]:
+    """Первые варианты каскада: группы с одинаковыми этапами распознаются одним вызовом"""
+    lines: list = [None] * len(images)
+    seconds: list = [0.0] * len(images)
+    for group_stages in set(stages):
+        indices = [i for i, chosen in enumerate(stages) if chosen == group_stages]
+        group = [images[i] for i in indices]
+        names = [variants[i] for i in indices]
+        if "det" in group_stages:
+            group_lines, group_seconds = read_lines_batch(group, "cls" in group_stages, names)
+        else:
+            group_lines, group_seconds = read_lines_direct(group, "cls" in group_stages, names)
+        for i, region_lines, region_seconds in zip(indices, group_lines, group_seconds):
+            lines[i], seconds[i] = region_lines, region_seconds
+    return lines, seconds
+
+
+def recognize_check(image_bytes: bytes, order: Optional[Sequence[str]] = None,
+                    batch: int = OCR_BATCH_VARIANTS,
+                    orders: Optional[Dict[str, Sequence[str]]] = None,
+                    variant_stages: Optional[Dict[str, FrozenSet[str]]] = None) -> OcrResult:
+    """
+    Каскад распознавания чека (выполняется в воркере): по уменьшенной копии определяется
+    макет банка, его варианты перебираются в порядке order (или orders[макет], или порядке
+    макета) и перебор останавливается на первом, где найдена уверенная сумма. Первые batch
+    вариантов распознаются одним вызовом RapidOCR на группу с одинаковыми этапами
+    (variant_stages, по умолчанию OCR_VARIANT_STAGES).
+    """
+    variant_stages = VARIANT_STAGES if variant_stages is None else variant_stages
+    image = decode(image_bytes)
+    layout = detect_layout(image)
+    builders = _variant_builders(image, layout)
+    if order is None:
+        order = (orders or {}).get(layout.name) or layout.variants
+    order = [name for name in order if name in builders]
+
+    tokens = []
+    attempts = []
+
+    # Первые batch вариантов распознаются одним вызовом, сумма берется из первого по порядку
+    head = tuple(order[:batch]) if batch > 1 else ()
+    if head:
+        started = time.perf_counter()
+        images = [builders[name]() for name in head]
+        build_seconds = (time.perf_counter() - started) / len(head)
+        batch_lines, batch_seconds = _read_head(images, [stages_for(name, variant_stages) for name in head], head)
+
+        found = None
+        for name, lines, seconds in zip(head, batch_lines, batch_seconds):
+            amount = _confident_amount(lines)
+            attempts.append((name, build_seconds + seconds, amount is not None))
+            tokens.extend(lines)
+            if amount is not None and found is None:
+                found = (amount, name)
+
+        if found is not None:
+            return _result(found[0], found[1], tokens, attempts, layout)
+
+    for name in order[len(head):]:
+        started = time.perf_counter()
+        lines = read_lines(builders[name](), stages_for(name, variant_stages), name)
+        amount = _confident_amount(lines)
+        attempts.append((name, time.perf_counter() - started, amount is not None))
+        tokens.extend(lines)
+
+        if amount is not None:
+            return _result(amount, name, tokens, attempts, layout)
+
+    # Ни один вариант не дал уверенной суммы: лучший кандидат по всем строкам, затем поиск по тексту
+    candidate = select_amount(tokens)
+    amount = candidate.amount if candidate is not None else extract_bank_payment(
+        "\n".join(token.text for token in tokens))
+    return _result(amount, FALLBACK_STAGE, tokens, attempts, layout)
+
+
+def _result(amount: Optional[float], stage: str, tokens: list[OcrToken], attempts: list,
+            layout: Layout) -> OcrResult:
+    return OcrResult(amount, "\n".join(token.text for token in tokens), stage, tuple(attempts),
+                     layout=layout.name, tokens=tuple(tokens))
+
+
+def stats_key(layout: str, variant: str) -> str:
+    """Ключ статистики варианта: варианты разных макетов учитываются отдельно"""
+    return f"{layout}:{variant}"
+
+
+def layout_stats(stats: Dict[str, Sequence], layout: str) -> Dict[str, Sequence]:
+    """Статистика вариантов одного макета (вариант -> попытки, найдено сумм, суммарное время)"""
+    prefix = stats_key(layout, "")
+    return {key[len(prefix):]: row for key, row in stats.items() if key.startswith(prefix)}
+
+
+def _variant_score(name: str, position: int, stats: Dict[str, Sequence]) -> float:
+    """Найденные суммы на секунду OCR: сглаженная доля находок / сглаженное среднее время"""
+    attempts, hits, seconds = stats.get(name, (0, 0, 0.0))[:3]
+    prior_seconds = PRIOR_BASE_SECONDS * PRIOR_GROWTH ** position
+    hit_rate = (hits + PRIOR_ATTEMPTS * 0.5) / (attempts + PRIOR_ATTEMPTS)
+    mean_seconds = (seconds + PRIOR_ATTEMPTS * prior_seconds) / (attempts + PRIOR_ATTEMPTS)
+    return hit_rate / max(mean_seconds, 1e-6)
+
+
+def order_variants(stats: Dict[str, Sequence], variants: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Порядок каскада по статистике (вариант -> попытки, найдено сумм, суммарное время):
+    варианты с лучшим отношением находок к времени идут первыми, варианты без единой
+    находки за OCR_PRUNE_MIN_ATTEMPTS попыток исключаются (каскад никогда не пустеет).
+    """
+    variants = tuple(variants)
+    kept = [
+        (position, name) for position, name in enumerate(variants)
+        if not (stats.get(name, (0, 0))[0] >= OCR_PRUNE_MIN_ATTEMPTS and stats[name][1] == 0)
+    ]
+    if not kept:
+        return variants
+    # sorted устойчив: при равных оценках сохраняется исходный порядок
+    return tuple(name for position, name in sorted(kept, key=lambda item: -_variant_score(item[1], item[0], stats)))
+
+
+async def _next_orders() -> Optional[Dict[str, Tuple[str, ...]]]:
+    """
+    Порядок каскада по макетам для очередного чека (None — порядок макетов); каждый
+    OCR_EXPLORE_EVERY-й чек идет в исходном порядке, чтобы статистика не устаревала.
+    """
+    global _variant_stats, _calls
+
+    if not OCR_ADAPTIVE:
+        return None
+    if _variant_stats is None:
+        # Слой БД нужен только основному процессу: воркеры пула его не импортируют
+        from core import ledger
+
+        _variant_stats = {name: list(row) for name, row in (await ledger.get_ocr_variant_stats()).items()}
+
+    _calls += 1
+    if OCR_EXPLORE_EVERY > 0 and _calls % OCR_EXPLORE_EVERY == 0:
+        return None
+    return {
+        name: order_variants(layout_stats(_variant_stats, name), layout.variants)
+        for name, layout in get_layouts().items()
+    }
+
+
+def _get_executor() -> Executor:
+    global _executor
+
+    if _executor is None:
+        if OCR_WORKERS > 0:
+            # spawn: воркеры не наследуют потоки БД и event loop основного процесса
+            _executor = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            logger.info(f"🔍 Запущен пул OCR: {OCR_WORKERS} процесс(ов)")
+        else:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+    return _executor
+
+
+def _record(result: OcrResult):
+    """Учитывает этап и попытки по вариантам (метрики основного процесса и статистика в БД)"""
+    stage_counts[result.stage] += 1
+    attempts = [(stats_key(result.layout, name), seconds, found) for name, seconds, found in result.attempts]
+    if _variant_stats is not None:
+        for key, seconds, found in attempts:
+            row = _variant_stats.setdefault(key, [0, 0, 0.0])
+            row[0] += 1
+            row[1] += int(found)
+            row[2] += seconds
+    if OCR_ADAPTIVE and attempts:
+        from core import ledger
+
+        ledger.record_ocr_attempts(attempts)
+    elapsed = sum(seconds for _, seconds, _ in result.attempts)
+    logger.info(
+        f"🔍 OCR: сумма {result.amount} на этапе {result.stage} (макет {result.layout}) "
+        f"({len(result.attempts)} вариант(ов), {elapsed * 1000:.0f} мс)"
+    )
+
+
+async def recognize(image_bytes: bytes) -> OcrResult:
+    """Распознает чек в пуле OCR"""
+    global _executor
+
+    orders = await _next_orders()
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        result = await loop.run_in_executor(
+            executor, functools.partial(recognize_check, image_bytes, orders=orders)
+        )
+    except BrokenProcessPool:
+        # Воркер упал (например, OOM) — сломанный пул останавливается, следующий вызов создаст новый
+        logger.error("❌ Пул OCR сломан, будет пересоздан")
+        executor.shutdown(wait=False, cancel_futures=True)
+        if _executor is executor:
+            _executor = None
+        raise
+
+    _record(result)
+    return result
+
+
+def describe() -> str:
+    """Краткое описание исполнителя OCR для экрана статуса"""
+    mode = f"процессов: {OCR_WORKERS}" if OCR_WORKERS > 0 else "в основном процессе"
+    return f"{mode}, {'запущен' if _executor is not None else 'запустится при первом чеке'}"
+
+
+def describe_stages() -> str:
+    """Сколько чеков завершили каскад на каждом этапе, по убыванию (пустая строка, если чеков не было)"""
+    return ", ".join(f"{stage} {count}" for stage, count in stage_counts.most_common())
+
+
+def shutdown():
+    """Останавливает воркеры OCR"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def reset_stats():
+    """Сбрасывает статистику основного процесса (перечитается из БД при следующем распознавании)"""
+    global _variant_stats, _calls
+
+    _variant_stats = None
+    _calls = 0
+    stage_counts.clear()
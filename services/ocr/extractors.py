@@ -1,4 +1,8 @@
 import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
 from utils.logger import logger
 
 def extract_bank_payment(text: str):
@@ -49,3 +53,105 @@ def is_likely_payment_amount(amount: float, text: str, start_pos: int, end_pos:
         return False
 
     return True
+
+
+@dataclass(frozen=True)
+class OcrToken:
+    """Строка текста RapidOCR с рамкой (x1, y1, x2, y2) в координатах варианта"""
+    text: str
+    score: float
+    box: Tuple[int, int, int, int]
+    variant: str
+
+    @property
+    def height(self) -> int:
+        return self.box[3] - self.box[1]
+
+    @property
+    def center_y(self) -> float:
+        return (self.box[1] + self.box[3]) / 2
+
+
+@dataclass(frozen=True)
+class AmountCandidate:
+    """Сумма-кандидат: уверенность (score) и вес для выбора среди кандидатов (weight)"""
+    amount: float
+    score: float
+    weight: float
+    token: OcrToken
+
+
+# Число с необязательной валютой, не часть даты или номера; без валюты кандидатом считается
+# только сумма с копейками
+_AMOUNT_RE = re.compile(r"(?<![\d.,])[-+]?\d+(?:[.,]\d{1,2})?(?![.,]?\d)(\s*(?:₴|грн|UAH))?",
+                        flags=re.IGNORECASE)
+_DECIMAL_RE = re.compile(r"[.,]\d{2}$")
+
+# Множитель веса суммы без валюты: такие числа чаще оказываются номерами и датами. Уверенность
+# (score) он не снижает, иначе сумма из кропа строки, отрезавшего «UAH», не прошла бы OCR_MIN_SCORE
+NO_CURRENCY_WEIGHT = 0.6
+# Наибольшее снижение веса за положение: у самой нижней строки варианта вес меньше на эту долю
+POSITION_WEIGHT = 0.3
+
+
+def _rows(tokens: list[OcrToken]) -> list[list[OcrToken]]:
+    """Строки варианта: рамки, центры которых в пределах половины высоты друг от друга, слева направо"""
+    rows: list[list[OcrToken]] = []
+    for token in sorted(tokens, key=lambda t: (t.center_y, t.box[0])):
+        if rows and abs(token.center_y - rows[-1][0].center_y) <= max(rows[-1][0].height, token.height) / 2:
+            rows[-1].append(token)
+        else:
+            rows.append([token])
+    return [sorted(row, key=lambda t: t.box[0]) for row in rows]
+
+
+def amount_candidates(tokens: Iterable[OcrToken]) -> list[AmountCandidate]:
+    """
+    Суммы-кандидаты из строк OCR. Контекст для is_likely_payment_amount — строка
+    чека (рамки на одной высоте), поэтому подпись «Комісія» слева от числа
+    отсекает его, даже если RapidOCR выделил их отдельными рамками. Вес учитывает
+    уверенность, валюту, высоту текста относительно самой высокой строки варианта
+    (сумма платежа на чеке обычно набрана крупнее) и положение по вертикали: сумма
+    платежа стоит под заголовком, а комиссии, остатки и реквизиты — ниже нее.
+    """
+    by_variant: dict = {}
+    for token in tokens:
+        by_variant.setdefault(token.variant, []).append(token)
+
+    candidates = []
+    for variant_tokens in by_variant.values():
+        tallest = max(max(token.height for token in variant_tokens), 1)
+        top = min(token.box[1] for token in variant_tokens)
+        span = max(max(token.box[3] for token in variant_tokens) - top, 1)
+        for row in _rows(variant_tokens):
+            # Пробелы-разделители тысяч убираются до поиска чисел
+            row_text = ""
+            offsets = []
+            for token in row:
+                offsets.append(len(row_text))
+                row_text += normalize_text_for_amounts(token.text) + " "
+
+            # Поиск по всей строке: валюта может быть отдельной рамкой справа от числа
+            for match in _AMOUNT_RE.finditer(row_text):
+                number = match.group(0)[:len(match.group(0)) - len(match.group(1) or "")]
+                if not match.group(1) and not _DECIMAL_RE.search(number):
+                    continue
+                try:
+                    amount = float(number.replace(",", "."))
+                except ValueError:
+                    continue
+                if not is_likely_payment_amount(abs(amount), row_text, match.start(), match.end()):
+                    continue
+
+                token = row[bisect_right(offsets, match.start()) - 1]
+                currency = 1.0 if match.group(1) else NO_CURRENCY_WEIGHT
+                position = 1.0 - POSITION_WEIGHT * (token.center_y - top) / span
+                weight = token.score * currency * (0.5 + 0.5 * token.height / tallest) * position
+                candidates.append(AmountCandidate(amount, token.score, weight, token))
+    return candidates
+
+
+def select_amount(tokens: Iterable[OcrToken], min_score: float = 0.0) -> Optional[AmountCandidate]:
+    """Кандидат с наибольшим весом среди кандидатов с уверенностью не ниже min_score"""
+    candidates = [candidate for candidate in amount_candidates(tokens) if candidate.score >= min_score]
+    return max(candidates, key=lambda candidate: candidate.weight) if candidates else None
@@ -0,0 +1,162 @@
+"""
+Реестр макетов чеков банков.
+
+Макет — JSON-файл: регионы (ROI) в долях ширины и высоты, порядок вариантов
+каскада и признаки для быстрого определения банка по уменьшенной копии
+изображения (соотношение сторон, средний цвет полосы заголовка). Встроенные
+макеты лежат в services/ocr/layout_templates/, свои можно положить в каталог
+OCR_LAYOUTS_DIR без изменения кода (одинаковое имя заменяет встроенный):
+
+    {
+      "name": "mybank",
+      "title": "Мой банк",
+      "match": {"aspect_ratio": [1.8, 2.3], "header_color": [0, 90, 160], "tolerance": 40},
+      "regions": {"amount": [0.1, 0.3, 0.9, 0.4]}
+    }
+
+Скриншот, который не подошел ни под один макет с признаками, распознается
+макетом OCR_DEFAULT_LAYOUT.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from core.config import OCR_DEFAULT_LAYOUT, OCR_LAYOUTS_DIR
+from utils.logger import logger
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "layout_templates")
+
+# Варианты полного изображения есть у каждого макета
+FULL_VARIANTS = ("full", "full_processed")
+
+# Ширина уменьшенной копии для определения макета
+_THUMB_WIDTH = 64
+
+
+@dataclass(frozen=True)
+class Layout:
+    """Макет чека банка"""
+    name: str
+    title: str
+    # Регион -> (x1, y1, x2, y2) в долях ширины и высоты
+    regions: Dict[str, Tuple[float, float, float, float]] = field(default_factory=dict)
+    # Порядок каскада по умолчанию (дешевые первыми)
+    variants: Tuple[str, ...] = FULL_VARIANTS
+    # Признаки: (мин, макс) высота/ширина, средний RGB полосы заголовка и допуск, доля высоты полосы
+    aspect_ratio: Optional[Tuple[float, float]] = None
+    header_color: Optional[Tuple[int, int, int]] = None
+    tolerance: float = 40.0
+    header_band: float = 0.08
+
+    @property
+    def detectable(self) -> bool:
+        return self.aspect_ratio is not None or self.header_color is not None
+
+    def boxes(self, size) -> Dict[str, Tuple[int, int, int, int]]:
+        """Координаты регионов для изображения размера size"""
+        W, H = size
+        return {
+            name: (int(W * x1), int(H * y1), int(W * x2), int(H * y2))
+            for name, (x1, y1, x2, y2) in self.regions.items()
+        }
+
+    def matches(self, aspect: float, header: np.ndarray) -> bool:
+        if self.aspect_ratio is not None and not self.aspect_ratio[0] <= aspect <= self.aspect_ratio[1]:
+            return False
+        if self.header_color is not None:
+            return float(np.abs(header - np.array(self.header_color)).max()) <= self.tolerance
+        return True
+
+
+def _default_variants(regions: Sequence[str]) -> Tuple[str, ...]:
+    """Кропы, затем их предобработанные версии, затем полное изображение"""
+    return tuple(regions) + tuple(f"{name}_processed" for name in regions) + FULL_VARIANTS
+
+
+def parse_layout(data: dict) -> Layout:
+    """Макет из JSON (ValueError при ошибке в описании)"""
+    regions = {name: tuple(float(v) for v in box) for name, box in data.get("regions", {}).items()}
+    for name, box in regions.items():
+        if len(box) != 4 or not (0 <= box[0] < box[2] <= 1 and 0 <= box[1] < box[3] <= 1):
+            raise ValueError(f"регион {name}: ожидается [x1, y1, x2, y2] в долях 0..1")
+
+    variants = tuple(data.get("variants") or _default_variants(list(regions)))
+    known = set(_default_variants(list(regions)))
+    unknown = [name for name in variants if name not in known]
+    if unknown:
+        raise ValueError(f"неизвестные варианты: {', '.join(unknown)}")
+
+    match = data.get("match", {})
+    return Layout(
+        name=data["name"],
+        title=data.get("title", data["name"]),
+        regions=regions,
+        variants=variants,
+        aspect_ratio=tuple(match["aspect_ratio"]) if "aspect_ratio" in match else None,
+        header_color=tuple(match["header_color"]) if "header_color" in match else None,
+        tolerance=float(match.get("tolerance", 40.0)),
+        header_band=float(match.get("header_band", 0.08)),
+    )
+
+
+def load_layouts(*directories: str) -> Dict[str, Layout]:
+    """Макеты из JSON-файлов каталогов (более поздний каталог заменяет одноименные)"""
+    layouts = {}
+    for directory in directories:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json"):
+                continue
+            path = os.path.join(directory, file_name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    layout = parse_layout(json.load(f))
+            except (OSError, KeyError, TypeError, ValueError) as e:
+                logger.error(f"❌ Макет чека {path} пропущен: {e}")
+                continue
+            layouts[layout.name] = layout
+    return layouts
+
+
+_layouts: Optional[Dict[str, Layout]] = None
+
+
+def get_layouts() -> Dict[str, Layout]:
+    """Реестр макетов (загружается один раз на процесс)"""
+    global _layouts
+
+    if _layouts is None:
+        _layouts = load_layouts(TEMPLATES_DIR, OCR_LAYOUTS_DIR)
+    return _layouts
+
+
+def default_layout(layouts: Optional[Dict[str, Layout]] = None) -> Layout:
+    """Макет для скриншотов, не подошедших ни под один макет с признаками"""
+    layouts = get_layouts() if layouts is None else layouts
+    return layouts.get(OCR_DEFAULT_LAYOUT) or Layout("generic", "Неизвестный банк")
+
+
+def detect_layout(image: Image.Image, layouts: Optional[Dict[str, Layout]] = None) -> Layout:
+    """
+    Определяет макет по уменьшенной копии: соотношение сторон и средний цвет полосы
+    заголовка; первый подошедший макет с признаками, иначе макет по умолчанию.
+    """
+    layouts = get_layouts() if layouts is None else layouts
+    candidates = [layout for layout in layouts.values() if layout.detectable]
+    if not candidates:
+        return default_layout(layouts)
+
+    W, H = image.size
+    thumb = np.asarray(image.resize((_THUMB_WIDTH, max(1, H * _THUMB_WIDTH // W)), Image.BILINEAR),
+                       dtype=np.float64)
+    aspect = H / W
+    for layout in candidates:
+        band = thumb[:max(1, int(thumb.shape[0] * layout.header_band))]
+        if layout.matches(aspect, band.reshape(-1, band.shape[-1]).mean(axis=0)):
+            return layout
+    return default_layout(layouts)
@@ -1,70 +1,200 @@
 import numpy as np
-from PIL import Image, ImageOps, ImageFilter
+from PIL import Image, ImageFilter
+
+# Гамма-коррекция 0.85 (таблица считается один раз при импорте)
+GAMMA = 0.85
+_GAMMA_LUT = np.array([int((i / 255.0) ** GAMMA * 255) for i in range(256)], dtype=np.int64)
+_LEVELS = np.arange(256, dtype=np.int64)
+_IDENTITY_LUT = _LEVELS.copy()
+
+
+def _histogram(gray_array: np.ndarray) -> np.ndarray:
+    return np.bincount(gray_array.ravel(), minlength=256).astype(np.int64)
+
+
+def _remap_histogram(hist: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Гистограмма изображения после применения таблицы lut — без прохода по пикселям"""
+    return np.bincount(lut, weights=hist, minlength=256).astype(np.int64)
+
+
+def _otsu_from_histogram(hist: np.ndarray) -> int:
+    """Порог Оцу по гистограмме: межклассовая дисперсия для всех порогов сразу через cumsum"""
+    total = int(hist.sum())
+    w_back = np.cumsum(hist)
+    sum_back = np.cumsum(_LEVELS * hist)
+    w_fore = total - w_back
+    valid = (w_back > 0) & (w_fore > 0)
+    if not valid.any():
+        return 127
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_back = sum_back / w_back
+        mean_fore = (sum_back[-1] - sum_back) / w_fore
+        var_between = (w_back * w_fore) * (mean_back - mean_fore) ** 2
+    var_between = np.where(valid, var_between, 0.0)
+
+    # Первый максимум, как при переборе со строгим сравнением; без разделения классов — 127
+    thresh = int(np.argmax(var_between))
+    return thresh if var_between[thresh] > 0 else 127
+
 
 def _otsu_threshold(gray_array: np.ndarray) -> int:
     """Вычисляет оптимальный порог бинаризации по методу Оцу"""
-    hist, _ = np.histogram(gray_array, bins=256, range=(0, 256))
-    total = gray_array.size
-    sum_total = np.dot(np.arange(256), hist)
-    sumB = wB = 0
-    varMax, thresh = 0.0, 127
-
-    for t in range(256):
-        wB += hist[t]
-        if wB == 0:
-            continue
-        wF = total - wB
-        if wF == 0:
-            break
-        sumB += t * hist[t]
-        mB = sumB / wB
-        mF = (sum_total - sumB) / wF
-        varBetween = wB * wF * (mB - mF) ** 2
-        if varBetween > varMax:
-            varMax = varBetween
-            thresh = t
-    return thresh
+    return _otsu_from_histogram(_histogram(gray_array))
 
 
-def preprocess_for_ocr(img: Image.Image) -> Image.Image:
-    """Предобработка изображения для OCR"""
+def _equalize_lut(hist: np.ndarray) -> np.ndarray:
+    """Таблица ImageOps.equalize по гистограмме"""
+    present = hist[hist > 0]
+    if len(present) <= 1:
+        return _IDENTITY_LUT
+    step = (int(present.sum()) - int(present[-1])) // 255
+    if not step:
+        return _IDENTITY_LUT
+    # n до прибавления h[i]: step // 2 + сумма предыдущих бинов
+    before = np.concatenate(([0], np.cumsum(hist)[:-1]))
+    return np.minimum((step // 2 + before) // step, 255)
+
+
+def _autocontrast_lut(hist: np.ndarray, cutoff: float) -> np.ndarray:
+    """Таблица ImageOps.autocontrast(cutoff) по гистограмме"""
+    hist = hist.copy()
+    n = int(hist.sum())
+    cut = int(n * cutoff // 100)
+    if cut:
+        # Срезаем cut пикселей снизу, затем сверху (как последовательный перебор в PIL)
+        low = np.cumsum(hist)
+        hist = np.where(low <= cut, 0, np.minimum(hist, low - cut))
+        high = np.cumsum(hist[::-1])[::-1]
+        hist = np.where(high <= cut, 0, np.minimum(hist, high - cut))
+
+    nonzero = np.flatnonzero(hist)
+    if len(nonzero) == 0:
+        return _IDENTITY_LUT
+    lo, hi = int(nonzero[0]), int(nonzero[-1])
+    if hi <= lo:
+        return _IDENTITY_LUT
+    scale = 255.0 / (hi - lo)
+    offset = -lo * scale
+    return np.clip(np.trunc(_LEVELS * scale + offset), 0, 255).astype(np.int64)
+
+
+def _min_filter3(binary: np.ndarray) -> np.ndarray:
+    """Минимум по окну 3x3 с повтором краев (утолщение темного текста): две сепарабельные проходки"""
+    h, w = binary.shape
+    padded = np.empty((h + 2, w + 2), dtype=binary.dtype)
+    padded[1:-1, 1:-1] = binary
+    padded[0, 1:-1], padded[-1, 1:-1] = binary[0], binary[-1]
+    padded[:, 0], padded[:, -1] = padded[:, 1], padded[:, -2]
+
+    rows = np.empty((h, w + 2), dtype=binary.dtype)
+    np.minimum(padded[:-2], padded[1:-1], out=rows)
+    np.minimum(rows, padded[2:], out=rows)
+
+    out = np.empty((h, w), dtype=binary.dtype)
+    np.minimum(rows[:, :-2], rows[:, 1:-1], out=out)
+    np.minimum(out, rows[:, 2:], out=out)
+    return out
+
+
+def _scale_factor(size) -> int:
+    """Во сколько раз увеличить изображение, чтобы длинная сторона была около 1600 px"""
+    return max(1, 1600 // max(1, max(size)))
+
+
+def _upscale(img: Image.Image) -> Image.Image:
     W, H = img.size
-    long_side = max(W, H)
-    scale = max(1, 1600 // max(1, long_side))
+    scale = _scale_factor(img.size)
 
     if scale > 1:
         img = img.resize((W * scale, H * scale), Image.LANCZOS)
+    return img
 
-    gray = img.convert("L")
-    gray = ImageOps.equalize(gray)
-    gray = ImageOps.autocontrast(gray, cutoff=1)
-    gray = gray.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
 
-    gamma = 0.85
-    lut = [int((i / 255.0) ** gamma * 255) for i in range(256)]
-    gray = gray.point(lut)
+def _normalize_contrast(gray: Image.Image) -> Image.Image:
+    """equalize + autocontrast(cutoff=1) одной таблицей за один проход по пикселям"""
+    hist = np.array(gray.histogram(), dtype=np.int64)
+    equalize = _equalize_lut(hist)
+    autocontrast = _autocontrast_lut(_remap_histogram(hist, equalize), cutoff=1)
+    return gray.point(autocontrast[equalize].tolist())
 
-    np_gray = np.array(gray)
-    threshold = _otsu_threshold(np_gray)
-    binary = (np_gray > threshold).astype(np.uint8) * 255
-    binary_img = Image.fromarray(binary)
 
-    inverted = ImageOps.invert(binary_img)
-    thick = inverted.filter(ImageFilter.MaxFilter(3))
-    result = ImageOps.invert(thick)
+def _sharpen(gray: Image.Image) -> Image.Image:
+    return gray.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
 
-    return result
 
+def _gamma_threshold(gray_array: np.ndarray) -> int:
+    """Порог Оцу после гаммы: гистограмма после гаммы считается из исходной"""
+    return _otsu_from_histogram(_remap_histogram(_histogram(gray_array), _GAMMA_LUT))
 
-def credit_agricole_crops(img: Image.Image) -> list[Image.Image]:
-    """Создает обрезки изображения для банка Crédit Agricole"""
-    W, H = img.size
 
-    def relative_crop(x1, y1, x2, y2):
-        return img.crop((int(W*x1), int(H*y1), int(W*x2), int(H*y2)))
+def _threshold_lut(threshold: int) -> np.ndarray:
+    return np.where(_GAMMA_LUT > threshold, 255, 0).astype(np.uint8)
+
+
+def _binarize(gray_array: np.ndarray) -> np.ndarray:
+    """Гамма + порог Оцу одной таблицей"""
+    return _threshold_lut(_gamma_threshold(gray_array))[gray_array]
+
+
+def _sharpened_gray(img: Image.Image) -> np.ndarray:
+    """Все этапы до порога: масштабирование, контраст и резкость"""
+    gray = _upscale(img).convert("L")
+    return np.array(_sharpen(_normalize_contrast(gray)))
+
+
+def preprocess_for_ocr(img: Image.Image) -> Image.Image:
+    """Предобработка изображения для OCR"""
+    return Image.fromarray(_min_filter3(_binarize(_sharpened_gray(img))))
+
+
+class ProcessedImage:
+    """
+    Изображение чека, предобработанное один раз целиком. Предобработанные кропы —
+    срезы результата без повторной предобработки; с refine порог Оцу пересчитывается
+    по гистограмме самого региона (локальная бинаризация). Небольшой кроп, которому
+    при отдельной предобработке досталось бы большее увеличение (_scale_factor по его
+    размеру), увеличивается в целое число раз из общего серого прохода до порога,
+    поэтому строки суммы распознаются в прежнем разрешении.
+    """
+
+    def __init__(self, img: Image.Image):
+        self.scale = _scale_factor(img.size)
+        self._sharpened = _sharpened_gray(img)
+        self._threshold = _gamma_threshold(self._sharpened)
+        self._binary = _min_filter3(_threshold_lut(self._threshold)[self._sharpened])
+
+    def full(self) -> Image.Image:
+        return Image.fromarray(self._binary)
+
+    def crop(self, box, refine: bool = False) -> Image.Image:
+        """Кроп по координатам исходного изображения (x1, y1, x2, y2)"""
+        crop_scale = _scale_factor((box[2] - box[0], box[3] - box[1]))
+        x1, y1, x2, y2 = (side * self.scale for side in box)
+        if crop_scale <= self.scale and not refine:
+            return Image.fromarray(self._binary[y1:y2, x1:x2])
 
-    table_area = relative_crop(0.55, 0.28, 0.98, 0.72)
-    amount_row1 = relative_crop(0.60, 0.33, 0.96, 0.41)
-    amount_row2 = relative_crop(0.60, 0.35, 0.96, 0.43)
+        # Поле в 1 px: утолщение на границе региона видит настоящих соседей
+        h, w = self._sharpened.shape
+        top, left = max(0, y1 - 1), max(0, x1 - 1)
+        bottom, right = min(h, y2 + 1), min(w, x2 + 1)
+        threshold = self._threshold
+        if refine:
+            threshold = _gamma_threshold(self._sharpened[y1:y2, x1:x2])
+        gray = self._sharpened[top:bottom, left:right]
+
+        factor = max(1, crop_scale // self.scale)
+        if factor > 1:
+            gray = np.array(Image.fromarray(gray).resize((gray.shape[1] * factor, gray.shape[0] * factor),
+                                                         Image.LANCZOS))
+        thick = _min_filter3(_threshold_lut(threshold)[gray])
+        y0, x0 = (y1 - top) * factor, (x1 - left) * factor
+        return Image.fromarray(thick[y0:y0 + (y2 - y1) * factor, x0:x0 + (x2 - x1) * factor])
+
+
+def credit_agricole_crops(img: Image.Image) -> list[Image.Image]:
+    """Создает обрезки изображения для банка Crédit Agricole"""
+    from services.ocr.layouts import get_layouts
 
-    return [amount_row1, amount_row2, table_area]
+    boxes = get_layouts()["credit_agricole"].boxes(img.size)
+    return [img.crop(boxes[name]) for name in ("amount_row1", "amount_row2", "table_area")]
@@ -1,70 +1,45 @@
-import io
-import numpy as np
-from PIL import Image
 from telethon import TelegramClient
-from rapidocr_onnxruntime import RapidOCR
 from aiogram import Bot
-from services.ocr.preprocessor import preprocess_for_ocr, credit_agricole_crops
-from services.ocr.extractors import extract_bank_payment
+from services.ocr import cache
+from services.ocr.engine import ERROR_STAGE, OcrResult
+from services.ocr.resolution import choose_photo_size
 from utils.logger import logger
 
-rapid_ocr = RapidOCR()
 
-def _rapidocr_read(img: Image.Image) -> list[str]:
-    """Выполняет OCR с помощью RapidOCR"""
-    arr = np.array(img.convert("RGB"))
-    if arr.ndim == 3 and arr.shape[2] == 3:
-        arr = arr[:, :, ::-1]  # RGB -> BGR
-
-    result, _ = rapid_ocr(arr)
-    return [item[1] for item in result] if result else []
-
-
-async def process_check_image_aiogram(bot: Bot, file_id: str):
-    """OCR через aiogram"""
+async def process_check_image_aiogram(bot: Bot, file_id: str, file_unique_id: str = None) -> OcrResult:
+    """OCR через aiogram (повторный чек с тем же file_unique_id не скачивается)"""
     try:
-        file = await bot.get_file(file_id)
-        file_bytes = await bot.download_file(file.file_path)
-        image = Image.open(io.BytesIO(file_bytes)).convert("RGB")
-
-        images_to_process = [image, preprocess_for_ocr(image)]
-        for crop in credit_agricole_crops(image):
-            images_to_process.append(crop)
-            images_to_process.append(preprocess_for_ocr(crop))
-
-        all_text = []
-        for img in images_to_process:
-            all_text.extend(_rapidocr_read(img))
+        async def download() -> bytes:
+            file = await bot.get_file(file_id)
+            return (await bot.download_file(file.file_path)).getvalue()
 
-        full_text = "\n".join(all_text)
-        amount = extract_bank_payment(full_text)
-        return amount, full_text
+        return await cache.recognize(download, cache.file_key(file_unique_id), file_id)
     except Exception as e:
         logger.error(f"OCR aiogram error: {e}")
-        return None, f"OCR error: {e}"
+        return OcrResult(None, f"OCR error: {e}", ERROR_STAGE)
 
 
-async def process_check_image_telethon(client: TelegramClient, message):
+async def process_check_image_telethon(client: TelegramClient, message) -> OcrResult:
     """OCR через telethon"""
     try:
         if not (message.photo or message.document):
-            return None, "Нет медиафайла"
-
-        file = await client.download_media(message, file=io.BytesIO())
-        image = Image.open(file).convert("RGB")
-
-        images_to_process = [image, preprocess_for_ocr(image)]
-        for crop in credit_agricole_crops(image):
-            images_to_process.append(crop)
-            images_to_process.append(preprocess_for_ocr(crop))
-
-        all_text = []
-        for img in images_to_process:
-            all_text.extend(_rapidocr_read(img))
-
-        full_text = "\n".join(all_text)
-        amount = extract_bank_payment(full_text)
-        return amount, full_text
+            return OcrResult(None, "Нет медиафайла", ERROR_STAGE)
+
+        # Для фото — наименьший размер, достаточный для OCR (документ скачивается как есть).
+        # Размер передается типом: объект PhotoSizeProgressive telethon не принимает как thumb
+        thumb = None
+        if message.photo:
+            chosen = choose_photo_size(message.photo.sizes,
+                                       lambda size: (getattr(size, "w", 0), getattr(size, "h", 0)))
+            thumb = getattr(chosen, "type", None)
+
+        async def download() -> bytes:
+            return await client.download_media(message, file=bytes, thumb=thumb)
+
+        # id медиа MTProto стабилен между пересылками (пространство ключей отличается от Bot API)
+        media = message.photo or message.document
+        media_key = cache.file_key(f"mtproto:{media.id}") if getattr(media, "id", None) else None
+        return await cache.recognize(download, media_key)
     except Exception as e:
         logger.error(f"OCR telethon error: {e}")
-        return None, f"OCR error: {e}"
+        return OcrResult(None, f"OCR error: {e}", ERROR_STAGE)
@@ -0,0 +1,96 @@
+"""
+INT8-квантование моделей RapidOCR.
+
+Детектор и распознаватель квантуются офлайн динамическим квантованием ONNX
+Runtime: веса хранятся в INT8 (по каналам), активации квантуются на лету,
+калибровочный набор не нужен. Квантованные модели сохраняются в OCR_MODELS_DIR, а модели из
+OCR_INT8_MODELS engine.build_rapid_ocr() загружает вместо float-моделей.
+Генерация требует пакета onnx (в рантайме бота он не нужен):
+
+    python -m services.ocr.quantize [--output models/ocr] [--models det rec]
+"""
+import argparse
+import os
+import tempfile
+from typing import Dict, Iterable
+
+import rapidocr_onnxruntime
+from rapidocr_onnxruntime.utils import read_yaml
+
+from core.config import OCR_MODELS_DIR, OCR_INT8_MODELS
+from utils.logger import logger
+
+# Модель -> секция конфигурации RapidOCR
+MODELS = {"det": "Det", "rec": "Rec"}
+# Квантуемые операторы (None — все поддерживаемые): свертки распознавателя в INT8 теряют
+# символы сумм, поэтому у него квантуются только MatMul блоков внимания
+QUANTIZED_OPS = {"det": None, "rec": ["MatMul"]}
+
+_PACKAGE_DIR = os.path.dirname(rapidocr_onnxruntime.__file__)
+
+
+def float_model_path(model: str) -> str:
+    """Путь к float-модели из поставки RapidOCR"""
+    config = read_yaml(os.path.join(_PACKAGE_DIR, "config.yaml"))
+    return os.path.join(_PACKAGE_DIR, config[MODELS[model]]["model_path"])
+
+
+def int8_model_path(model: str, directory: str = OCR_MODELS_DIR) -> str:
+    """Путь к квантованной модели: имя float-модели с суффиксом _int8"""
+    name, ext = os.path.splitext(os.path.basename(float_model_path(model)))
+    return os.path.join(directory, f"{name}_int8{ext}")
+
+
+def quantize_models(directory: str = OCR_MODELS_DIR, models: Iterable[str] = tuple(MODELS)) -> Dict[str, str]:
+    """Квантует модели в INT8 (перезаписывает существующие), возвращает модель -> путь"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for model in models:
+            # Свертка констант: веса сверток PaddleOCR становятся инициализаторами
+            prepared = os.path.join(tmp, f"{model}.onnx")
+            quant_pre_process(float_model_path(model), prepared, skip_symbolic_shape=True)
+            paths[model] = int8_model_path(model, directory)
+            quantize_dynamic(prepared, paths[model], per_channel=True, weight_type=QuantType.QUInt8,
+                             op_types_to_quantize=QUANTIZED_OPS[model])
+            logger.info(f"🧮 Модель {model} квантована в INT8: {paths[model]}")
+    return paths
+
+
+def int8_model_params(models: Iterable[str] = OCR_INT8_MODELS, directory: str = OCR_MODELS_DIR) -> Dict[str, str]:
+    """
+    Параметры RapidOCR ({det,rec}_model_path) для квантованных моделей; модель без
+    сгенерированного файла остается float.
+    """
+    params = {}
+    for model in models:
+        if model not in MODELS:
+            logger.warning(f"⚠️ Неизвестная модель OCR для INT8: {model} (доступны: {', '.join(MODELS)})")
+            continue
+        path = int8_model_path(model, directory)
+        if os.path.exists(path):
+            params[f"{model}_model_path"] = path
+        else:
+            logger.warning(f"⚠️ INT8-модель {model} не найдена ({path}), используется float: "
+                           f"python -m services.ocr.quantize --output {directory}")
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=OCR_MODELS_DIR, help="каталог квантованных моделей")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS),
+                        help="какие модели квантовать")
+    args = parser.parse_args()
+
+    for model, path in quantize_models(args.output, args.models).items():
+        before = os.path.getsize(float_model_path(model)) / 1024 / 1024
+        after = os.path.getsize(path) / 1024 / 1024
+        print(f"{model}: {before:.1f} МБ -> {after:.1f} МБ ({path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Политика разрешения для OCR.
+
+Размер чека выбирается по нужной высоте строки текста: из размеров фото
+Telegram берется наименьший, на котором строка будет не ниже
+OCR_TARGET_TEXT_HEIGHT px, а JPEG декодируется сразу в уменьшенном масштабе
+(draft-режим Pillow, 1/2–1/8 без полного декодирования). Изображения больше
+OCR_MAX_LONG_SIDE уменьшаются: детектор RapidOCR все равно их сожмет.
+"""
+import io
+import math
+from typing import Callable, Optional, Sequence, Tuple, TypeVar
+
+from PIL import Image
+
+from core.config import OCR_TARGET_TEXT_HEIGHT, OCR_MAX_LONG_SIDE
+
+# Высота строки текста на скриншоте чека относительно длинной стороны изображения
+TEXT_HEIGHT_RATIO = 1 / 50
+
+Size = TypeVar("Size")
+
+
+def required_long_side() -> int:
+    """Длинная сторона изображения, при которой строка текста не ниже OCR_TARGET_TEXT_HEIGHT"""
+    return min(OCR_MAX_LONG_SIDE, math.ceil(OCR_TARGET_TEXT_HEIGHT / TEXT_HEIGHT_RATIO))
+
+
+def choose_photo_size(sizes: Sequence[Size], dimensions: Callable[[Size], Tuple[int, int]]) -> Optional[Size]:
+    """Наименьший размер фото с длинной стороной не меньше нужной, иначе самый большой"""
+    measured = [(max(dimensions(size)), size) for size in sizes if all(dimensions(size))]
+    if not measured:
+        return sizes[-1] if sizes else None
+
+    target = required_long_side()
+    enough = [item for item in measured if item[0] >= target]
+    return min(enough, key=lambda item: item[0])[1] if enough else max(measured, key=lambda item: item[0])[1]
+
+
+def decode(image_bytes: bytes) -> Image.Image:
+    """Декодирует изображение в RGB в разрешении, достаточном для OCR"""
+    img = Image.open(io.BytesIO(image_bytes))
+    long_side = max(img.size)
+    target = required_long_side()
+
+    if img.format == "JPEG" and long_side > target:
+        # draft выбирает масштаб DCT так, чтобы результат был не меньше запрошенного размера
+        scale = target / long_side
+        img.draft("RGB", (math.ceil(img.size[0] * scale), math.ceil(img.size[1] * scale)))
+
+    img = img.convert("RGB")
+    if max(img.size) > OCR_MAX_LONG_SIDE:
+        scale = OCR_MAX_LONG_SIDE / max(img.size)
+        img = img.resize((max(1, round(img.size[0] * scale)), max(1, round(img.size[1] * scale))),
+                         Image.LANCZOS, reducing_gap=2.0)
+    return img
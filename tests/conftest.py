@@ -0,0 +1,14 @@
+import os
+import tempfile
+import pytest
+from core import database
+
+@pytest.fixture
+def temp_db(monkeypatch):
+    db_fd, db_path = tempfile.mkstemp()
+    os.close(db_fd)
+    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
+    database.init_database()
+    yield db_path
+    database.close_database()
+    os.remove(db_path)
@@ -0,0 +1,50 @@
+import os
+import time
+from core.blob_store import BlobStore
+
+def test_put_is_content_addressed(tmp_path):
+    store = BlobStore(str(tmp_path), 1024)
+    digest = store.put(b"check-image")
+    assert store.put(b"check-image") == digest
+    assert len(store) == 1 and store.total_bytes == len(b"check-image")
+
+    with store.open(digest) as blob:
+        assert blob[:5] == b"check"
+    assert store.read(digest) == b"check-image"
+    assert store.open("0" * 64) is None
+
+    # После перезапуска размеры восстанавливаются с диска
+    assert BlobStore(str(tmp_path), 1024).total_bytes == store.total_bytes
+
+def test_least_recently_used_blobs_are_evicted(tmp_path):
+    store = BlobStore(str(tmp_path), 250)
+    first, second = store.put(b"a" * 100), store.put(b"b" * 100)
+    # Делаем второй блоб давно не использованным, затем читаем первый
+    old = time.time() - 100
+    os.utime(store.path(first), (old, old))
+    os.utime(store.path(second), (old - 50, old - 50))
+    store.read(first)
+
+    third = store.put(b"c" * 100)
+    assert first in store and third in store
+    assert second not in store and not os.path.exists(store.path(second))
+    assert store.total_bytes == 200
+
+def test_blob_removed_outside_the_process_does_not_break_put(tmp_path):
+    store = BlobStore(str(tmp_path), 150)
+    first = store.put(b"a" * 100)
+    os.remove(store.path(first))
+
+    second = store.put(b"b" * 100)
+    assert store.read(second) == b"b" * 100
+    assert first not in store and store.total_bytes == 100
+
+def test_describe_reports_store_usage(tmp_path, monkeypatch):
+    from core import blob_store
+
+    monkeypatch.setattr(blob_store, "IMAGE_STORE_MAX_MB", 2)
+    monkeypatch.setattr(blob_store, "_store", BlobStore(str(tmp_path), 2 * 1024 * 1024))
+    blob_store.get_store().put(b"x" * 1024 * 1024)
+    assert blob_store.describe() == "1 файлов, 1.0 из 2 МБ"
+    monkeypatch.setattr(blob_store, "IMAGE_STORE_MAX_MB", 0)
+    assert blob_store.describe() == ""
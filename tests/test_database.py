@@ -1,17 +1,11 @@
-import os
+import asyncio
 import sqlite3
-import tempfile
+from datetime import datetime, timedelta
 import pytest
-from core import database
-
-@pytest.fixture
-def temp_db(monkeypatch):
-    db_fd, db_path = tempfile.mkstemp()
-    os.close(db_fd)
-    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
-    database.init_database()
-    yield db_path
-    os.remove(db_path)
+from core import database, ledger
+from core.config import DB_PRAGMA_PROFILES
+from core.connection import ConnectionPool
+from core.models import Rollup
 
 def test_add_income_and_balance(temp_db):
     database.add_income(500)
@@ -25,3 +19,280 @@ def test_add_withdrawal_and_check(temp_db):
     database.add_check(100)
     incoming, checks, max_balance = database.get_balance()
     assert checks >= 100
+
+def test_mutations_return_snapshot(temp_db):
+    snapshot = database.add_income(300)
+    assert (snapshot.incoming, snapshot.balance, snapshot.max_balance) == (300, 300, 300)
+    assert database.add_withdrawal(-100).open_withdrawals == 1
+    snapshot = database.add_check(100)
+    assert (snapshot.checks, snapshot.balance, snapshot.open_withdrawals) == (100, 200, 0)
+    assert snapshot.max_balance == 300
+    assert database.get_snapshot() == snapshot
+
+def test_state_cache_is_write_through(temp_db):
+    assert database.get_settings_safe().critical_checks_count == 5
+    versions = database.get_cache_versions()
+    assert database.update_setting("critical_checks_count", 7)
+    database.add_income(50)
+    assert database.get_cache_versions()["settings"] == versions["settings"] + 1
+    assert database.get_cache_versions()["totals"] == versions["totals"] + 1
+
+    # Горячие чтения отдаются из памяти, без обращения к SQLite
+    with sqlite3.connect(temp_db) as conn:
+        conn.execute("UPDATE totals SET incoming = 0 WHERE id=1")
+    assert database.is_cached("settings") and database.is_cached("totals")
+    assert database.get_settings_safe()[1] == 7
+    assert database.get_balance()[0] == 50
+
+def test_statistics_are_incremental(temp_db):
+    database.add_income(300)
+    database.add_income(200)
+    database.add_withdrawal(-50)
+    database.add_check(100)
+    database.add_check(50)
+    stats = database.get_statistics()
+    assert (stats['income_count'], stats['check_count'], stats['withdrawal_count']) == (2, 2, 1)
+    assert stats['avg_check'] == 75
+    assert stats['balance'] == 350
+    database.reset_all_data()
+    assert database.get_statistics()['income_count'] == 0
+
+def test_reset_archives_period(temp_db):
+    database.add_income(300)
+    database.add_check(100)
+    period_id = database.get_snapshot().period_id
+    database.reset_all_data()
+
+    snapshot = database.get_snapshot()
+    assert snapshot.balance == 0 and snapshot.period_id != period_id
+    [period] = database.get_periods()
+    assert (period.id, period.balance, period.income_count, period.check_count) == (period_id, 200, 1, 1)
+    assert [row[:2] for row in database.get_period_transactions(period_id)] == [("check", 100), ("income", 300)]
+
+    database.add_income(50)
+    assert len(database.get_period_transactions(snapshot.period_id)) == 1
+
+def test_period_retention_removes_old_periods(temp_db):
+    database.add_income(10)
+    database.reset_all_data()
+    with sqlite3.connect(temp_db) as conn:
+        conn.execute("UPDATE periods SET closed_at = datetime('now', '-10 days') WHERE closed_at IS NOT NULL")
+    assert database.submit_retention(30).result() == 0
+    assert database.submit_retention(7).result() == 1
+    assert database.get_periods() == []
+
+def test_rollups_are_maintained_on_insert(temp_db):
+    database.add_income(300)
+    database.add_income(100)
+    database.add_check(50)
+    now = datetime.now(database.KYIV_TZ)
+
+    rollups = database.get_rollups(now - timedelta(hours=3), now)
+    assert rollups['income'] == Rollup(2, 400, 100, 300)
+    assert rollups['check'].count == 1
+    assert rollups['withdrawal'] == Rollup()
+    assert database.get_rollups(now + timedelta(minutes=1), now + timedelta(hours=2))['income'].count == 0
+
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT SUM(count) FROM rollup_hour").fetchone()[0] == 3
+
+def test_reversal_hits_the_rollup_bucket_of_insert(temp_db, monkeypatch):
+    import pytz
+
+    # Запись в последнюю долю секунды минуты: интервал и created_at должны совпасть
+    moment = datetime(2025, 1, 1, 10, 15, 59, 999999, tzinfo=pytz.utc)
+
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment.astimezone(tz) if tz else moment.replace(tzinfo=None)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(database, "datetime", FixedDatetime)
+        database.add_income(300, chat_id=-100, message_id=1)
+
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT created_at FROM transaction_history").fetchone()[0] == "2025-01-01 10:15:59"
+        assert conn.execute("SELECT bucket FROM rollup_minute").fetchone()[0] == "2025-01-01 12:15"
+    assert database.reverse_messages([-100], [1]).reversed == 1
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM rollup_minute").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM rollup_hour").fetchone()[0] == 0
+
+def test_rollup_ranges_split_hours_and_edges():
+    start, end = datetime(2025, 1, 1, 10, 15), datetime(2025, 1, 1, 13, 40, 30)
+    assert database._rollup_ranges(start, end) == [
+        ("rollup_minute", datetime(2025, 1, 1, 10, 15), datetime(2025, 1, 1, 11)),
+        ("rollup_hour", datetime(2025, 1, 1, 11), datetime(2025, 1, 1, 13)),
+        ("rollup_minute", datetime(2025, 1, 1, 13), datetime(2025, 1, 1, 13, 41)),
+    ]
+
+def test_redelivered_message_is_not_counted_twice(temp_db):
+    first = database.add_income(300, chat_id=-100, message_id=7)
+    again = database.add_income(300, chat_id=-100, message_id=7)
+    assert again.duplicate and again.incoming == first.incoming == 300
+    assert database.get_statistics()['income_count'] == 1
+    assert not database.get_snapshot().duplicate
+
+    # Отредактированная сумма заменяет прежнюю запись
+    edited = database.add_income(250, chat_id=-100, message_id=7)
+    assert (edited.incoming, edited.income_count, edited.duplicate) == (250, 1, False)
+    assert edited.max_balance == 250
+    now = datetime.now(database.KYIV_TZ)
+    assert database.get_rollups(now - timedelta(hours=1), now)['income'].total == 250
+
+    # Сообщения без источника не ограничены
+    database.add_income(10)
+    database.add_income(10)
+    assert database.get_snapshot().income_count == 3
+
+def test_screenshot_of_same_message_is_updated(temp_db):
+    database.save_check_screenshot("f1", 0, "OCR failed", chat_id=-200, message_id=5)
+    database.save_check_screenshot("f1", 120, "raw", chat_id=-200, message_id=5)
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT amount, raw_text FROM screenshots").fetchall() == [(120, "raw")]
+
+def test_deleted_messages_are_reversed_in_bulk(temp_db):
+    database.add_income(300, chat_id=-100, message_id=1)
+    database.add_income(200, chat_id=-100, message_id=2)
+    database.add_withdrawal(-50, chat_id=-100, message_id=3)
+    database.add_check(80, chat_id=-200, message_id=1)
+    database.save_check_screenshot("f", 80, "", chat_id=-200, message_id=1)
+    database.add_income(40)
+
+    result = database.reverse_messages([-100], [1, 3, 99])
+    assert result.reversed == 2
+    snapshot = result.snapshot
+    assert (snapshot.incoming, snapshot.income_count, snapshot.withdrawal_count) == (240, 2, 0)
+    assert snapshot.open_withdrawals == 0
+    # Максимум пересчитан по оставшейся истории: 200, 200 - 80, 120 + 40
+    assert snapshot.max_balance == 200
+    assert database.get_snapshot() == snapshot
+
+    result = database.reverse_messages([-100, -200], [1])
+    assert result.reversed == 1 and result.snapshot.checks == 0
+    assert result.snapshot.max_balance == 240
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM screenshots").fetchone()[0] == 0
+    now = datetime.now(database.KYIV_TZ)
+    rollups = database.get_rollups(now - timedelta(hours=1), now)
+    assert (rollups['income'].total, rollups['check'], rollups['withdrawal']) == (240, Rollup(), Rollup())
+
+def test_reversal_of_archived_period_updates_archive(temp_db):
+    database.add_income(300, chat_id=-100, message_id=1)
+    database.add_income(100, chat_id=-100, message_id=2)
+    database.reset_all_data()
+    database.reverse_messages([-100], [2])
+    assert database.get_snapshot().incoming == 0
+    [period] = database.get_periods()
+    assert (period.incoming, period.income_count, period.max_balance) == (300, 1, 300)
+
+def test_ocr_variant_stats_are_accumulated(temp_db):
+    database.submit_ocr_attempts([("amount_row1", 0.05, False), ("full", 0.5, True)]).result()
+    database.submit_ocr_attempts([("amount_row1", 0.07, True)]).result()
+
+    stats = database.get_ocr_variant_stats()
+    assert stats["amount_row1"][:2] == (2, 1)
+    assert stats["amount_row1"][2] == pytest.approx(0.12)
+    assert stats["full"][:2] == (1, 1)
+
+def test_ocr_cache_evicts_least_recently_used(temp_db, monkeypatch):
+    monkeypatch.setattr(database, "OCR_CACHE_MAX_ENTRIES", 2)
+    database.submit_ocr_cache(["file:a"], 10.0, "a", "full").result()
+    database.submit_ocr_cache(["file:b"], 20.0, "b", "full").result()
+    database.submit_ocr_cache_touch(["file:a"]).result()
+    database.submit_ocr_cache(["file:c"], 30.0, "c", "full").result()
+
+    assert database.get_ocr_cache(["file:b"]) is None
+    assert database.get_ocr_cache(["file:a"])[1] == 10.0
+    assert database.get_ocr_cache(["file:x", "file:c"])[:4] == ("file:c", 30.0, "c", "full")
+
+    # Просроченные записи не отдаются
+    monkeypatch.setattr(database, "OCR_CACHE_TTL_HOURS", 0)
+    assert database.get_ocr_cache(["file:a"]) is None
+
+def test_failed_ocr_does_not_evict_cached_result(temp_db, monkeypatch):
+    monkeypatch.setattr(database, "OCR_CACHE_MAX_ENTRIES", 1)
+    database.submit_ocr_cache(["file:a"], 10.0, "a", "full").result()
+    database.submit_ocr_cache(["file:b", "sha256:bbb"], None, "", "full", "bbb").result()
+
+    assert database.get_ocr_cache(["file:a"])[1] == 10.0
+    assert database.get_stored_image(["file:b"]) == "bbb"
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0] == 1
+
+def test_image_ref_outlives_ocr_cache_ttl(temp_db, monkeypatch):
+    database.submit_ocr_cache(["file:a", "sha256:abc"], None, "", "full", "abc").result()
+    assert database.get_stored_image(["file:a"]) == "abc"
+
+    # Очистка просроченных записей кэша ссылку на изображение не трогает
+    monkeypatch.setattr(database, "OCR_CACHE_TTL_HOURS", 0)
+    database.submit_ocr_cache(["file:b"], 10.0, "b", "full").result()
+    with sqlite3.connect(temp_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM ocr_cache WHERE key = 'file:a'").fetchone()[0] == 0
+    assert database.get_stored_image(["file:a"]) == "abc"
+
+    # Ссылки старше IMAGE_REFS_TTL_DAYS удаляются при следующей записи
+    monkeypatch.setattr(database, "IMAGE_REFS_TTL_DAYS", 0)
+    database.submit_ocr_cache(["file:c"], 20.0, "c", "full").result()
+    assert database.get_stored_image(["file:a"]) is None
+
+def test_connections_are_reused(temp_db):
+    for _ in range(50):
+        database.add_income(10)
+        database.get_balance()
+        database.get_statistics()
+    pool = database.get_pool()
+    assert pool.opened_connections <= pool.size + 1
+    incoming, _, _ = database.get_balance()
+    assert incoming == 500
+
+def test_pragma_profile_is_applied(temp_db):
+    pool = ConnectionPool(temp_db, 1, DB_PRAGMA_PROFILES["balanced"])
+    with pool.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+    pool.close()
+
+def test_default_pragma_profile_is_durable():
+    from core.config import DB_PRAGMA_PROFILE
+
+    assert DB_PRAGMA_PROFILE == "safe"
+    assert DB_PRAGMA_PROFILES["safe"]["journal_mode"] == "WAL"
+    assert DB_PRAGMA_PROFILES["safe"]["synchronous"] == "FULL"
+
+def test_group_commit_coalesces_writes(temp_db):
+    futures = [database.submit_income(1) for _ in range(100)]
+    snapshots = [future.result() for future in futures]
+    write_queue = database.get_write_queue()
+    assert [snapshot.incoming for snapshot in snapshots] == list(range(1, 101))
+    assert write_queue.operations == 100
+    assert write_queue.batches < write_queue.operations
+
+@pytest.mark.asyncio
+async def test_ledger_async_facade(temp_db):
+    await ledger.update_setting("emergency_enabled", 0)
+    assert await ledger.add_income(300)
+    assert await ledger.add_check(100)
+    assert not await ledger.add_income(-5)
+    incoming, checks, _ = await ledger.get_balance()
+    assert (incoming, checks) == (300, 100)
+    # Дожидаемся запланированных проверок тревоги
+    pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    await asyncio.gather(*pending)
+
+@pytest.mark.asyncio
+async def test_emergency_check_task_is_kept_until_done(temp_db, monkeypatch):
+    from services.alerts import emergency
+
+    async def failing_check(snapshot=None):
+        raise RuntimeError("alert chat unavailable")
+
+    monkeypatch.setattr(emergency, "check_emergency_conditions", failing_check)
+    assert await ledger.add_income(300)
+    tasks = set(ledger._emergency_checks)
+    assert tasks
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert not ledger._emergency_checks
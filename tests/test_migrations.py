@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+import pytest
+import migrations
+from migrations import m0001_initial
+from core import database
+
+@pytest.fixture
+def db_path():
+    db_fd, path = tempfile.mkstemp()
+    os.close(db_fd)
+    yield path
+    os.remove(path)
+
+def _indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+
+def test_fresh_database_reaches_latest_version(db_path):
+    conn = sqlite3.connect(db_path)
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    assert {"idx_history_type_created", "idx_screenshots_file_id", "idx_ocr_cache_created",
+            "idx_image_refs_created"} <= _indexes(conn)
+    # Повторный запуск ничего не делает
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    conn.close()
+
+def test_existing_database_is_upgraded_in_place(db_path, monkeypatch):
+    # Рабочий файл со старой схемой и без user_version
+    conn = sqlite3.connect(db_path)
+    m0001_initial.upgrade(conn.cursor())
+    conn.execute("UPDATE totals SET incoming = 500, checks = 100 WHERE id=1")
+    conn.executemany("INSERT INTO transaction_history(type, amount) VALUES(?, ?)",
+                     [("income", 300), ("income", 200), ("check", 100), ("withdrawal", -50)])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
+    database.init_database()
+    try:
+        stats = database.get_statistics()
+        assert stats['balance'] == 400
+        assert (stats['income_count'], stats['check_count'], stats['withdrawal_count']) == (2, 1, 1)
+        now = datetime.now(database.KYIV_TZ)
+        assert database.get_rollups(now - timedelta(days=1), now)['income'].total == 500
+    finally:
+        database.close_database()
+
+    conn = sqlite3.connect(db_path)
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    conn.close()
+
+def test_newer_schema_is_rejected(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA user_version = {migrations.LATEST_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    conn.close()
@@ -1,4 +1,5 @@
 import pytest
+from types import SimpleNamespace
 from services.ocr.extractors import normalize_text_for_amounts, is_likely_payment_amount
 
 def test_normalize_text_for_amounts():
@@ -16,3 +17,528 @@ def test_is_likely_payment_amount_false():
     text = "Комиссия 50 грн"
     start, end = text.find("50"), text.find("50") + 2
     assert is_likely_payment_amount(50, text, start, end) is False
+
+def test_amount_is_selected_by_confidence_and_context():
+    from services.ocr.extractors import OcrToken, select_amount
+
+    def token(text, box, score=0.95):
+        return OcrToken(text, score, box, "full")
+
+    tokens = [
+        token("Комісія", (10, 100, 100, 130)), token("5.00 UAH", (300, 100, 400, 130)),
+        token("Сума", (10, 200, 100, 230)), token("1 480.50", (300, 190, 500, 240)), token("UAH", (510, 195, 560, 235)),
+        token("01.02.2025 14:33", (10, 300, 300, 330)),
+        token("Баланс 12.50", (10, 400, 200, 420)),
+    ]
+    # Комиссия отсекается по подписи в той же строке, валюта может быть отдельной рамкой
+    candidate = select_amount(tokens, min_score=0.8)
+    assert candidate.amount == 1480.5 and candidate.token.text == "1 480.50"
+    # Без валюты число с копейками — кандидат с пониженным весом, но прежней уверенностью
+    assert select_amount(tokens[-2:], min_score=0.8).amount == 12.5
+    assert select_amount([token("Баланс 12.50", (10, 0, 200, 20)), token("Сума 10.00 UAH", (10, 0, 200, 20))]).amount == 10.0
+    # Из двух сумм с валютой выигрывает более уверенная и крупная
+    assert select_amount([token("250.00 UAH", (0, 0, 200, 60)),
+                          token("25.00 UAH", (0, 100, 100, 120), score=0.9)]).amount == 250.0
+    # При равной уверенности и высоте решает положение: сумма платежа выше остальных сумм
+    assert select_amount([token("Залишок 300.00 UAH", (0, 500, 300, 530)),
+                          token("Сума 1 200.00 UAH", (0, 100, 300, 130))]).amount == 1200.0
+
+def test_vectorized_preprocessing_matches_reference():
+    import numpy as np
+    from PIL import Image
+    from benchmarks.reference_preprocess import reference_otsu, reference_preprocess, render_check
+    from services.ocr.preprocessor import _otsu_threshold, preprocess_for_ocr
+
+    rng = np.random.default_rng(0)
+    images = [render_check(400, 120), render_check(900, 700),
+              Image.fromarray(rng.integers(0, 256, (50, 80, 3), dtype=np.uint8)),
+              Image.new("RGB", (30, 20), (200, 200, 200))]
+    for img in images:
+        assert np.array_equal(np.array(preprocess_for_ocr(img)), np.array(reference_preprocess(img)))
+        gray = np.array(img.convert("L"))
+        assert _otsu_threshold(gray) == reference_otsu(gray)
+
+@pytest.fixture
+def credit_agricole_default(monkeypatch):
+    """Синтетические чеки ниже повторяют макет Crédit Agricole"""
+    from services.ocr import layouts
+    monkeypatch.setattr(layouts, "OCR_DEFAULT_LAYOUT", "credit_agricole")
+
+def test_digits_only_amount_row_passes_min_score(credit_agricole_default):
+    from core.config import OCR_MIN_SCORE
+    from services.ocr import engine
+    from services.ocr.extractors import OcrToken, select_amount
+
+    # Кроп строки суммы отрезал «UAH»: сумма с копейками все равно останавливает каскад
+    assert select_amount([OcrToken("1 250.00", 0.95, (0, 0, 300, 60), "amount_row1")], OCR_MIN_SCORE).amount == 1250.0
+    result = engine.recognize_check(_render_check("250.00", position=(930, 520), size=(1500, 1500)),
+                                    order=("amount_row1", "full"), batch=0)
+    assert (result.amount, result.stage) == (250.0, "amount_row1")
+
+def _render_check(text: str, position=(50, 160), size=(800, 400)) -> bytes:
+    """Синтетический «чек» с одной строкой текста"""
+    import io
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new("RGB", size, "white")
+    ImageDraw.Draw(img).text(position, text, fill="black", font=ImageFont.load_default(size=48))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.mark.asyncio
+async def test_recognize_in_process_pool(monkeypatch):
+    import asyncio
+    from services.ocr import engine
+
+    monkeypatch.setattr(engine, "OCR_WORKERS", 1)
+    monkeypatch.setattr(engine, "OCR_ADAPTIVE", False)
+    try:
+        results = await asyncio.gather(
+            engine.recognize(_render_check("250.00 UAH")),
+            engine.recognize(_render_check("75.50 UAH")),
+        )
+    finally:
+        engine.shutdown()
+    assert [result.amount for result in results] == [250.0, 75.5]
+    assert "UAH" in results[0].text
+
+def test_cascade_stops_at_amount_row(credit_agricole_default):
+    from services.ocr import engine
+
+    # Сумма в области строки суммы: достаточно первого, самого дешевого кропа
+    result = engine.recognize_check(_render_check("250.00 UAH", position=(620, 345), size=(1000, 1000)), batch=0)
+    assert (result.amount, result.stage) == (250.0, "amount_row1")
+    assert len(result.attempts) == 1
+    # Строки варианта с рамками в координатах кропа
+    assert {token.variant for token in result.tokens} == {"amount_row1"}
+    amount_token = next(token for token in result.tokens if "250" in token.text)
+    x1, y1, x2, y2 = amount_token.box
+    assert 0 <= x1 < x2 and 0 <= y1 < y2 <= 80
+
+def test_leading_variants_are_recognized_in_one_batch(credit_agricole_default):
+    from services.ocr import engine
+    from services.ocr.layouts import get_layouts
+
+    image = _render_check("250.00 UAH", position=(620, 345), size=(1000, 1000))
+    result = engine.recognize_check(image, batch=4)
+    assert (result.amount, result.stage) == (250.0, "amount_row1")
+    assert result.layout == "credit_agricole"
+    assert [name for name, _, _ in result.attempts] == list(get_layouts()["credit_agricole"].variants[:4])
+
+def test_stitched_canvas_stays_within_max_side(monkeypatch):
+    from PIL import Image
+    from services.ocr import engine
+
+    assert engine._stitch_groups([80, 80, 440, 1000], 2000) == [[0, 1, 2, 3]]
+    assert engine._stitch_groups([80, 80, 1000, 1000], 2000) == [[0, 1, 2], [3]]
+    assert engine._stitch_groups([2400, 80], 2000) == [[0], [1]]
+
+    class FakeOcr:
+        max_side_len = 2000
+
+        def __call__(self, canvas, use_cls=True):
+            heights.append(canvas.shape[0])
+            return None, 0
+
+    heights = []
+    monkeypatch.setattr(engine, "_rapid_ocr", FakeOcr())
+    images = [Image.new("RGB", (360, 80), "white"), Image.new("RGB", (1000, 1000), "white"),
+              Image.new("RGB", (1000, 1000), "white")]
+    lines, seconds = engine.read_lines_batch(images, variants=["amount_row1", "full", "full_processed"])
+    assert heights == [80 + engine.STITCH_GAP + 1000, 1000]
+    assert lines == [[], [], []] and len(seconds) == 3
+
+    # Пустые регионы (вырожденный регион макета на маленьком изображении) не делят время на ноль
+    lines, seconds = engine.read_lines_batch([Image.new("RGB", (0, 0))] * 2)
+    assert seconds == [0.0, 0.0]
+
+def test_cascade_falls_back_to_full_image(credit_agricole_default):
+    from services.ocr import engine
+
+    result = engine.recognize_check(_render_check("75.50 UAH", position=(50, 800), size=(1000, 1000)),
+                                    order=("amount_row1", "table_area", "full"), batch=0)
+    assert (result.amount, result.stage) == (75.5, "full")
+    assert [name for name, _, _ in result.attempts] == ["amount_row1", "table_area", "full"]
+
+def test_stage_counts_are_described(monkeypatch):
+    from collections import Counter
+    from services.ocr import engine
+
+    monkeypatch.setattr(engine, "stage_counts", Counter())
+    assert engine.describe_stages() == ""
+    for stage in ("full", "amount_row1", "amount_row1"):
+        engine._record(engine.OcrResult(None, "", stage))
+    assert engine.describe_stages() == "amount_row1 2, full 1"
+
+def test_engine_import_does_not_load_database_layer(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    # Так модуль импортирует каждый воркер пула OCR
+    code = "import sys, services.ocr.engine; print('core.database' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    output = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+    assert not (tmp_path / "bot.log").exists()
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_shut_down(monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+    from services.ocr import engine
+
+    class BrokenPool:
+        shut_down = False
+
+        def submit(self, fn, *args, **kwargs):
+            raise BrokenProcessPool("worker died")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    pool = BrokenPool()
+    monkeypatch.setattr(engine, "OCR_ADAPTIVE", False)
+    monkeypatch.setattr(engine, "_executor", pool)
+    with pytest.raises(BrokenProcessPool):
+        await engine.recognize(b"image")
+    assert pool.shut_down and engine._executor is None
+
+def test_graph_opt_level_is_applied_to_all_sessions():
+    from services.ocr import engine
+
+    rapid_ocr = engine.build_rapid_ocr(graph_opt="basic", int8_models=())
+    for infer in (rapid_ocr.text_det.infer, rapid_ocr.text_cls.infer, rapid_ocr.text_rec.session):
+        options = infer.session.get_session_options()
+        assert options.graph_optimization_level == engine.GRAPH_OPT_LEVELS["basic"]
+
+def test_variant_stages_skip_detector(credit_agricole_default):
+    from services.ocr import engine
+
+    stages = engine.parse_variant_stages("amount_row1=rec, *=det+rec")
+    assert engine.stages_for("amount_row1", stages) == {"rec"}
+    assert engine.stages_for("full", stages) == {"det", "rec"}
+    assert engine.stages_for("full", {}) == engine.STAGES
+    with pytest.raises(ValueError):
+        engine.parse_variant_stages("amount_row1=det+cls")
+
+    # Однострочный кроп суммы сразу идет в распознаватель, в том числе в пакете с вариантами с детектором
+    image = _render_check("250.00 UAH", position=(620, 345), size=(1000, 1000))
+    result = engine.recognize_check(image, order=("amount_row1",), batch=0, variant_stages=stages)
+    assert (result.amount, result.stage) == (250.0, "amount_row1")
+    result = engine.recognize_check(image, order=("amount_row2", "amount_row1", "table_area"), batch=3,
+                                    variant_stages=stages)
+    assert result.amount == 250.0 and len(result.attempts) == 3
+
+def test_int8_recognizer_extracts_amount(credit_agricole_default, tmp_path):
+    pytest.importorskip("onnx")
+    from services.ocr import engine, quantize
+
+    # Нет сгенерированной модели — остается float
+    assert quantize.int8_model_params(("rec",), str(tmp_path)) == {}
+
+    paths = quantize.quantize_models(str(tmp_path), ("rec",))
+    assert quantize.int8_model_params(("rec",), str(tmp_path)) == {"rec_model_path": paths["rec"]}
+    rapid_ocr = engine.build_rapid_ocr(int8_models=("rec",), models_dir=str(tmp_path))
+    saved, engine._rapid_ocr = engine._rapid_ocr, rapid_ocr
+    try:
+        image = _render_check("250.00 UAH", position=(620, 345), size=(1000, 1000))
+        result = engine.recognize_check(image, order=("amount_row1",), batch=0)
+        assert (result.amount, result.stage) == (250.0, "amount_row1")
+    finally:
+        engine._rapid_ocr = saved
+
+def test_variants_are_reordered_by_hits_per_second():
+    from services.ocr import engine
+    from services.ocr.layouts import get_layouts
+
+    variants = get_layouts()["credit_agricole"].variants
+    # Без статистики сохраняется исходный порядок по стоимости
+    assert engine.order_variants({}, variants) == variants
+
+    stats = {
+        "amount_row1": (100, 0, 5.0),          # не находит сумму — исключается
+        "amount_row2": (100, 90, 6.0),
+        "table_area": (100, 60, 15.0),
+        "full": (10, 9, 6.0),
+    }
+    order = engine.order_variants(stats, variants)
+    assert "amount_row1" not in order
+    assert order[0] == "amount_row2"
+    assert order.index("table_area") < order.index("full")
+    assert len(order) == len(variants) - 1
+
+    # Статистика хранится по ключу «макет:вариант»
+    keyed = {engine.stats_key("credit_agricole", name): row for name, row in stats.items()}
+    keyed["monobank:full"] = (5, 5, 1.0)
+    assert engine.layout_stats(keyed, "credit_agricole") == stats
+
+def test_cascade_is_never_pruned_empty():
+    from services.ocr import engine
+
+    variants = ("amount_row1", "full")
+    assert engine.order_variants({name: (1000, 0, 10.0) for name in variants}, variants) == variants
+
+def test_layout_is_detected_by_header_color(credit_agricole_default, tmp_path):
+    import json
+    from PIL import Image
+    from services.ocr.layouts import detect_layout, load_layouts, parse_layout
+
+    (tmp_path / "greenbank.json").write_text(json.dumps({
+        "name": "greenbank",
+        "match": {"aspect_ratio": [1.5, 2.5], "header_color": [0, 160, 60], "tolerance": 30},
+        "regions": {"amount": [0.1, 0.2, 0.9, 0.3]},
+    }), encoding="utf-8")
+    (tmp_path / "broken.json").write_text('{"name": "broken", "regions": {"amount": [0.5, 0.2, 0.1]}}',
+                                          encoding="utf-8")
+    layouts = {"credit_agricole": parse_layout({"name": "credit_agricole", "regions": {}})}
+    layouts.update(load_layouts(str(tmp_path)))
+    assert set(layouts) == {"credit_agricole", "greenbank"}
+    assert layouts["greenbank"].variants == ("amount", "amount_processed", "full", "full_processed")
+
+    phone = Image.new("RGB", (500, 1000), "white")
+    phone.paste((0, 165, 55), (0, 0, 500, 100))
+    assert detect_layout(phone, layouts).name == "greenbank"
+    # Другой цвет заголовка или соотношение сторон — макет по умолчанию
+    assert detect_layout(Image.new("RGB", (500, 1000), "white"), layouts).name == "credit_agricole"
+    assert detect_layout(Image.new("RGB", (1000, 1000), (0, 160, 60)), layouts).name == "credit_agricole"
+
+def test_dark_mode_check_keeps_default_layout(monkeypatch):
+    from PIL import Image
+    from services.ocr import layouts
+
+    monkeypatch.setattr(layouts, "OCR_DEFAULT_LAYOUT", "credit_agricole")
+    # Скриншот телефона в темной теме: темный заголовок и фон, соотношение сторон 2.17
+    dark = Image.new("RGB", (1080, 2340), (28, 28, 30))
+    dark.paste((18, 18, 20), (0, 0, 1080, 190))
+    assert layouts.detect_layout(dark, layouts.load_layouts(layouts.TEMPLATES_DIR)).name == "credit_agricole"
+
+def test_shipped_templates_skip_crops_for_unknown_bank(monkeypatch):
+    from PIL import Image
+    from services.ocr import layouts
+
+    shipped = layouts.load_layouts(layouts.TEMPLATES_DIR)
+    assert {"credit_agricole", "generic"} <= set(shipped)
+
+    monkeypatch.setattr(layouts, "OCR_DEFAULT_LAYOUT", "generic")
+    layout = layouts.detect_layout(Image.new("RGB", (1080, 2340), "white"), shipped)
+    assert layout.name == "generic"
+    assert layout.variants == layouts.FULL_VARIANTS
+
+    monkeypatch.setattr(layouts, "OCR_DEFAULT_LAYOUT", "credit_agricole")
+    assert layouts.detect_layout(Image.new("RGB", (1080, 2340), "white"), shipped).variants[0] == "amount_row1"
+
+@pytest.mark.asyncio
+async def test_duplicate_check_is_resolved_from_cache(temp_db, monkeypatch, tmp_path):
+    from core import blob_store
+    from services.ocr import cache, engine
+
+    calls = []
+
+    async def fake_recognize(image_bytes):
+        calls.append(image_bytes)
+        return engine.OcrResult(250.0, "250.00 UAH", "amount_row1")
+
+    async def download():
+        downloads.append(1)
+        return b"image-bytes"
+
+    downloads = []
+    monkeypatch.setattr(engine, "recognize", fake_recognize)
+    monkeypatch.setattr(blob_store, "_store", blob_store.BlobStore(str(tmp_path), 1024 * 1024))
+    cache.clear()
+    try:
+        first = await cache.recognize(download, cache.file_key("uid-1"))
+        # Тот же файл: без скачивания и OCR
+        second = await cache.recognize(download, cache.file_key("uid-1"))
+        # Пересланная копия с другим file_unique_id: скачивается, но OCR не повторяется
+        third = await cache.recognize(download, cache.file_key("uid-2"))
+        assert (first.amount, second.amount, third.amount) == (250.0, 250.0, 250.0)
+        assert second.stage == cache.CACHE_STAGE
+        # Изображение скачано один раз и лежит в локальном хранилище
+        assert blob_store.get_store().read(first.image_sha256) == b"image-bytes"
+        assert second.image_sha256 == first.image_sha256
+        assert len(calls) == 1 and len(downloads) == 2
+        assert cache.hit_rate() == pytest.approx(2 / 3)
+
+        # После перезапуска процесса результат берется из SQLite (дожидаемся очереди записи)
+        from core import database
+        database.get_write_queue().submit(lambda conn: None).result()
+        cache.clear()
+        fourth = await cache.recognize(download, cache.file_key("uid-2"))
+        assert fourth.amount == 250.0 and len(calls) == 1
+
+        # Неудачный OCR не кэшируется: повторная отправка распознается заново (изображение — из хранилища)
+        async def failed_recognize(image_bytes):
+            calls.append(image_bytes)
+            return engine.OcrResult(None, "", engine.FALLBACK_STAGE)
+
+        async def download_other():
+            downloads.append(1)
+            return b"other-image-bytes"
+
+        monkeypatch.setattr(engine, "recognize", failed_recognize)
+        failed = await cache.recognize(download_other, cache.file_key("uid-3"))
+        database.get_write_queue().submit(lambda conn: None).result()
+        monkeypatch.setattr(engine, "recognize", fake_recognize)
+        retried = await cache.recognize(download_other, cache.file_key("uid-3"))
+        assert failed.amount is None and retried.amount == 250.0
+        assert retried.stage != cache.CACHE_STAGE and len(calls) == 3 and len(downloads) == 3
+    finally:
+        cache.clear()
+
+@pytest.mark.asyncio
+async def test_retry_ocr_uses_stored_image(temp_db, monkeypatch, tmp_path):
+    from core import blob_store, database, ledger
+    from bot.handlers import media
+    from services.ocr import engine
+
+    store = blob_store.BlobStore(str(tmp_path), 1024 * 1024)
+    monkeypatch.setattr(blob_store, "_store", store)
+    monkeypatch.setattr(media, "is_admin", lambda user_id: True)
+    image_sha256 = store.put(b"check-image")
+    await ledger.save_check_screenshot("file-id", 0, "Ошибка OCR", -1, 10, image_sha256)
+
+    recognized = []
+
+    async def fake_recognize(image_bytes):
+        recognized.append(image_bytes)
+        return engine.OcrResult(120.0, "120.00 UAH", "amount_row1")
+
+    monkeypatch.setattr(engine, "recognize", fake_recognize)
+    edits, answers = [], []
+
+    async def edit_text(text, **kwargs):
+        edits.append(text)
+
+    async def answer(text, **kwargs):
+        answers.append(text)
+
+    source = SimpleNamespace(chat=SimpleNamespace(id=-1), message_id=10)
+    callback = SimpleNamespace(from_user=SimpleNamespace(id=1), answer=answer,
+                               message=SimpleNamespace(reply_to_message=source, edit_text=edit_text))
+    await media.handle_retry_ocr(callback)
+
+    # Изображение взято из хранилища, чек записан на исходное сообщение
+    assert recognized == [b"check-image"] and "ЧЕК ДОБАВЛЕН" in edits[-1]
+    assert database.get_snapshot().checks == 120.0
+    assert database.get_screenshot_image(-1, 10) == ("file-id", image_sha256)
+
+    # Без сохраненного изображения повтор невозможен
+    callback.message.reply_to_message = SimpleNamespace(chat=SimpleNamespace(id=-1), message_id=11)
+    await media.handle_retry_ocr(callback)
+    assert "не сохранено" in answers[-1] and len(recognized) == 1
+
+@pytest.mark.asyncio
+async def test_stored_image_is_not_downloaded_again(temp_db, monkeypatch, tmp_path):
+    from core import blob_store, database, ledger
+    from services.ocr import cache, engine
+
+    calls, downloads = [], []
+
+    async def fake_recognize(image_bytes):
+        calls.append(image_bytes)
+        return engine.OcrResult(250.0, "250.00 UAH", "amount_row1")
+
+    async def download():
+        downloads.append(1)
+        return b"stored-image"
+
+    monkeypatch.setattr(engine, "recognize", fake_recognize)
+    monkeypatch.setattr(blob_store, "_store", blob_store.BlobStore(str(tmp_path), 1024 * 1024))
+    cache.clear()
+    try:
+        first = await cache.recognize(download, cache.file_key("uid-1"))
+        database.get_write_queue().submit(lambda conn: None).result()
+
+        # Результат просрочен: OCR повторяется по изображению из хранилища, без скачивания
+        monkeypatch.setattr(cache, "OCR_CACHE_TTL_HOURS", 0)
+        monkeypatch.setattr(database, "OCR_CACHE_TTL_HOURS", 0)
+        second = await cache.recognize(download, cache.file_key("uid-1"))
+        assert second.amount == 250.0 and second.image_sha256 == first.image_sha256
+        assert len(calls) == 2 and len(downloads) == 1
+
+        # Скриншот с тем же file_id: изображение тоже берется из хранилища
+        await ledger.save_check_screenshot("bot-file-id", 250.0, "250.00 UAH", 1, 2, first.image_sha256)
+        cache.clear()
+        third = await cache.recognize(download, None, "bot-file-id")
+        assert third.amount == 250.0 and len(downloads) == 1
+        assert cache.counters["stored"] == 1
+    finally:
+        cache.clear()
+
+def test_processed_crops_are_views_of_one_pass(credit_agricole_default):
+    import io
+    import numpy as np
+    from PIL import Image
+    from services.ocr import engine
+    from services.ocr.layouts import get_layouts
+    from services.ocr.preprocessor import ProcessedImage, preprocess_for_ocr
+
+    image_bytes = _render_check("250.00 UAH", position=(930, 520), size=(1500, 1500))
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    processed = ProcessedImage(image)
+    # Кроп, которому не нужно большее увеличение, — срез общего прохода
+    x1, y1, x2, y2 = 0, 0, 900, 600
+    assert np.array_equal(np.array(processed.crop((x1, y1, x2, y2))), np.array(processed.full())[y1:y2, x1:x2])
+    assert processed.crop((x1, y1, x2, y2), refine=True).size == (x2 - x1, y2 - y1)
+    # Строка суммы увеличивается, как при отдельной предобработке кропа
+    x1, y1, x2, y2 = get_layouts()["credit_agricole"].boxes(image.size)["amount_row1"]
+    assert processed.crop((x1, y1, x2, y2)).size == preprocess_for_ocr(image.crop((x1, y1, x2, y2))).size
+
+    result = engine.recognize_check(image_bytes, order=("amount_row1_processed",), batch=0)
+    assert (result.amount, result.stage) == (250.0, "amount_row1_processed")
+
+def test_smallest_sufficient_photo_size_is_chosen():
+    from types import SimpleNamespace
+    from services.ocr.resolution import choose_photo_size, required_long_side
+
+    target = required_long_side()
+    sizes = [SimpleNamespace(w=90, h=200), SimpleNamespace(w=target // 2, h=target),
+             SimpleNamespace(w=target, h=target * 2)]
+    dimensions = lambda size: (size.w, size.h)
+    assert choose_photo_size(sizes, dimensions) is sizes[1]
+    # Нет достаточного размера — самый большой
+    assert choose_photo_size(sizes[:1], dimensions) is sizes[0]
+
+@pytest.mark.asyncio
+async def test_telethon_downloads_progressive_photo_size(monkeypatch):
+    from telethon import types
+    from telethon.client.downloads import DownloadMethods
+    from services.ocr import cache, processor
+    from services.ocr.engine import OcrResult
+
+    sizes = [types.PhotoStrippedSize(type="i", bytes=b"\x01" * 40),
+             types.PhotoSize(type="m", w=320, h=160, size=9000),
+             types.PhotoSizeProgressive(type="y", w=1280, h=640, sizes=[20000, 60000, 110000])]
+    message = SimpleNamespace(photo=SimpleNamespace(id=42, sizes=sizes), document=None)
+
+    class Client:
+        async def download_media(self, message, file=None, thumb=None):
+            # Тот же выбор размера, что делает telethon при скачивании
+            size = DownloadMethods._get_thumb(message.photo.sizes, thumb)
+            return b"image-%d" % size.w if size is not None else None
+
+    async def recognize(download, key):
+        return OcrResult(None, (await download()).decode(), "full")
+
+    monkeypatch.setattr(cache, "recognize", recognize)
+    result = await processor.process_check_image_telethon(Client(), message)
+    assert result.text == "image-1280"
+
+def test_decode_reduces_large_images():
+    import io
+    from PIL import Image
+    from services.ocr import resolution
+
+    target = resolution.required_long_side()
+    buffer = io.BytesIO()
+    Image.new("RGB", (target * 2, target * 4), "white").save(buffer, format="JPEG")
+    # JPEG декодируется в draft-режиме: не меньше нужного размера, но без полного разрешения
+    decoded = resolution.decode(buffer.getvalue())
+    assert decoded.mode == "RGB" and target <= max(decoded.size) < target * 4
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (resolution.OCR_MAX_LONG_SIDE * 2, 300), "white").save(buffer, format="PNG")
+    assert max(resolution.decode(buffer.getvalue()).size) == resolution.OCR_MAX_LONG_SIDE
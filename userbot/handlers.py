@@ -1,7 +1,8 @@
 from telethon import events, TelegramClient
 from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
 from core.config import TOP_UP_CHAT_ID, CHECKS_CHAT_ID, ALLOWED_CHATS
-from core.database import add_income, add_withdrawal, add_check, save_check_screenshot
+from core import ledger
+from core.models import LedgerSnapshot
 from services.banking.parser import extract_bank_payment
 from services.ocr.processor import process_check_image_telethon
 from utils.logger import logger
@@ -50,7 +51,7 @@ def setup_userbot_handlers(client: TelegramClient):
 
             if chat_id == TOP_UP_CHAT_ID:
                 logger.info(f"✏️ Сообщение отредактировано в чате пополнений")
-                # Можно переобработать сообщение если нужно
+                # Запись ищется по (chat_id, message_id): та же сумма — без изменений, другая — замена
                 await handle_income_message(event, message_text, client)
 
         except Exception as e:
@@ -60,8 +61,16 @@ def setup_userbot_handlers(client: TelegramClient):
     async def handle_deleted_message(event):
         """Обработка удаленных сообщений"""
         try:
-            logger.info(f"🗑️ Сообщение удалено в отслеживаемом чате")
-            # Здесь можно добавить логику отмены транзакций
+            # У удалений вне каналов chat_id неизвестен, а message_id не уникален между чатами:
+            # такие события пропускаются, чтобы не отменить записи другого чата
+            if not event.chat_id:
+                logger.debug(f"🗑️ Пропущено удаление без chat_id: {len(event.deleted_ids)} сообщений")
+                return
+
+            logger.info(f"🗑️ Удалено сообщений в отслеживаемом чате: {len(event.deleted_ids)}")
+            result = await ledger.reverse_messages([event.chat_id], event.deleted_ids)
+            if result and result.reversed:
+                logger.info(f"↩️ Отменено транзакций: {result.reversed}")
 
         except Exception as e:
             logger.error(f"❌ Ошибка обработки удаления: {e}")
@@ -80,7 +89,8 @@ async def handle_income_message(event, message_text: str, client: TelegramClient
             logger.info("🔍 Текст не содержит суммы, пробуем OCR...")
 
             try:
-                ocr_amount, full_text = await process_check_image_telethon(client, event.message)
+                ocr_result = await process_check_image_telethon(client, event.message)
+                ocr_amount, full_text = ocr_result.amount, ocr_result.text
 
                 # Пытаемся найти сумму в распознанном тексте
                 if full_text:
@@ -102,20 +112,24 @@ async def handle_income_message(event, message_text: str, client: TelegramClient
 
         # Обрабатываем найденную сумму
         if amount > 0:
-            add_income(amount)
+            snapshot = await ledger.add_income(amount, event.chat_id, event.message.id)
+            if snapshot is None or snapshot.duplicate:
+                return
             logger.info(f"💰 Добавлено пополнение: {amount:.2f} UAH")
 
             # Уведомляем админа о крупных пополнениях
             if amount >= 1000:
-                await notify_admin_about_large_transaction(client, "income", amount)
+                await notify_admin_about_large_transaction(client, "income", amount, snapshot)
 
         elif amount < 0:
-            add_withdrawal(amount)
+            snapshot = await ledger.add_withdrawal(amount, event.chat_id, event.message.id)
+            if snapshot is None or snapshot.duplicate:
+                return
             logger.info(f"💸 Зафиксирован вывод: {amount:.2f} UAH")
 
             # Уведомляем админа о крупных выводах
             if abs(amount) >= 500:
-                await notify_admin_about_large_transaction(client, "withdrawal", amount)
+                await notify_admin_about_large_transaction(client, "withdrawal", amount, snapshot)
 
     except Exception as e:
         logger.error(f"❌ Ошибка обработки пополнения: {e}")
@@ -126,15 +140,20 @@ async def handle_check_message(event, message_text: str, client: TelegramClient)
     try:
         # Запускаем OCR для изображения
         logger.info("🔍 Запуск OCR для чека...")
-        amount, full_text = await process_check_image_telethon(client, event.message)
+        ocr_result = await process_check_image_telethon(client, event.message)
+        amount, full_text = ocr_result.amount, ocr_result.text
+        image_sha256 = ocr_result.image_sha256
 
         # Сохраняем ID сообщения как идентификатор файла
         file_id = str(event.message.id)
+        source = (event.chat_id, event.message.id)
 
         # Проверяем валидность суммы
         if amount and 1 <= amount <= 50000:
-            add_check(amount)
-            save_check_screenshot(file_id, amount, full_text or "")
+            snapshot = await ledger.add_check(amount, *source)
+            await ledger.save_check_screenshot(file_id, amount, full_text or "", *source, image_sha256)
+            if snapshot is None or snapshot.duplicate:
+                return
             logger.info(f"🧾 Добавлен чек: {amount:.2f} UAH (ID: {file_id})")
 
             # Отправляем подтверждение в чат
@@ -145,15 +164,17 @@ async def handle_check_message(event, message_text: str, client: TelegramClient)
 
         else:
             # Сохраняем нераспознанный чек
-            save_check_screenshot(file_id, 0, full_text or "OCR failed")
+            await ledger.save_check_screenshot(file_id, 0, full_text or "OCR failed", *source, image_sha256)
             logger.warning(f"⚠️ Чек не распознан или некорректная сумма: {amount}")
 
             # Пытаемся найти сумму в тексте
             if full_text:
                 text_amount = extract_bank_payment(full_text)
                 if text_amount and text_amount > 0:
-                    add_check(text_amount)
-                    save_check_screenshot(file_id, text_amount, full_text)
+                    snapshot = await ledger.add_check(text_amount, *source)
+                    await ledger.save_check_screenshot(file_id, text_amount, full_text, *source, image_sha256)
+                    if snapshot is None or snapshot.duplicate:
+                        return
                     logger.info(f"🧾 Сумма найдена в тексте: {text_amount:.2f} UAH")
 
                     try:
@@ -171,14 +192,13 @@ async def handle_check_message(event, message_text: str, client: TelegramClient)
             pass
 
 
-async def notify_admin_about_large_transaction(client: TelegramClient, transaction_type: str, amount: float):
-    """Уведомляет администратора о крупных транзакциях"""
+async def notify_admin_about_large_transaction(client: TelegramClient, transaction_type: str, amount: float,
+                                               snapshot: LedgerSnapshot):
+    """Уведомляет администратора о крупных транзакциях (баланс берется из снимка транзакции)"""
     try:
         from core.config import ADMIN_CHAT_ID
-        from core.database import get_balance
 
-        incoming, checks, _ = get_balance()
-        balance = incoming - checks
+        balance = snapshot.balance
 
         if transaction_type == "income":
             emoji = "💰"
@@ -212,23 +232,25 @@ async def periodic_stats_report(client: TelegramClient):
             # Ждем до следующего часа
             await asyncio.sleep(3600)  # 1 час
 
-            from core.database import get_statistics
             from core.config import ADMIN_CHAT_ID
-            from datetime import datetime
+            from datetime import datetime, timedelta
             import pytz
 
-            stats = get_statistics()
+            now = datetime.now(pytz.timezone('Europe/Kiev'))
+            hour = await ledger.get_rollups(now - timedelta(hours=1), now)
 
-            # Отправляем только если есть активность
-            if stats['income_count'] > 0 or stats['check_count'] > 0:
-                time_now = datetime.now(pytz.timezone('Europe/Kiev')).strftime('%H:%M')
+            # Отправляем только если за час была активность
+            if hour['income'].count > 0 or hour['check'].count > 0:
+                stats = await ledger.get_statistics()
+                time_now = now.strftime('%H:%M')
 
                 message = f"""
 📊 <b>Часовой отчет ({time_now})</b>
 
 💰 Баланс: <code>{stats['balance']:,.2f} UAH</code>
-📈 Пополнений: {stats['income_count']} на {stats['incoming']:,.2f} UAH
-📉 Чеков: {stats['check_count']} на {stats['checks']:,.2f} UAH
+📈 Пополнений за час: {hour['income'].count} на {hour['income'].total:,.2f} UAH
+📉 Чеков за час: {hour['check'].count} на {hour['check'].total:,.2f} UAH
+📦 За период: {stats['income_count']} пополнений, {stats['check_count']} чеков
 
 <i>Автоматический отчет</i>
 """
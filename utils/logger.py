@@ -6,7 +6,8 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
     handlers=[
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler("bot.log", encoding="utf-8")
+        # Файл открывается при первой записи: импорт модулей (в том числе в воркерах OCR) его не создает
+        logging.FileHandler("bot.log", encoding="utf-8", delay=True)
     ],
 )
 